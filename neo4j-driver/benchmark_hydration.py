@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark of TNode/TArc hydration for get_all_nodes_and_arcs.
+
+Compares the previous path (record.data() dicts, dict-based arcs, plain
+dataclasses) with the current one (values read by index, slotted
+TNode/TArc, interned uri strings). Records are synthesized as neo4j.Record
+objects with freshly allocated strings, the way the driver decodes them,
+and are streamed so that only the hydrated result stays in memory.
+No Neo4j server is required.
+
+Usage:
+    python3 benchmark_hydration.py [node_count] [arcs_per_node]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import List, Optional
+from neo4j import Record
+from graph_repository import GraphRepository
+
+
+@dataclass
+class LegacyTNode:
+    id: str
+    uri: str
+    description: str
+    title: str
+    arcs: Optional[List['LegacyTArc']] = None
+
+
+@dataclass
+class LegacyTArc:
+    id: str
+    uri: str
+    node_uri_from: str
+    node_uri_to: str
+
+
+def fresh(value):
+    """Return a new string object equal to value (as decoded by the driver)"""
+    return (value + '.')[:-1]
+
+
+def legacy_records(node_count, arcs_per_node):
+    for i in range(node_count):
+        uri = f"node_{i:010d}"
+        yield Record([
+            ('element_id', f"4:db:{i}"), ('uri', fresh(uri)), ('description', f"Description {i}"),
+            ('title', f"Title {i}"),
+            ('arcs', [
+                {'element_id': f"5:db:{i * arcs_per_node + j}", 'uri': fresh('RELATES_TO'),
+                 'node_uri_from': fresh(uri), 'node_uri_to': fresh(f"node_{(i + j + 1) % node_count:010d}")}
+                for j in range(arcs_per_node)
+            ])
+        ])
+
+
+def current_records(node_count, arcs_per_node):
+    for i in range(node_count):
+        uri = f"node_{i:010d}"
+        yield Record([
+            ('element_id', f"4:db:{i}"), ('uri', fresh(uri)), ('description', f"Description {i}"),
+            ('title', f"Title {i}"),
+            ('arcs', [
+                [f"5:db:{i * arcs_per_node + j}", fresh('RELATES_TO'),
+                 fresh(f"node_{(i + j + 1) % node_count:010d}")]
+                for j in range(arcs_per_node)
+            ])
+        ])
+
+
+def legacy_hydrate(records):
+    nodes = []
+    for record in records:
+        result = record.data()
+        node = LegacyTNode(
+            id=result.get('element_id', ''),
+            uri=result.get('uri', ''),
+            description=result.get('description', ''),
+            title=result.get('title', ''),
+            arcs=result.get('arcs', [])
+        )
+        node.arcs = [
+            LegacyTArc(
+                id=arc.get('element_id', ''),
+                uri=arc.get('uri', ''),
+                node_uri_from=arc.get('node_uri_from', ''),
+                node_uri_to=arc.get('node_uri_to', '')
+            )
+            for arc in result.get('arcs', []) if arc.get('element_id')
+        ]
+        nodes.append(node)
+    return nodes
+
+
+def current_hydrate(records):
+    repo = GraphRepository.__new__(GraphRepository)
+    return [repo.collect_node_record(record) for record in records]
+
+
+def measure(hydrate, records_factory, node_count, arcs_per_node):
+    # CPU: only hydration of already received records is timed
+    records = list(records_factory(node_count, arcs_per_node))
+    gc.collect()
+    started = time.perf_counter()
+    hydrate(records)
+    seconds = time.perf_counter() - started
+    del records
+
+    # Memory: records are streamed, only the hydrated result is retained
+    gc.collect()
+    tracemalloc.start()
+    nodes = hydrate(records_factory(node_count, arcs_per_node))
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del nodes
+    return seconds, retained
+
+
+def main():
+    node_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    arcs_per_node = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    scale = 1_000_000 / node_count
+
+    legacy = measure(legacy_hydrate, legacy_records, node_count, arcs_per_node)
+    current = measure(current_hydrate, current_records, node_count, arcs_per_node)
+
+    print(f"{node_count} nodes x {arcs_per_node} arcs, extrapolated per 1M nodes:")
+    print(f"{'path':>10} {'CPU, s':>10} {'memory, MiB':>14}")
+    for name, (seconds, retained) in (('legacy', legacy), ('current', current)):
+        print(f"{name:>10} {seconds * scale:>10.2f} {retained * scale / 2 ** 20:>14.1f}")
+    print(f"{'saved':>10} {(1 - current[0] / legacy[0]) * 100:>9.0f}% {(1 - current[1] / legacy[1]) * 100:>13.0f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark of uri lookups before and after the schema bootstrap.
+
+Creates a synthetic graph of unlabeled-by-base nodes, measures label-less
+`MATCH (n {uri: $uri})` lookups, then times migrate_base_label(), runs
+ensure_schema() and measures the indexed get_node_by_uri() on the same keys.
+
+Usage:
+    python3 benchmark_schema.py [node_count] [lookup_count]
+"""
+
+import os
+import random
+import sys
+import time
+from dotenv import load_dotenv
+from graph_repository import GraphRepository
+
+# Load environment variables
+load_dotenv()
+
+
+def create_repository():
+    """Create and return a configured GraphRepository instance"""
+    return GraphRepository(
+        uri=os.getenv('NEO4J_URI', 'bolt://localhost:7687'),
+        user=os.getenv('NEO4J_USER', 'neo4j'),
+        password=os.getenv('NEO4J_PASSWORD', 'password'),
+        database=os.getenv('NEO4J_DATABASE', 'driver-test')
+    )
+
+
+def time_lookups(lookup, uris):
+    """Return average lookup time in milliseconds"""
+    started = time.perf_counter()
+    for uri in uris:
+        lookup(uri)
+    return (time.perf_counter() - started) * 1000 / len(uris)
+
+
+def main():
+    node_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lookup_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    with create_repository() as repo:
+        print(f"📦 Creating {node_count} synthetic nodes...")
+        repo.run_custom_query("""
+        UNWIND range(1, $count) AS i
+        CALL {
+            WITH i
+            CREATE (:BenchNode {uri: 'bench_' + toString(i), title: 'Bench ' + toString(i)})
+        } IN TRANSACTIONS OF 10000 ROWS
+        """, {'count': node_count})
+
+        uris = [f"bench_{random.randint(1, node_count)}" for _ in range(lookup_count)]
+
+        before = time_lookups(
+            lambda uri: repo.run_custom_query("MATCH (n {uri: $uri}) RETURN n.uri as uri", {'uri': uri}),
+            uris
+        )
+
+        print("🔧 Migrating base label and creating schema...")
+        started = time.perf_counter()
+        migrated = repo.migrate_base_label()
+        migration = time.perf_counter() - started
+        repo.ensure_schema()
+        repo.run_custom_query("CALL db.awaitIndexes()")
+
+        after = time_lookups(repo.get_node_by_uri, uris)
+
+        print(f"\n{'nodes':>10} {'migrated':>10} {'migration, s':>13} {'before, ms':>12} {'after, ms':>12} {'speedup':>8}")
+        print(f"{node_count:>10} {migrated:>10} {migration:>13.2f} {before:>12.3f} {after:>12.3f} {before / after:>7.1f}x")
+
+        print("\n🧹 Cleaning up...")
+        repo.run_custom_query("""
+        MATCH (n:BenchNode)
+        CALL {
+            WITH n
+            DETACH DELETE n
+        } IN TRANSACTIONS OF 10000 ROWS
+        """)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,9 +3,25 @@
 Тесты для GraphRepository
 """
 
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import threading
 import unittest
-from unittest.mock import Mock, patch, MagicMock
-from graph_repository import GraphRepository, TNode, TArc
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
+from neo4j import Record, SummaryCounters, READ_ACCESS, WRITE_ACCESS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+import graph_repository
+from graph_repository import GraphRepository, AsyncGraphRepository, TNode, TArc, TBatchChunk, TPage, CypherTemplateCache, TUpsertStats, NodeCache
+from graph_repository import PoolConfig, PoolMetrics, LatencyHistogram, QueryStats, TQueryEvent, SlowQueryLog
+from graph_repository import BufferedGraphWriter, MemoryGraph, MemoryGraphRepository
+from neo4j.exceptions import ClientError
 
 
 class TestGraphRepository(unittest.TestCase):
@@ -26,6 +42,9 @@ class TestGraphRepository(unittest.TestCase):
             mock_session.__enter__ = Mock(return_value=mock_session)
             mock_session.__exit__ = Mock(return_value=None)
             mock_session.run.return_value = []
+            # Управляемые транзакции выполняют функцию с самой сессией в роли транзакции
+            mock_session.execute_read.side_effect = lambda work: work(mock_session)
+            mock_session.execute_write.side_effect = lambda work: work(mock_session)
             self.repo.driver.session.return_value = mock_session
     
     def test_generate_random_string(self):
@@ -92,6 +111,112 @@ class TestGraphRepository(unittest.TestCase):
         self.assertIsInstance(nodes[0], TNode)
         self.assertEqual(nodes[0].uri, 'uri1')
     
+    def test_iter_all_nodes_and_arcs(self):
+        """Тест потокового получения узлов со связями"""
+        mock_session = self.repo.driver.session.return_value
+        mock_session.run.return_value = iter([
+            Record([
+                ('element_id', '4:abc123'), ('uri', 'uri1'), ('description', 'desc1'), ('title', 'title1'),
+                ('arcs', [['5:def456', 'RELATES_TO', 'uri2']])
+            ])
+        ])
+        
+        nodes = self.repo.iter_all_nodes_and_arcs(fetch_size=100)
+        self.repo.driver.session.assert_not_called()
+        
+        node = next(nodes)
+        self.assertEqual(node.uri, 'uri1')
+        self.assertEqual(len(node.arcs), 1)
+        self.assertEqual(node.arcs[0].node_uri_from, 'uri1')
+        self.assertEqual(node.arcs[0].node_uri_to, 'uri2')
+        self.assertEqual(list(nodes), [])
+        self.repo.driver.session.assert_called_once_with(
+            database='test-db', bookmark_manager=self.repo.bookmark_manager,
+            default_access_mode=READ_ACCESS, fetch_size=100
+        )
+    
+    def test_get_all_nodes_and_arcs_managed_read(self):
+        """Тест чтения всех узлов со связями через execute_read"""
+        mock_session = self.repo.driver.session.return_value
+        mock_tx = Mock()
+        mock_tx.run.return_value = [Mock(data=Mock(return_value={
+            'element_id': '4:1', 'uri': 'uri1', 'description': '', 'title': 'A',
+            'arcs': [['5:1', 'RELATES_TO', 'uri2']]
+        }))]
+        mock_session.execute_read.side_effect = lambda work: work(mock_tx)
+        
+        nodes = self.repo.get_all_nodes_and_arcs()
+        
+        mock_session.execute_read.assert_called_once()
+        mock_session.run.assert_not_called()
+        self.assertEqual(mock_tx.run.call_args[0][0], self.repo.ALL_NODES_AND_ARCS_QUERY)
+        self.assertEqual(nodes[0].arcs, [TArc('5:1', 'RELATES_TO', 'uri1', 'uri2')])
+
+    @patch.object(GraphRepository, '_execute_query')
+    def test_get_nodes_page(self, mock_execute):
+        """Тест постраничной выборки узлов по ключу"""
+        mock_execute.return_value = [
+            {'element_id': '4:1', 'uri': 'uri1', 'description': '', 'title': 'A'},
+            {'element_id': '4:2', 'uri': 'uri2', 'description': '', 'title': 'B'},
+            {'element_id': '4:3', 'uri': 'uri3', 'description': '', 'title': 'C'}
+        ]
+        
+        page = self.repo.get_nodes_page(2, labels=['Class'])
+        self.assertIsInstance(page, TPage)
+        self.assertEqual([node.uri for node in page.items], ['uri1', 'uri2'])
+        self.assertEqual(self.repo.decode_cursor(page.next_cursor), ('uri2', '4:2'))
+        query, parameters = mock_execute.call_args[0]
+        self.assertIn('MATCH (n:`Class`)', query)
+        self.assertNotIn('SKIP', query)
+        self.assertEqual(parameters['limit'], 3)
+        
+        # Следующая страница продолжается после ключа последнего узла
+        mock_execute.return_value = [
+            {'element_id': '4:3', 'uri': 'uri3', 'description': '', 'title': 'C'}
+        ]
+        page = self.repo.get_nodes_page(2, cursor=page.next_cursor)
+        self.assertIsNone(page.next_cursor)
+        parameters = mock_execute.call_args[0][1]
+        self.assertEqual((parameters['after_uri'], parameters['after_id']), ('uri2', '4:2'))
+        
+        with self.assertRaises(ValueError):
+            self.repo.get_nodes_page(2, cursor='not a cursor')
+        
+        # Страница со связями строится по тому же шаблону узла общей метки
+        mock_execute.return_value = []
+        self.repo.get_nodes_and_arcs_page(2)
+        self.assertIn('MATCH (n:`Resource`)', mock_execute.call_args[0][0])
+
+    @unittest.skipUnless(numpy, "numpy не установлен")
+    def test_get_graph_columns(self):
+        """Тест столбцового представления графа"""
+        mock_session = self.repo.driver.session.return_value
+        mock_tx = Mock()
+        mock_tx.run.side_effect = [
+            [Mock(data=Mock(return_value=row)) for row in rows] for rows in (
+                [{'element_id': '4:1', 'uri': 'uri1', 'title': 'A'},
+                 {'element_id': '4:2', 'uri': 'uri2', 'title': 'B'}],
+                [{'node_from': '4:1', 'node_to': '4:2', 'type': 'subclass_of'},
+                 {'node_from': '4:2', 'node_to': '4:1', 'type': 'points_to'},
+                 {'node_from': '4:1', 'node_to': '4:9', 'type': 'points_to'}]
+            )
+        ]
+        mock_session.execute_read.side_effect = lambda work: work(mock_tx)
+        
+        columns = self.repo.get_graph_columns()
+        # Чтения выполняются управляемыми транзакциями с повтором, а не session.run
+        self.assertEqual(mock_session.execute_read.call_count, 2)
+        mock_session.run.assert_not_called()
+        self.assertEqual(list(columns.node_uris), ['uri1', 'uri2'])
+        self.assertEqual(columns.arc_from.tolist(), [0, 1])
+        self.assertEqual(columns.arc_to.tolist(), [1, 0])
+        self.assertEqual([columns.arc_types[code] for code in columns.arc_type_codes], ['subclass_of', 'points_to'])
+        self.assertEqual(numpy.bincount(columns.arc_from, minlength=2).tolist(), [1, 1])
+        # Столбцы связей - собственные изменяемые массивы
+        self.assertTrue(columns.arc_from.flags.writeable and columns.arc_type_codes.flags.owndata)
+        columns.arc_to[0] = 0
+        self.assertEqual(columns.arc_to.tolist(), [0, 0])
+
     @patch.object(GraphRepository, '_execute_query')
     def test_get_node_by_uri(self, mock_execute):
         """Тест получения узла по URI"""
@@ -102,12 +227,37 @@ class TestGraphRepository(unittest.TestCase):
         node = self.repo.get_node_by_uri('test_uri')
         self.assertIsInstance(node, TNode)
         self.assertEqual(node.uri, 'test_uri')
+        self.assertIn('(n:Resource {uri: $uri})', mock_execute.call_args[0][0])
         
         # Тест с несуществующим URI
         mock_execute.return_value = []
         node = self.repo.get_node_by_uri('nonexistent')
         self.assertIsNone(node)
     
+    @patch.object(GraphRepository, '_execute_query')
+    def test_get_node_by_uri_cached(self, mock_execute):
+        """Тест чтения узла через кэш и его инвалидации при обновлении"""
+        self.repo.cache = NodeCache()
+        mock_execute.return_value = [
+            {'element_id': '4:abc123', 'uri': 'test_uri', 'description': 'test', 'title': 'test'}
+        ]
+        
+        first = self.repo.get_node_by_uri('test_uri')
+        second = self.repo.get_node_by_uri('test_uri')
+        self.assertIs(first, second)
+        self.assertEqual(mock_execute.call_count, 1)
+        
+        self.repo.update_node('test_uri', {'title': 'new'})
+        self.repo.get_node_by_uri('test_uri')
+        self.assertEqual(mock_execute.call_count, 3)
+        self.assertEqual(self.repo.cache.stats()['hits'], 1)
+        self.assertEqual(self.repo.cache.stats()['misses'], 2)
+        
+        # Внутри unit_of_work кэш не используется
+        with self.repo.unit_of_work():
+            self.repo.get_node_by_uri('test_uri')
+        self.assertEqual(mock_execute.call_count, 4)
+
     @patch.object(GraphRepository, '_execute_query')
     def test_create_node(self, mock_execute):
         """Тест создания узла"""
@@ -119,6 +269,7 @@ class TestGraphRepository(unittest.TestCase):
         node = self.repo.create_node(params)
         self.assertIsInstance(node, TNode)
         self.assertEqual(node.title, 'Test')
+        self.assertIn(':`Resource`', mock_execute.call_args[0][0])
     
     @patch.object(GraphRepository, '_execute_query')
     def test_create_arc(self, mock_execute):
@@ -133,6 +284,54 @@ class TestGraphRepository(unittest.TestCase):
         self.assertEqual(arc.node_uri_from, 'node1')
         self.assertEqual(arc.node_uri_to, 'node2')
     
+    @patch.object(GraphRepository, '_execute_query')
+    def test_create_nodes(self, mock_execute):
+        """Тест массового создания узлов"""
+        def execute(query, parameters):
+            return [
+                {'idx': row['idx'], 'element_id': f"4:{row['idx']}", 'uri': row['props']['uri'],
+                 'description': '', 'title': row['props']['title']}
+                for row in reversed(parameters['rows'])
+            ]
+        mock_execute.side_effect = execute
+        chunks = []
+        
+        params = [
+            {'title': 'A', 'labels': ['Class']},
+            {'title': 'B'},
+            {'title': 'C', 'labels': ['Class']},
+        ]
+        nodes = self.repo.create_nodes(params, batch_size=1, on_chunk=chunks.append)
+        
+        self.assertEqual([node.title for node in nodes], ['A', 'B', 'C'])
+        self.assertEqual(mock_execute.call_count, 3)
+        self.assertIn('UNWIND $rows', mock_execute.call_args_list[0][0][0])
+        self.assertIn(':`Class`', mock_execute.call_args_list[0][0][0])
+        self.assertEqual(len(chunks), 3)
+        self.assertIsInstance(chunks[0], TBatchChunk)
+        # Входные параметры не изменяются
+        self.assertEqual(params[0]['labels'], ['Class'])
+    
+    @patch.object(GraphRepository, '_execute_query')
+    def test_create_arcs(self, mock_execute):
+        """Тест массового создания связей"""
+        def execute(query, parameters):
+            return [
+                {'idx': row['idx'], 'element_id': f"5:{row['idx']}", 'uri': 'T', 'node_uri_from': row['node1_uri'],
+                 'node_uri_to': row['node2_uri']}
+                for row in parameters['rows'] if row['node2_uri'] != 'missing'
+            ]
+        mock_execute.side_effect = execute
+        
+        arcs = self.repo.create_arcs([
+            ('a', 'b', 'subclass_of'),
+            ('a', 'missing'),
+            ('b', 'c', 'subclass_of', {'weight': 1}),
+        ])
+        
+        self.assertEqual([(arc.node_uri_from, arc.node_uri_to) for arc in arcs], [('a', 'b'), ('b', 'c')])
+        self.assertEqual(mock_execute.call_count, 2)
+
     @patch('graph_repository.GraphDatabase')
     def test_delete_node_by_uri(self, mock_graph_db):
         """Тест удаления узла"""
@@ -145,6 +344,7 @@ class TestGraphRepository(unittest.TestCase):
         mock_session.run.return_value = mock_result
         mock_session.__enter__ = Mock(return_value=mock_session)
         mock_session.__exit__ = Mock(return_value=None)
+        mock_session.execute_write.side_effect = lambda work: work(mock_session)
         
         self.repo.driver.session.return_value = mock_session
         
@@ -156,6 +356,65 @@ class TestGraphRepository(unittest.TestCase):
         result = self.repo.delete_node_by_uri('nonexistent')
         self.assertFalse(result)
     
+    @patch.object(GraphRepository, '_execute_summary')
+    def test_delete_in_batches(self, mock_summary):
+        """Тест массового удаления пачками с суммированием счетчиков"""
+        mock_summary.side_effect = [
+            SummaryCounters({'nodes-deleted': 2, 'relationships-deleted': 3}),
+            SummaryCounters({'nodes-deleted': 1})
+        ]
+        self.repo.cache = NodeCache()
+        for uri in ('a', 'd'):
+            self.repo.cache.put(uri, Mock())
+        counters = self.repo.delete_nodes_by_uris(iter(['a', 'b', 'c']), batch_size=2)
+        self.assertEqual(counters.nodes_deleted, 3)
+        # Итератор URI сбрасывает из кэша только удаленные узлы
+        self.assertIsNone(self.repo.cache.get('a'))
+        self.assertIsNotNone(self.repo.cache.get('d'))
+        self.assertEqual(counters.relationships_deleted, 3)
+        self.assertEqual([call[0][1]['uris'] for call in mock_summary.call_args_list], [['a', 'b'], ['c']])
+        
+        mock_summary.side_effect = [SummaryCounters({'relationships-deleted': 2})]
+        counters = self.repo.delete_arcs_by_ids(['5:1', '5:2'])
+        self.assertEqual(counters.relationships_deleted, 2)
+        self.assertIn('elementId(r) = arc_id', mock_summary.call_args[0][0])
+        
+        # Одна связь удаляется тем же запросом
+        mock_summary.side_effect = [SummaryCounters({'relationships-deleted': 1})]
+        self.assertTrue(self.repo.delete_arc_by_id('5:3'))
+        self.assertEqual(mock_summary.call_args[0], (self.repo.DELETE_ARCS_QUERY, {'arc_ids': ['5:3']}))
+
+    @patch.object(GraphRepository, '_execute_summary')
+    def test_upsert_nodes(self, mock_summary):
+        """Тест массового создания-или-обновления узлов"""
+        mock_summary.side_effect = [
+            SummaryCounters({'nodes-created': 1}),
+            SummaryCounters({'nodes-created': 1})
+        ]
+        stats = self.repo.upsert_nodes([
+            {'uri': 'class_a', 'title': 'A', 'labels': ['Class']},
+            {'uri': 'class_b', 'title': 'B', 'labels': ['Class']},
+            {'uri': 'obj_a', 'title': 'C', 'labels': ['Object']}
+        ])
+        
+        self.assertEqual(stats, TUpsertStats(created=2, updated=1))
+        query, parameters = mock_summary.call_args_list[0][0]
+        self.assertIn('MERGE (n:`Resource` {uri: row.uri})', query)
+        self.assertIn('SET n:`Class`', query)
+        self.assertEqual(parameters['rows'][0]['uri'], 'class_a')
+        self.assertEqual(parameters['rows'][0]['props'], {'title': 'A'})
+        
+        with self.assertRaises(ValueError):
+            self.repo.upsert_nodes([{'title': 'no uri'}])
+    
+    @patch.object(GraphRepository, '_execute_query')
+    def test_update_nodes(self, mock_execute):
+        """Тест массового обновления свойств узлов"""
+        mock_execute.side_effect = [[{'updated': 2}], [{'updated': 0}]]
+        updated = self.repo.update_nodes({'a': {'title': 'A'}, 'b': {'title': 'B'}, 'c': {'x': 1}}, batch_size=2)
+        self.assertEqual(updated, 2)
+        self.assertEqual(mock_execute.call_count, 2)
+
     @patch.object(GraphRepository, '_execute_query')
     def test_update_node(self, mock_execute):
         """Тест обновления узла"""
@@ -172,6 +431,918 @@ class TestGraphRepository(unittest.TestCase):
         updated_node = self.repo.update_node('nonexistent', {'description': 'Updated'})
         self.assertIsNone(updated_node)
 
+    
+    def test_unit_of_work_commits_once(self):
+        """Тест единицы работы: все запросы в одной транзакции"""
+        mock_session = self.repo.driver.session.return_value
+        mock_tx = mock_session.begin_transaction.return_value
+        mock_tx.run.return_value = [
+            Mock(data=Mock(return_value={'element_id': '4:abc123', 'uri': 'node1', 'description': '', 'title': 'A'}))
+        ]
+        
+        with self.repo.unit_of_work():
+            self.repo.create_node({'title': 'A'})
+            with self.repo.unit_of_work():
+                self.repo.get_node_by_uri('node1')
+        
+        self.assertEqual(mock_tx.run.call_count, 2)
+        mock_session.begin_transaction.assert_called_once()
+        mock_session.run.assert_not_called()
+        mock_tx.commit.assert_called_once()
+        mock_tx.rollback.assert_not_called()
+    
+    def test_unit_of_work_rollback(self):
+        """Тест отката единицы работы при ошибке"""
+        mock_tx = self.repo.driver.session.return_value.begin_transaction.return_value
+        
+        with self.assertRaises(ValueError):
+            with self.repo.unit_of_work():
+                raise ValueError("boom")
+        
+        mock_tx.rollback.assert_called_once()
+        mock_tx.commit.assert_not_called()
+        self.assertIsNone(self.repo._current_transaction())
+    
+    def test_unit_of_work_commit_error(self):
+        """Тест ошибки фиксации: исходная ошибка не скрывается откатом"""
+        mock_tx = self.repo.driver.session.return_value.begin_transaction.return_value
+        mock_tx.commit.side_effect = ConnectionError("commit failed")
+        
+        with self.assertRaises(ConnectionError):
+            with self.repo.unit_of_work():
+                pass
+        
+        mock_tx.rollback.assert_not_called()
+        mock_tx.close.assert_called_once()
+        self.assertIsNone(self.repo._current_transaction())
+    
+    @patch.object(GraphRepository, '_execute_summary')
+    def test_ensure_schema(self, mock_summary):
+        """Тест идемпотентного создания схемы"""
+        statements = self.repo.ensure_schema()
+        self.assertEqual(mock_summary.call_count, len(statements))
+        self.assertTrue(all('IF NOT EXISTS' in statement for statement in statements))
+        self.assertIn('REQUIRE n.uri IS UNIQUE', statements[0])
+        self.assertTrue(any('(n:`Class`) ON (n.uri)' in statement for statement in statements))
+    
+    @patch.object(GraphRepository, '_run_auto_commit')
+    def test_migrate_base_label(self, mock_run):
+        """Тест пакетного добавления общей метки одним проходом"""
+        mock_run.return_value = [{'updated': 3}]
+        self.assertEqual(self.repo.migrate_base_label(batch_size=2), 3)
+        mock_run.assert_called_once()
+        query, parameters = mock_run.call_args[0]
+        self.assertIn('IN TRANSACTIONS OF $batch_size ROWS', query)
+        self.assertNotIn('LIMIT', query)
+        self.assertEqual(parameters, {'batch_size': 2})
+    
+    @patch.object(GraphRepository, '_execute_query')
+    def test_query_templates_reused(self, mock_execute):
+        """Тест повторного использования текста запроса для одной формы"""
+        self.repo.templates = CypherTemplateCache()
+        mock_execute.return_value = []
+        
+        self.repo.get_nodes_by_labels(['User', 'Person'])
+        self.repo.get_nodes_by_labels(['Person', 'User'])
+        
+        first_query, second_query = [call[0][0] for call in mock_execute.call_args_list]
+        self.assertIs(first_query, second_query)
+        self.assertEqual(self.repo.templates.stats()['hits'], 1)
+        self.assertEqual(self.repo.templates.stats()['misses'], 1)
+    
+    def test_gather_runs_calls_concurrently(self):
+        """Тест параллельного выполнения независимых чтений"""
+        def slow(value):
+            time.sleep(0.2)
+            return value
+        
+        result = self.repo.gather((slow, 1), (slow, 2), lambda: slow(3), max_workers=3)
+        self.assertEqual(result.results, [1, 2, 3])
+        self.assertEqual(len(result.timings), 3)
+        self.assertTrue(all(timing >= 0.2 for timing in result.timings))
+        self.assertLess(result.seconds, 0.5)
+    
+    def test_gather_raises_first_error(self):
+        """Тест проброса ошибки вызова после завершения всех вызовов"""
+        finished = []
+        
+        def fail():
+            raise ValueError("boom")
+        
+        with self.assertRaises(ValueError):
+            self.repo.gather(fail, lambda: finished.append(True))
+        self.assertEqual(finished, [True])
+    
+    def test_gather_in_unit_of_work_is_sequential(self):
+        """Тест выполнения gather внутри unit_of_work в потоке транзакции"""
+        caller = threading.get_ident()
+        with self.repo.unit_of_work():
+            result = self.repo.gather(threading.get_ident, threading.get_ident)
+        self.assertEqual(result.results, [caller, caller])
+    
+    def test_reads_and_writes_use_managed_transactions(self):
+        """Тест выполнения чтений через execute_read, а изменений через execute_write"""
+        mock_session = self.repo.driver.session.return_value
+        
+        self.repo.get_node_by_uri('node1')
+        mock_session.execute_read.assert_called_once()
+        mock_session.execute_write.assert_not_called()
+        
+        self.repo.update_node('node1', {'title': 'A'})
+        mock_session.execute_write.assert_called_once()
+        self.repo.driver.session.assert_called_with(database='test-db', bookmark_manager=self.repo.bookmark_manager)
+    
+    def test_run_custom_query_is_auto_commit(self):
+        """Тест выполнения произвольного запроса в неявной транзакции"""
+        mock_session = self.repo.driver.session.return_value
+        
+        self.repo.run_custom_query("CALL db.awaitIndexes()")
+        mock_session.run.assert_called_once_with("CALL db.awaitIndexes()", {})
+        mock_session.execute_read.assert_not_called()
+        mock_session.execute_write.assert_not_called()
+    
+    def test_query_hooks(self):
+        """Тест передачи событий запросов обработчикам и агрегации по шаблонам"""
+        mock_session = self.repo.driver.session.return_value
+        result = MagicMock()
+        result.__iter__.return_value = iter([Mock(data=Mock(return_value={'updated': 2}))])
+        result.consume.return_value = Mock(result_available_after=3, result_consumed_after=4)
+        mock_session.run.return_value = result
+        events = []
+        stats = QueryStats()
+        self.repo.add_query_hook(events.append)
+        self.repo.add_query_hook(stats)
+        
+        self.repo.update_nodes({'a': {'title': 'A'}, 'b': {'title': 'B'}})
+        
+        event = events[0]
+        self.assertEqual(event.template, ' '.join(self.repo.UPDATE_NODES_QUERY.split()))
+        self.assertEqual(event.parameter_sizes, {'rows': 2})
+        self.assertEqual(event.rows, 1)
+        self.assertEqual((event.result_available_after, event.result_consumed_after), (3, 4))
+        snapshot = stats.snapshot()[event.template]
+        self.assertEqual(snapshot['count'], 1)
+        self.assertEqual(snapshot['available_after_ms'], 3)
+        self.assertEqual(snapshot['seconds']['count'], 1)
+        self.assertIn('neo4j_query_seconds_count', stats.to_prometheus())
+    
+    def test_query_hooks_record_errors(self):
+        """Тест учета ошибок запросов"""
+        mock_session = self.repo.driver.session.return_value
+        mock_session.run.side_effect = RuntimeError('boom')
+        stats = QueryStats()
+        self.repo.add_query_hook(stats)
+        
+        with self.assertRaises(RuntimeError):
+            self.repo.delete_node_by_uri('node1')
+        
+        snapshot = stats.snapshot()[' '.join(self.repo.DELETE_NODE_QUERY.split())]
+        self.assertEqual((snapshot['count'], snapshot['errors']), (1, 1))
+    
+    def test_query_stats_bounded_templates(self):
+        """Тест ограничения числа шаблонов в статистике запросов"""
+        stats = QueryStats(max_templates=2)
+        for index in range(5):
+            stats(TQueryEvent(template=f'MATCH (n) SET n.field_{index} = 1', parameter_sizes={}, access_mode=WRITE_ACCESS, seconds=0.01))
+        stats(TQueryEvent(template='MATCH (n) SET n.field_0 = 1', parameter_sizes={}, access_mode=WRITE_ACCESS, seconds=0.01))
+        
+        snapshot = stats.snapshot()
+        self.assertEqual(len(snapshot), 3)
+        self.assertEqual(snapshot['MATCH (n) SET n.field_0 = 1']['count'], 2)
+        self.assertEqual(snapshot[QueryStats.OTHER_TEMPLATE]['count'], 3)
+    
+    def test_slow_query_log_profiles_reads(self):
+        """Тест записи медленного чтения в журнал с планом PROFILE"""
+        mock_session = self.repo.driver.session.return_value
+        profile = {
+            'operatorType': 'ProduceResults', 'args': {'Details': 'n'}, 'dbHits': 0, 'rows': 1,
+            'children': [{'operatorType': 'AllNodesScan', 'args': {'Details': 'n'}, 'dbHits': 100, 'rows': 100}]
+        }
+        mock_session.run.return_value = Mock(**{'consume.return_value': Mock(profile=profile)})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow.jsonl')
+            log = SlowQueryLog(path, threshold=0.5, profile_rate=1.0)
+            log.attach(self.repo)
+            
+            event = TQueryEvent('MATCH (n {uri: $uri}) RETURN n', {'uri': 1}, READ_ACCESS, seconds=0.1,
+                                parameters={'uri': 'node1'})
+            self.repo.query_hooks[0](event)
+            event.seconds = 2.0
+            self.repo.query_hooks[0](event)
+            
+            entries = SlowQueryLog.read(path)
+            log.close()
+        
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['parameters'], {'uri': 'node1'})
+        self.assertEqual(entries[0]['plan_mode'], 'PROFILE')
+        self.assertEqual(entries[0]['db_hits'], 100)
+        self.assertEqual(entries[0]['plan']['children'][0]['operator'], 'AllNodesScan')
+        mock_session.run.assert_called_once_with('PROFILE MATCH (n {uri: $uri}) RETURN n', {'uri': 'node1'})
+    
+    def test_slow_query_log_explains_writes(self):
+        """Тест снятия только EXPLAIN для изменяющих запросов"""
+        mock_session = self.repo.driver.session.return_value
+        mock_session.run.return_value = Mock(**{'consume.return_value': Mock(plan={'operatorType': 'Create'})})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow.jsonl')
+            log = SlowQueryLog(path, threshold=0.0, profile_rate=1.0)
+            log.observe(TQueryEvent('CREATE (n)', {}, 'WRITE', seconds=1.0), self.repo)
+            entries = SlowQueryLog.read(path)
+            log.close()
+        
+        self.assertEqual(entries[0]['plan_mode'], 'EXPLAIN')
+        mock_session.run.assert_called_once_with('EXPLAIN CREATE (n)', {})
+
+class AsyncRecords:
+    """Асинхронно итерируемый результат запроса для тестов"""
+    
+    def __init__(self, records):
+        self.records = records
+    
+    async def __aiter__(self):
+        for record in self.records:
+            yield record
+
+
+class TestAsyncGraphRepository(unittest.IsolatedAsyncioTestCase):
+    """Тесты для AsyncGraphRepository"""
+    
+    def setUp(self):
+        """Настройка тестов"""
+        self.repo = AsyncGraphRepository(
+            uri='bolt://localhost:7687',
+            user='neo4j',
+            password='test',
+            database='test-db',
+            driver=Mock()
+        )
+        self.session = MagicMock()
+        self.session.__aenter__.return_value = self.session
+        self.session.run = AsyncMock(return_value=AsyncRecords([]))
+        self.tx = AsyncMock()
+        self.session.begin_transaction = AsyncMock(return_value=self.tx)
+        
+        async def run_work(work):
+            return await work(self.session)
+        
+        self.session.execute_read = AsyncMock(side_effect=run_work)
+        self.session.execute_write = AsyncMock(side_effect=run_work)
+        self.repo.driver.session.return_value = self.session
+    
+    @patch.object(AsyncGraphRepository, '_execute_query', new_callable=AsyncMock)
+    async def test_get_node_by_uri(self, mock_execute):
+        """Тест получения узла по URI"""
+        mock_execute.return_value = [{
+            'element_id': '4:abc123',
+            'uri': 'test_uri',
+            'description': 'Test description',
+            'title': 'Test title'
+        }]
+        
+        node = await self.repo.get_node_by_uri('test_uri')
+        self.assertIsInstance(node, TNode)
+        self.assertEqual(node.uri, 'test_uri')
+        self.assertIn(':Resource {uri: $uri}', mock_execute.call_args[0][0])
+    
+    async def test_iter_all_nodes_and_arcs(self):
+        """Тест асинхронного потокового чтения узлов со связями"""
+        self.session.run.return_value = AsyncRecords([
+            Record([('element_id', '4:1'), ('uri', 'node1'), ('description', ''), ('title', 'A'),
+                    ('arcs', [['5:1', 'RELATES_TO', 'node2']])]),
+            Record([('element_id', '4:2'), ('uri', 'node2'), ('description', ''), ('title', 'B'), ('arcs', [])])
+        ])
+        
+        nodes = [node async for node in self.repo.iter_all_nodes_and_arcs(fetch_size=100)]
+        self.assertEqual([node.uri for node in nodes], ['node1', 'node2'])
+        self.assertEqual(nodes[0].arcs, [TArc('5:1', 'RELATES_TO', 'node1', 'node2')])
+        self.repo.driver.session.assert_called_once_with(
+            database='test-db', bookmark_manager=self.repo.bookmark_manager,
+            default_access_mode=READ_ACCESS, fetch_size=100
+        )
+    
+    async def test_unit_of_work_commits_once(self):
+        """Тест асинхронной единицы работы: все запросы в одной транзакции"""
+        self.tx.run.return_value = AsyncRecords([
+            Mock(data=Mock(return_value={'element_id': '4:abc123', 'uri': 'node1', 'description': '', 'title': 'A'}))
+        ])
+        
+        async with self.repo.unit_of_work():
+            await self.repo.create_node({'title': 'A'})
+            async with self.repo.unit_of_work():
+                await self.repo.get_node_by_uri('node1')
+        
+        self.assertEqual(self.tx.run.call_count, 2)
+        self.session.run.assert_not_called()
+        self.tx.commit.assert_awaited_once()
+        self.tx.rollback.assert_not_called()
+        self.assertIsNone(self.repo._current_transaction())
+    
+    async def test_unit_of_work_rollback(self):
+        """Тест отката асинхронной единицы работы при ошибке"""
+        with self.assertRaises(ValueError):
+            async with self.repo.unit_of_work():
+                raise ValueError("boom")
+        
+        self.tx.rollback.assert_awaited_once()
+        self.tx.commit.assert_not_called()
+        self.assertIsNone(self.repo._current_transaction())
+    
+    async def test_unit_of_work_commit_error(self):
+        """Тест ошибки фиксации асинхронной единицы работы без отката"""
+        self.tx.commit.side_effect = ConnectionError("commit failed")
+        
+        with self.assertRaises(ConnectionError):
+            async with self.repo.unit_of_work():
+                pass
+        
+        self.tx.rollback.assert_not_called()
+        self.assertIsNone(self.repo._current_transaction())
+    
+    async def test_gather(self):
+        """Тест конкурентного выполнения независимых чтений"""
+        async def slow(value):
+            await asyncio.sleep(0.2)
+            return value
+        
+        result = await self.repo.gather((slow, 1), (slow, 2), (slow, 3), max_workers=3)
+        self.assertEqual(result.results, [1, 2, 3])
+        self.assertEqual(len(result.timings), 3)
+        self.assertLess(result.seconds, 0.5)
+
+
+class TestSharedDriver(unittest.TestCase):
+    """Тесты для общего драйвера процесса"""
+    
+    def tearDown(self):
+        graph_repository._shared_drivers.clear()
+    
+    @patch('graph_repository.GraphDatabase')
+    def test_shared_driver_is_reused(self, mock_graph_db):
+        """Тест повторного использования общего драйвера"""
+        repo1 = GraphRepository.from_shared_driver('bolt://localhost:7687', 'neo4j', 'test', 'test-db')
+        repo2 = GraphRepository.from_shared_driver('bolt://localhost:7687', 'neo4j', 'test', 'test-db')
+        self.assertIs(repo1.driver, repo2.driver)
+        mock_graph_db.driver.assert_called_once()
+        
+        # Закрытие репозитория не закрывает общий драйвер
+        repo1.close()
+        repo1.driver.close.assert_not_called()
+    
+    @patch('graph_repository.GraphDatabase')
+    def test_shared_driver_recreated_in_other_process(self, mock_graph_db):
+        """Тест пересоздания драйвера в дочернем процессе"""
+        driver = graph_repository.get_shared_driver('bolt://localhost:7687', 'neo4j', 'test')
+        with patch('graph_repository.os.getpid', return_value=-1):
+            child_driver = graph_repository.get_shared_driver('bolt://localhost:7687', 'neo4j', 'test')
+        self.assertEqual(mock_graph_db.driver.call_count, 2)
+        driver.close.assert_not_called()
+    
+    @patch('graph_repository.GraphDatabase')
+    def test_shared_driver_retry_config(self, mock_graph_db):
+        """Тест передачи времени повторов транзакций общему драйверу"""
+        GraphRepository.from_shared_driver('bolt://localhost:7687', 'neo4j', 'test', 'test-db',
+                                           max_transaction_retry_time=5)
+        mock_graph_db.driver.assert_called_once_with('bolt://localhost:7687', auth=('neo4j', 'test'),
+                                                     max_transaction_retry_time=5)
+    
+    @patch('graph_repository.GraphDatabase')
+    def test_shared_driver_pool_config(self, mock_graph_db):
+        """Тест передачи настроек пула общему драйверу"""
+        pool = PoolConfig(max_connection_pool_size=20, connection_acquisition_timeout=5)
+        GraphRepository.from_shared_driver('bolt://localhost:7687', 'neo4j', 'test', 'test-db', pool=pool)
+        mock_graph_db.driver.assert_called_once_with('bolt://localhost:7687', auth=('neo4j', 'test'),
+                                                     max_connection_pool_size=20,
+                                                     connection_acquisition_timeout=5)
+
+
+class TestPoolMetrics(unittest.TestCase):
+    """Тесты для метрик пула соединений"""
+    
+    def make_driver(self, acquire):
+        """Драйвер с поддельным пулом из занятого и свободного соединений"""
+        pool = Mock()
+        pool.acquire = acquire
+        pool.connections = {'localhost:7687': [Mock(in_use=True), Mock(in_use=False)]}
+        pool.pool_config.max_connection_pool_size = 10
+        return Mock(_pool=pool)
+    
+    def test_acquire_latency_and_timeouts(self):
+        """Тест учета времени получения соединения и таймаутов"""
+        timeout = ClientError('failed to obtain a connection from the pool within 1.0s')
+        driver = self.make_driver(Mock(side_effect=['connection', timeout]))
+        metrics = PoolMetrics(driver)
+        
+        self.assertEqual(driver._pool.acquire('WRITE', 1.0, None, None, None, None), 'connection')
+        with self.assertRaises(ClientError):
+            driver._pool.acquire('WRITE', 1.0, None, None, None, None)
+        
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['max_size'], 10)
+        self.assertEqual((snapshot['in_use'], snapshot['idle']), (1, 1))
+        self.assertEqual((snapshot['acquisitions'], snapshot['timeouts']), (2, 1))
+        self.assertEqual(snapshot['acquire_latency_seconds']['count'], 2)
+        self.assertEqual(snapshot['acquire_latency_seconds']['buckets']['+Inf'], 2)
+    
+    def test_driver_without_pool(self):
+        """Тест драйвера без внутреннего пула: метрики не собираются"""
+        metrics = PoolMetrics(Mock(spec=[]))
+        
+        self.assertFalse(metrics.supported)
+        snapshot = metrics.snapshot()
+        self.assertIsNone(snapshot['in_use'])
+        self.assertIsNone(snapshot['acquire_latency_seconds'])
+    
+    def test_async_acquire(self):
+        """Тест обертки асинхронного получения соединения"""
+        driver = self.make_driver(AsyncMock(return_value='connection'))
+        metrics = PoolMetrics(driver)
+        
+        self.assertEqual(asyncio.run(driver._pool.acquire()), 'connection')
+        self.assertEqual(metrics.snapshot()['acquisitions'], 1)
+    
+    def test_histogram_buckets(self):
+        """Тест накопительных корзин гистограммы"""
+        histogram = LatencyHistogram((0.1, 1.0))
+        for seconds in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(seconds)
+        
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets'], {'0.1': 1, '1.0': 3, '+Inf': 4})
+        self.assertEqual(snapshot['count'], 4)
+        self.assertEqual(snapshot['max'], 3.0)
+    
+    def test_repository_pool_config(self):
+        """Тест передачи настроек пула собственному драйверу репозитория"""
+        with patch('graph_repository.GraphDatabase') as mock_graph_db:
+            repo = GraphRepository('bolt://localhost:7687', 'neo4j', 'test',
+                                   pool=PoolConfig(max_connection_pool_size=5, liveness_check_timeout=30))
+        mock_graph_db.driver.assert_called_once_with('bolt://localhost:7687', auth=('neo4j', 'test'),
+                                                     max_connection_pool_size=5, liveness_check_timeout=30)
+        self.assertIn('acquire_latency_seconds', repo.pool_metrics())
+
+
+class TestBufferedGraphWriter(unittest.TestCase):
+    """Тесты для буфера отложенной записи"""
+    
+    def setUp(self):
+        """Репозиторий, записывающий вызовы в общий журнал"""
+        self.calls = []
+        self.repo = Mock()
+        self.repo.generate_random_string.return_value = 'abc'
+        self.repo.create_nodes.side_effect = lambda nodes, size: self.calls.append(('nodes', list(nodes)))
+        self.repo.update_nodes.side_effect = lambda updates, size: self.calls.append(('updates', dict(updates)))
+        
+        def create_arcs(arcs, size):
+            self.calls.append(('arcs', list(arcs)))
+            return [Mock() for arc in arcs if arc[1] != 'missing']
+        self.repo.create_arcs.side_effect = create_arcs
+    
+    def test_flush_order_and_buffered_updates(self):
+        """Тест записи узлов до связей и объединения обновлений с созданием"""
+        writer = BufferedGraphWriter(self.repo, batch_size=100, background=False)
+        uri = writer.create_node({'title': 'A', 'labels': ['Class']})
+        writer.create_arc(uri, 'existing')
+        writer.create_arc(uri, 'missing', 'HAS')
+        writer.update_node(uri, {'title': 'B'})
+        writer.update_node('existing', {'title': 'C'})
+        self.assertEqual(writer.pending, 4)
+        self.repo.create_nodes.assert_not_called()
+        
+        stats = writer.flush()
+        
+        self.assertEqual(uri, 'node_abc')
+        self.assertEqual([call[0] for call in self.calls], ['nodes', 'updates', 'arcs'])
+        self.assertEqual(self.calls[0][1], [{'title': 'B', 'labels': ['Class'], 'uri': 'node_abc'}])
+        self.assertEqual(self.calls[1][1], {'existing': {'title': 'C'}})
+        self.assertEqual((stats.nodes, stats.updates, stats.arcs, stats.arcs_skipped), (1, 1, 1, 1))
+        self.assertEqual(writer.pending, 0)
+    
+    def test_flush_by_size(self):
+        """Тест сброса при заполнении пачки"""
+        writer = BufferedGraphWriter(self.repo, batch_size=2, background=False)
+        writer.create_node({'uri': 'a'})
+        self.repo.create_nodes.assert_not_called()
+        writer.create_node({'uri': 'b'})
+        self.assertEqual(self.calls, [('nodes', [{'uri': 'a'}, {'uri': 'b'}])])
+    
+    def test_background_flush_by_age_and_close(self):
+        """Тест фонового сброса по возрасту и записи остатка при закрытии"""
+        flushed = threading.Event()
+        with BufferedGraphWriter(self.repo, batch_size=100, max_age=0.01,
+                                 on_flush=lambda stats: flushed.set()) as writer:
+            writer.create_node({'uri': 'a'})
+            self.assertTrue(flushed.wait(5))
+            writer.create_node({'uri': 'b'})
+        
+        self.assertEqual(writer.stats.nodes, 2)
+        with self.assertRaises(RuntimeError):
+            writer.create_node({'uri': 'c'})
+    
+    def test_background_error_raised_to_producer(self):
+        """Тест передачи ошибки фоновой записи производителю"""
+        self.repo.create_nodes.side_effect = RuntimeError('boom')
+        writer = BufferedGraphWriter(self.repo, batch_size=1)
+        with self.assertRaises(RuntimeError):
+            for index in range(100):
+                writer.create_node({'uri': f'n{index}'})
+                time.sleep(0.01)
+        self.repo.create_nodes.side_effect = None
+        writer.close()
+
+
+class TestMemoryGraphRepository(unittest.TestCase):
+    """Тесты для MemoryGraphRepository"""
+    
+    def setUp(self):
+        self.repo = MemoryGraphRepository(cache=NodeCache())
+    
+    def test_nodes_and_arcs(self):
+        """Тест создания узлов и связей и чтения их с исходящими связями"""
+        params = {'title': 'A', 'labels': ['Class']}
+        node_a = self.repo.create_node(params)
+        node_b = self.repo.create_node({'uri': 'b', 'title': 'B', 'description': None})
+        arc = self.repo.create_arc(node_a.uri, 'b', 'subclass_of')
+        
+        self.assertEqual(params, {'title': 'A', 'uri': node_a.uri})
+        self.assertEqual(self.repo.get_nodes_by_labels(['Class']), [node_a])
+        self.assertEqual((arc.uri, arc.node_uri_from, arc.node_uri_to), ('subclass_of', node_a.uri, 'b'))
+        nodes = self.repo.get_all_nodes_and_arcs()
+        self.assertEqual(nodes[0].arcs, [arc])
+        self.assertEqual(nodes[1], node_b)
+        with self.assertRaises(Exception):
+            self.repo.create_arc(node_a.uri, 'missing')
+    
+    def test_pages_follow_uri_order(self):
+        """Тест страниц по ключу (uri, elementId)"""
+        self.repo.create_nodes([{'uri': uri} for uri in ('c', 'a', 'b')])
+        first = self.repo.get_nodes_page(2)
+        second = self.repo.get_nodes_page(2, first.next_cursor)
+        
+        self.assertEqual([node.uri for node in first.items + second.items], ['a', 'b', 'c'])
+        self.assertIsNone(second.next_cursor)
+        with self.assertRaises(ValueError):
+            self.repo.get_nodes_page(0)
+    
+    def test_unit_of_work_rolls_back(self):
+        """Тест отката изменений unit_of_work при исключении"""
+        self.repo.create_nodes([{'uri': 'a'}, {'uri': 'b'}])
+        self.repo.create_arcs([('a', 'b', 'LINK'), ('a', 'missing', 'LINK')])
+        
+        with self.assertRaises(RuntimeError):
+            with self.repo.unit_of_work():
+                self.repo.update_node('a', {'title': 'new'})
+                self.repo.delete_node_by_uri('b')
+                raise RuntimeError
+        
+        self.assertIsNone(self.repo.get_node_by_uri('a').title)
+        self.assertEqual(len(self.repo.get_all_nodes_and_arcs()[0].arcs), 1)
+    
+    def test_bulk_operations(self):
+        """Тест upsert, массового обновления и удаления"""
+        self.repo.create_nodes([{'uri': 'a'}, {'uri': 'b'}])
+        self.repo.create_arc('a', 'b')
+        self.assertEqual(self.repo.get_node_by_uri('a').title, None)
+        
+        stats = self.repo.upsert_nodes([{'uri': 'a', 'title': 'A', 'labels': ['Class']}, {'uri': 'c'}])
+        self.assertEqual(stats, TUpsertStats(created=1, updated=1))
+        self.assertEqual(self.repo.get_node_by_uri('a').title, 'A')
+        self.assertEqual(self.repo.update_nodes({'b': {'title': 'B'}, 'x': {'title': 'X'}}), 1)
+        
+        counters = self.repo.delete_nodes_by_uris(['a', 'c'])
+        self.assertEqual((counters.nodes_deleted, counters.relationships_deleted), (2, 1))
+        self.assertEqual([node.uri for node in self.repo.get_all_nodes()], ['b'])
+        
+        # Повторно переданный узел удаляется и считается один раз
+        nodes = self.repo.graph.find('b')
+        self.assertEqual(self.repo._delete_nodes(nodes + nodes), (1, 0))
+        self.assertEqual(self.repo._delete_nodes(nodes), (0, 0))
+    
+    def test_shared_graph(self):
+        """Тест общего графа нескольких репозиториев"""
+        graph = MemoryGraph()
+        MemoryGraphRepository(graph=graph).create_node({'uri': 'a'})
+        self.assertEqual(MemoryGraphRepository(graph=graph).get_node_by_uri('a').uri, 'a')
+        # Произвольный Cypher графом в памяти не выполняется: методы есть, но вызывают TypeError
+        with self.assertRaises(TypeError):
+            self.repo.run_custom_query('MATCH (n) RETURN n')
+        with self.assertRaises(TypeError):
+            self.repo.iter_query('MATCH (n) RETURN n')
+        with self.assertRaises(TypeError):
+            self.repo._execute_query('MATCH (n) RETURN n')
+        self.assertIsNone(self.repo.driver)
+        self.assertIs(self.repo.templates, graph_repository.QUERY_TEMPLATES)
+
+
+class TestOntologyRepository(unittest.TestCase):
+    """Тесты для OntologyRepository"""
+    
+    def setUp(self):
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ontology-repository'))
+        from ontology_repository import OntologyRepository
+        self.repo = OntologyRepository('bolt://localhost:7687', 'neo4j', 'test', driver=Mock(), cache=NodeCache())
+        self.repo._execute_query = Mock(return_value=[
+            {'element_id': '4:1', 'uri': 'obj_attr_1', 'description': 'd', 'title': 'related'}
+        ])
+        self.repo.unit_of_work = MagicMock()
+    
+    def test_compound_mutator_runs_one_query(self):
+        """Тест создания ObjectProperty со связями одним запросом"""
+        self.repo.cache.put('class_a', Mock(), 'signature')
+        
+        node = self.repo.add_class_object_attribute('class_a', 'related', 'class_b')
+        
+        self.assertEqual(node.uri, 'obj_attr_1')
+        self.repo._execute_query.assert_called_once()
+        query, parameters = self.repo._execute_query.call_args[0]
+        self.assertIn("FOREACH (m IN targets_1 | CREATE (n)-[:`points_to`]->(m))", query)
+        self.assertEqual((parameters['link_0'], parameters['link_1']), ('class_a', 'class_b'))
+        self.assertEqual(parameters['props']['title'], 'related')
+        self.assertNotIn('labels', parameters['props'])
+        self.assertIsNone(self.repo.cache.get('class_a', 'signature'))
+    
+    def test_compound_mutator_missing_target(self):
+        """Тест ошибки, если узел-цель связи не найден"""
+        self.repo._execute_query.return_value = []
+        with self.assertRaises(Exception):
+            self.repo.create_class('Child', 'c', 'missing')
+        query, _ = self.repo._execute_query.call_args[0]
+        self.assertIn("WHERE size(targets_0) > 0", query)
+    
+    def test_create_object_runs_one_query(self):
+        """Тест создания объекта со всеми свойствами одним запросом"""
+        self.repo.create_object('class_a', {'title': 'o', 'size': 3, 'color': 'red', 'empty': None})
+        
+        self.repo._execute_query.assert_called_once()
+        query, parameters = self.repo._execute_query.call_args[0]
+        self.assertIn("CREATE (n)-[:`size`]->(:`Property`:`Resource` $property_0)", query)
+        self.assertIn("CREATE (n)-[:`color`]->(:`Property`:`Resource` $property_1)", query)
+        self.assertNotIn("$property_2", query)
+        self.assertEqual(parameters['property_1']['value'], 'red')
+        self.assertNotEqual(parameters['property_0']['uri'], parameters['property_1']['uri'])
+    
+    def test_update_object_applies_diff(self):
+        """Тест обновления только изменившихся свойств объекта"""
+        self.repo._execute_query.side_effect = [
+            [{'element_id': '4:1', 'uri': 'obj_1', 'description': '', 'title': 'o',
+              'properties': [['size', 'prop_1', '3'], ['color', 'prop_2', 'red'], ['old', 'prop_3', 'x']]}],
+            [{'updated': 1}]
+        ]
+        
+        update = self.repo.update_object_fields('obj_1', {'title': 'o', 'size': 4, 'color': 'red', 'weight': 2})
+        
+        self.assertEqual((update.inserted, update.updated, update.deleted), (['weight'], ['size'], ['old']))
+        self.assertEqual(update.obj.title, 'o')
+        query, parameters = self.repo._execute_query.call_args[0]
+        self.assertEqual(parameters['props'], {})
+        self.assertEqual(parameters['values'], {'prop_1': '4'})
+        self.assertEqual(parameters['deleted'], ['prop_3'])
+        self.assertEqual(parameters['property_0']['value'], '2')
+        self.assertIn("CREATE (obj)-[:`weight`]->(:`Property`:`Resource` $property_0)", query)
+    
+    def test_update_object_without_changes(self):
+        """Тест обновления объекта без изменений: запрос записи не выполняется"""
+        self.repo._execute_query.return_value = [
+            {'element_id': '4:1', 'uri': 'obj_1', 'description': '', 'title': 'o', 'properties': [['size', 'prop_1', '3']]}
+        ]
+        update = self.repo.update_object_fields('obj_1', {'title': 'o', 'size': 3})
+        
+        self.assertEqual(update.changed, [])
+        self.repo._execute_query.assert_called_once()
+    
+    def test_update_object_empty_fields_unchanged(self):
+        """Тест сравнения отсутствующих и пустых title/description как равных"""
+        self.repo._execute_query.return_value = [
+            {'element_id': '4:1', 'uri': 'obj_1', 'description': None, 'title': '', 'properties': []}
+        ]
+        update = self.repo.update_object_fields('obj_1', {'title': None, 'description': ''})
+        
+        self.assertEqual(update.changed, [])
+        self.repo._execute_query.assert_called_once()
+    
+    def test_create_objects_in_chunks(self):
+        """Тест массового создания объектов пачками UNWIND"""
+        from ontology_repository import Signature, SignatureParam
+        self.repo.get_class = Mock(return_value=Mock())
+        self.repo.collect_signature = Mock(return_value=Signature(
+            params=[SignatureParam(title='name', uri='attr_1'), SignatureParam(title='age', uri='attr_2')],
+            obj_params=[]
+        ))
+        self.repo._execute_query.side_effect = lambda query, parameters: [
+            {'idx': row['idx'], 'element_id': f"4:{row['idx']}", 'uri': row['props']['uri'],
+             'description': '', 'title': row['props']['title']}
+            for row in parameters['rows']
+        ]
+        chunks = []
+        
+        nodes = self.repo.create_objects('class_a', [{'title': 'a', 'name': 'A'}, {'title': 'b'}, {'title': 'c', 'name': 'C'}],
+                                         batch_size=2, on_chunk=chunks.append)
+        
+        self.assertEqual([node.title for node in nodes], ['a', 'b', 'c'])
+        self.assertEqual([chunk.size for chunk in chunks], [2, 1])
+        query, parameters = self.repo._execute_query.call_args_list[0][0]
+        self.assertIn("FOREACH (property IN row.properties_0 | CREATE (n)-[:`name`]->", query)
+        self.assertNotIn("`age`", query)
+        self.assertEqual(parameters['rows'][1]['properties_0'], [])
+        self.assertEqual(parameters['rows'][0]['properties_0'][0]['value'], 'A')
+    
+    def test_create_objects_validates_signature(self):
+        """Тест проверки строк по signature класса до записи"""
+        from ontology_repository import Signature
+        self.repo.get_class = Mock(return_value=Mock())
+        self.repo.collect_signature = Mock(return_value=Signature(params=[], obj_params=[]))
+        
+        with self.assertRaises(ValueError):
+            self.repo.create_objects('class_a', [{'title': 'a'}, {'title': 'b', 'unknown': 1}])
+        self.repo._execute_query.assert_not_called()
+    
+    def test_collect_signature_with_ancestors(self):
+        """Тест signature с параметрами предков одним запросом и разрешением переопределений"""
+        self.repo._execute_query.return_value = [
+            {'class_uri': 'grand', 'depth': 2, 'uri': 'attr_4', 'title': 'age', 'is_object': False, 'target_class_uri': None},
+            {'class_uri': 'parent_b', 'depth': 1, 'uri': 'attr_3', 'title': 'name', 'is_object': False, 'target_class_uri': None},
+            {'class_uri': 'parent_a', 'depth': 1, 'uri': 'attr_2', 'title': 'name', 'is_object': False, 'target_class_uri': None},
+            {'class_uri': 'grand', 'depth': 2, 'uri': 'obj_attr_1', 'title': 'owner', 'is_object': True, 'target_class_uri': 'person'},
+            {'class_uri': 'child', 'depth': 0, 'uri': 'attr_1', 'title': 'age', 'is_object': False, 'target_class_uri': None},
+        ]
+        
+        signature = self.repo.collect_signature('child')
+        
+        self.repo._execute_query.assert_called_once()
+        query, parameters = self.repo._execute_query.call_args[0]
+        # Без перебора всех путей: DISTINCT предков и кратчайший путь до каждого
+        self.assertIn("WITH DISTINCT c, ancestor", query)
+        self.assertIn("shortestPath((c)-[:subclass_of*1..]->(ancestor))", query)
+        self.assertNotIn("min(length(path))", query)
+        self.assertEqual(parameters, {'class_uri': 'child'})
+        self.assertEqual([(param.uri, param.source_class_uri) for param in signature.params],
+                         [('attr_1', 'child'), ('attr_2', 'parent_a')])
+        self.assertEqual([(param.uri, param.target_class_uri, param.source_class_uri) for param in signature.obj_params],
+                         [('obj_attr_1', 'person', 'grand')])
+        self.assertIs(self.repo.collect_signature('child'), signature)
+
+
+class TestMemoryOntologyRepository(unittest.TestCase):
+    """Тесты для MemoryOntologyRepository"""
+    
+    def setUp(self):
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ontology-repository'))
+        from ontology_repository import MemoryOntologyRepository
+        self.repo = MemoryOntologyRepository(cache=NodeCache())
+    
+    def test_classes_and_signature(self):
+        """Тест классов, атрибутов и signature"""
+        parent = self.repo.create_class('Parent', 'p')
+        child = self.repo.create_class('Child', 'c', parent.uri)
+        attr = self.repo.add_class_attribute(parent.uri, 'name')
+        obj_attr = self.repo.add_class_object_attribute(parent.uri, 'related', child.uri)
+        
+        self.assertEqual(self.repo.get_class_parents(child.uri), [parent])
+        self.assertEqual(self.repo.get_class_children(parent.uri), [child])
+        self.assertEqual(self.repo.get_ontology_parent_classes(), [parent])
+        signature = self.repo.collect_signature(parent.uri)
+        self.assertEqual([param.uri for param in signature.params], [attr.uri])
+        self.assertEqual([(param.uri, param.target_class_uri) for param in signature.obj_params],
+                         [(obj_attr.uri, child.uri)])
+        
+        self.assertTrue(self.repo.delete_class_attribute(parent.uri, attr.uri))
+        self.assertEqual(self.repo.collect_signature(parent.uri).params, [])
+    
+    def test_inherited_signature(self):
+        """Тест signature класса с параметрами предков и переопределением"""
+        parent = self.repo.create_class('Parent', 'p')
+        child = self.repo.create_class('Child', 'c', parent.uri)
+        parent_name = self.repo.add_class_attribute(parent.uri, 'name')
+        self.assertEqual([(param.uri, param.source_class_uri) for param in self.repo.collect_signature(child.uri).params],
+                         [(parent_name.uri, parent.uri)])
+        
+        # Новый атрибут предка сбрасывает закэшированную signature потомка
+        parent_age = self.repo.add_class_attribute(parent.uri, 'age')
+        child_name = self.repo.add_class_attribute(child.uri, 'name')
+        signature = self.repo.collect_signature(child.uri)
+        self.assertEqual({(param.uri, param.source_class_uri) for param in signature.params},
+                         {(child_name.uri, child.uri), (parent_age.uri, parent.uri)})
+        self.assertEqual(signature.params[0].uri, child_name.uri)
+        
+        other = self.repo.create_class('Other', 'o')
+        related = self.repo.add_class_object_attribute(other.uri, 'related', parent.uri)
+        self.assertTrue(self.repo.add_class_parent(other.uri, child.uri))
+        self.assertEqual([(param.uri, param.source_class_uri) for param in self.repo.collect_signature(child.uri).obj_params],
+                         [(related.uri, other.uri)])
+    
+    def test_diamond_signature(self):
+        """Тест signature на цепочке ромбов: каждый предок учитывается один раз на кратчайшем расстоянии"""
+        top = self.repo.create_class('Top', 't')
+        top_attr = self.repo.add_class_attribute(top.uri, 'name')
+        lower = top
+        # 2^30 путей до вершины при 90 предках
+        for level in range(30):
+            left = self.repo.create_class(f'Left {level}', 'l', lower.uri)
+            right = self.repo.create_class(f'Right {level}', 'r', lower.uri)
+            lower = self.repo.create_class(f'Bottom {level}', 'b', left.uri)
+            self.assertTrue(self.repo.add_class_parent(right.uri, lower.uri))
+        right_attr = self.repo.add_class_attribute(right.uri, 'name')
+        
+        signature = self.repo.collect_signature(lower.uri)
+        # Ближний предок переопределяет параметр вершины с тем же названием
+        self.assertEqual([(param.uri, param.source_class_uri) for param in signature.params],
+                         [(right_attr.uri, right.uri)])
+        self.assertEqual([param.uri for param in self.repo.collect_signature(left.uri).params], [top_attr.uri])
+    
+    def test_objects(self):
+        """Тест создания и обновления объекта со свойствами"""
+        cls = self.repo.create_class('Class', 'c')
+        obj = self.repo.create_object(cls.uri, {'title': 'o', 'size': 1, 'color': 'red'})
+        property_ids = [node.id for node in self.repo.get_nodes_by_labels(['Property'])]
+        update = self.repo.update_object_fields(obj.uri, {'title': 'o2', 'size': 2})
+        
+        self.assertEqual((update.inserted, update.updated, update.deleted), ([], ['title', 'size'], ['color']))
+        self.assertEqual(self.repo.get_class_objects(cls.uri)[0].title, 'o2')
+        # update_object по-прежнему возвращает обновленный узел
+        self.assertEqual(self.repo.update_object(obj.uri, {'title': 'o2', 'size': 2}), update.obj)
+        self.assertIsNone(self.repo.update_object('missing', {'title': 'x'}))
+        # Измененное свойство сохранило узел, удаленное - удалено
+        properties = self.repo.get_nodes_by_labels(['Property'])
+        self.assertEqual([(node.id, node.uri) for node in properties][0][0], property_ids[0])
+        self.assertEqual(len(properties), 1)
+        obj_node = next(node for node in self.repo.get_all_nodes_and_arcs() if node.uri == obj.uri)
+        self.assertEqual([arc.node_uri_to for arc in obj_node.arcs if arc.uri == 'size'],
+                         [node.uri for node in properties])
+        
+        self.assertTrue(self.repo.delete_class(cls.uri))
+        self.assertEqual(self.repo.get_all_nodes(), properties)
+    
+    def test_create_objects(self):
+        """Тест массового создания объектов класса"""
+        cls = self.repo.create_class('Class', 'c')
+        self.repo.add_class_attribute(cls.uri, 'name')
+        
+        nodes = self.repo.create_objects(cls.uri, [{'title': 'a', 'name': 'A'}, {'title': 'b'}], batch_size=1)
+        
+        self.assertEqual(self.repo.get_class_objects(cls.uri), nodes)
+        self.assertEqual(len(self.repo.get_nodes_by_labels(['Property'])), 1)
+        with self.assertRaises(ValueError):
+            self.repo.create_objects('missing', [{'title': 'a'}])
+    
+    def test_failed_create_class_is_rolled_back(self):
+        """Тест отката create_class с несуществующим родителем"""
+        with self.assertRaises(Exception):
+            self.repo.create_class('Orphan', 'o', 'missing')
+        self.assertEqual(self.repo.get_all_nodes(), [])
+
+
+class TestCypherTemplateCache(unittest.TestCase):
+    """Тесты для кэша текстов запросов"""
+    
+    def test_lru_eviction(self):
+        """Тест вытеснения давно неиспользованных запросов"""
+        cache = CypherTemplateCache(maxsize=2)
+        cache.get(('a',), lambda: 'A')
+        cache.get(('b',), lambda: 'B')
+        cache.get(('a',), lambda: 'A2')
+        cache.get(('c',), lambda: 'C')
+        
+        self.assertEqual(cache.get(('a',), lambda: 'A3'), 'A')
+        self.assertEqual(cache.get(('b',), lambda: 'B2'), 'B2')
+        stats = cache.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['evictions'], 2)
+
+
+class TestNodeCache(unittest.TestCase):
+    """Тесты для кэша узлов"""
+    
+    def test_lru_and_invalidation(self):
+        """Тест вытеснения и инвалидации записей"""
+        cache = NodeCache(maxsize=2)
+        cache.put('a', 'node a')
+        cache.put('a', 'signature a', 'signature')
+        cache.put('b', 'node b')
+        cache.get('a')
+        cache.put('c', 'node c')
+        
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a', 'signature'), 'signature a')
+        
+        cache.invalidate_kind('signature')
+        self.assertIsNone(cache.get('a', 'signature'))
+        self.assertEqual(cache.get('a'), 'node a')
+        
+        cache.invalidate('a')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+    
+    def test_ttl(self):
+        """Тест истечения времени жизни записи"""
+        cache = NodeCache(ttl=10)
+        with patch('graph_repository.time.monotonic', return_value=100):
+            cache.put('a', 'node a')
+            self.assertEqual(cache.get('a'), 'node a')
+        with patch('graph_repository.time.monotonic', return_value=111):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
 
 class TestTNode(unittest.TestCase):
     """Тесты для TNode"""
@@ -189,6 +1360,17 @@ class TestTNode(unittest.TestCase):
         self.assertEqual(node.description, 'Test description')
         self.assertEqual(node.title, 'Test title')
         self.assertIsNone(node.arcs)
+    
+    def test_collect_node_record_interns_uri(self):
+        """Тест сборки узла из записи по индексам с интернированием uri"""
+        repo = GraphRepository.__new__(GraphRepository)
+        uri = ''.join(['node_', 'abc'])
+        node = repo.collect_node_record(Record([
+            ('element_id', '4:abc123'), ('uri', uri), ('description', 'd'), ('title', 't'), ('arcs', [])
+        ]))
+        self.assertEqual(node.uri, 'node_abc')
+        self.assertIs(node.uri, sys.intern('node_abc'))
+        self.assertEqual(node.arcs, [])
 
 
 class TestTArc(unittest.TestCase):
@@ -208,5 +1390,50 @@ class TestTArc(unittest.TestCase):
         self.assertEqual(arc.node_uri_to, 'node2')
 
 
+
+@unittest.skipUnless(os.getenv('NEO4J_TEST_URI'), "NEO4J_TEST_URI не задан (нужен сервер Neo4j)")
+class TestQueryPlans(unittest.TestCase):
+    """Проверка планов запросов на сервере Neo4j (EXPLAIN, данные не меняются)"""
+    
+    def setUp(self):
+        self.repo = GraphRepository(
+            uri=os.environ['NEO4J_TEST_URI'],
+            user=os.getenv('NEO4J_TEST_USER', 'neo4j'),
+            password=os.getenv('NEO4J_TEST_PASSWORD', 'password'),
+            database=os.getenv('NEO4J_TEST_DATABASE', 'neo4j')
+        )
+    
+    def tearDown(self):
+        self.repo.close()
+    
+    def explain_operators(self, query: str, parameters: dict) -> list:
+        """Операторы плана EXPLAIN запроса"""
+        with self.repo._session() as session:
+            plan = session.run('EXPLAIN ' + query, parameters).consume().plan
+        operators = []
+        pending = [plan]
+        while pending:
+            node = pending.pop()
+            operators.append(node['operatorType'].split('@')[0])
+            pending.extend(node.get('children', []))
+        return operators
+    
+    def test_delete_arcs_seeks_by_element_id(self):
+        """Тест поиска связей DELETE_ARCS_QUERY по elementId без перебора связей"""
+        operators = self.explain_operators(self.repo.DELETE_ARCS_QUERY, {'arc_ids': ['5:0:0']})
+        self.assertIn('DirectedRelationshipByElementIdSeek', operators)
+        self.assertNotIn('AllRelationshipsScan', operators)
+        self.assertFalse(any(operator.endswith('AllNodesScan') for operator in operators))
+    
+    def test_signature_prunes_ancestor_paths(self):
+        """Тест обхода предков SIGNATURE_QUERY с отсечением путей вместо перебора всех путей"""
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ontology-repository'))
+        from ontology_repository import OntologyRepository
+        operators = self.explain_operators(OntologyRepository.SIGNATURE_QUERY, {'class_uri': 'class_a'})
+        self.assertTrue(any(operator.startswith('VarLengthExpand(Pruning') or 'BFSPruning' in operator
+                            for operator in operators))
+        self.assertNotIn('VarLengthExpand(All)', operators)
+
+
 if __name__ == '__main__':
     unittest.main()
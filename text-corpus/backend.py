@@ -65,6 +65,12 @@ def main():
     except Exception:
         pass
     
+    # Без общей метки существующие узлы не находятся поиском по uri
+    print('Подготавливаем схему Neo4j...')
+    schema = subprocess.run([sys.executable, 'manage.py', 'neo4j_schema'], check=False)
+    if schema.returncode != 0:
+        print('Не удалось подготовить схему Neo4j, выполните: python3 manage.py neo4j_schema')
+    
     print(f'Запускаем бэкенд (API сервер) на порту {port}...')
     print('Для остановки используйте Ctrl+C')
     print('=' * 50)
@@ -140,6 +140,46 @@ NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
 NEO4J_USER = os.getenv('NEO4J_USER', 'neo4j')
 NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'password')
 NEO4J_DATABASE = os.getenv('NEO4J_DATABASE', 'corpus')
+# Хранилище онтологии: neo4j - сервер NEO4J_URI, memory - граф в памяти
+# рабочего процесса (для тестов и разработки без сервера; данные не сохраняются
+# и не разделяются между процессами)
+NEO4J_BACKEND = os.getenv('NEO4J_BACKEND', 'neo4j')
+# Проверять соединение и прогревать общий драйвер при старте серверного процесса
+# (core/wsgi.py и core/asgi.py: gunicorn, runserver); другие команды manage.py
+# к Neo4j при запуске не подключаются
+NEO4J_WARM_UP_ON_STARTUP = os.getenv('NEO4J_WARM_UP_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes')
+# Кэш узлов онтологии по uri в рабочем процессе (0 - отключен). Инвалидация
+# выполняется только в своем процессе, поэтому при нескольких процессах
+# устаревание ограничивается временем жизни записи
+NEO4J_NODE_CACHE_SIZE = int(os.getenv('NEO4J_NODE_CACHE_SIZE', '0'))
+NEO4J_NODE_CACHE_TTL = float(os.getenv('NEO4J_NODE_CACHE_TTL', '30'))
+# Максимальное время повторов управляемой транзакции при временных ошибках
+# кластера (смена лидера, недоступность реплики), секунды. Для маршрутизации
+# чтений на реплики NEO4J_URI должен использовать схему neo4j://
+NEO4J_MAX_TRANSACTION_RETRY_TIME = float(os.getenv('NEO4J_MAX_TRANSACTION_RETRY_TIME', '30'))
+# Пул соединений общего драйвера: максимум соединений на сервер, ожидание
+# свободного соединения и время жизни соединения, секунды. Соединения,
+# простаивавшие дольше NEO4J_LIVENESS_CHECK_TIMEOUT секунд, проверяются перед
+# выдачей (пустое значение - не проверять). Метрики пула доступны по
+# api/diagnostics/neo4j_pool/
+NEO4J_MAX_CONNECTION_POOL_SIZE = int(os.getenv('NEO4J_MAX_CONNECTION_POOL_SIZE', '100'))
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.getenv('NEO4J_CONNECTION_ACQUISITION_TIMEOUT', '60'))
+NEO4J_LIVENESS_CHECK_TIMEOUT = float(os.getenv('NEO4J_LIVENESS_CHECK_TIMEOUT')) if os.getenv('NEO4J_LIVENESS_CHECK_TIMEOUT') else None
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv('NEO4J_MAX_CONNECTION_LIFETIME', '3600'))
+# Статистика запросов по шаблонам (время, строки, серверное время) в рабочем
+# процессе. Доступна по api/diagnostics/neo4j_queries/ (?output=prometheus).
+# Шаблоны сверх NEO4J_QUERY_STATS_MAX_TEMPLATES учитываются в общей записи other
+NEO4J_QUERY_STATS = os.getenv('NEO4J_QUERY_STATS', 'true').lower() in ('1', 'true', 'yes')
+NEO4J_QUERY_STATS_MAX_TEMPLATES = int(os.getenv('NEO4J_QUERY_STATS_MAX_TEMPLATES', '200'))
+# Журнал запросов дольше NEO4J_SLOW_QUERY_THRESHOLD секунд (0 - отключен) с
+# ротацией файла. Для доли NEO4J_SLOW_QUERY_PROFILE_RATE медленных запросов
+# сохраняется план (PROFILE для чтений, EXPLAIN для изменений; 0 - без планов).
+# По умолчанию журнал и планы отключены. Просмотр: python manage.py slow_queries
+NEO4J_SLOW_QUERY_THRESHOLD = float(os.getenv('NEO4J_SLOW_QUERY_THRESHOLD', '0'))
+NEO4J_SLOW_QUERY_LOG = os.getenv('NEO4J_SLOW_QUERY_LOG', os.path.join(BASE_DIR, 'logs', 'neo4j_slow_queries.jsonl'))
+NEO4J_SLOW_QUERY_PROFILE_RATE = float(os.getenv('NEO4J_SLOW_QUERY_PROFILE_RATE', '0'))
+NEO4J_SLOW_QUERY_MAX_BYTES = int(os.getenv('NEO4J_SLOW_QUERY_MAX_BYTES', str(10 * 1024 * 1024)))
+NEO4J_SLOW_QUERY_BACKUP_COUNT = int(os.getenv('NEO4J_SLOW_QUERY_BACKUP_COUNT', '5'))
 
 
 # Password validation
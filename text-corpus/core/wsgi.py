@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Прогрев только в серверном процессе, а не при каждой команде manage.py
+from db.api.neo4j_pool import warm_up_server  # noqa: E402
+
+warm_up_server()
@@ -1,12 +1,166 @@
+import asyncio
+import base64
 import json
+import logging
+import logging.handlers
+import os
 import random
 import string
-from typing import List, Dict, Any, Optional, Union
-from dataclasses import dataclass
-from neo4j import GraphDatabase
+import sys
+import threading
+import time
+import weakref
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Union, Tuple, Callable, Iterable, Iterator, AsyncIterator, Awaitable
+from dataclasses import dataclass, asdict
+from neo4j import GraphDatabase, AsyncGraphDatabase, Driver, AsyncDriver, Record, SummaryCounters, READ_ACCESS, WRITE_ACCESS
+from neo4j.exceptions import ClientError
 
 
-@dataclass
+# Общие драйверы процесса: ключ (uri, user, database, настройки) -> (pid, driver)
+_shared_drivers: Dict[Tuple[str, str, Optional[str], Tuple], Tuple[int, Driver]] = {}
+_shared_drivers_lock = threading.Lock()
+
+
+def _reset_shared_drivers_after_fork() -> None:
+    """Сброс драйверов, унаследованных дочерним процессом после fork"""
+    global _shared_drivers_lock
+    # Сокеты родителя нельзя использовать в потомке: просто забываем драйверы,
+    # не закрывая их, чтобы не разорвать соединения родительского процесса
+    _shared_drivers.clear()
+    _shared_drivers_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_shared_drivers_after_fork)
+
+
+def get_shared_driver(uri: str, user: str, password: str, database: str = None,
+                      verify: bool = False, **config) -> Driver:
+    """
+    Получить общий для процесса драйвер Neo4j (создается лениво)
+
+    Драйвер держит пул соединений, поэтому репозитории, созданные на каждый
+    запрос, должны брать сессии из него, а не открывать собственный драйвер.
+
+    Args:
+        uri: URI подключения к Neo4j
+        user: Имя пользователя
+        password: Пароль
+        database: Название базы данных (используется для прогрева)
+        verify: Проверить соединение и прогреть пул при создании драйвера
+        **config: Настройки драйвера (например, max_transaction_retry_time)
+
+    Returns:
+        Драйвер Neo4j
+    """
+    key = (uri, user, database, tuple(sorted(config.items())))
+    pid = os.getpid()
+    with _shared_drivers_lock:
+        entry = _shared_drivers.get(key)
+        if entry is not None and entry[0] == pid:
+            return entry[1]
+        driver = GraphDatabase.driver(uri, auth=(user, password), **config)
+        _shared_drivers[key] = (pid, driver)
+    if verify:
+        warm_up_driver(driver, database)
+    return driver
+
+
+def warm_up_driver(driver: Driver, database: str = None) -> None:
+    """
+    Проверка соединения и прогрев пула драйвера
+
+    Args:
+        driver: Драйвер Neo4j
+        database: Название базы данных
+    """
+    driver.verify_connectivity()
+    with driver.session(database=database) as session:
+        session.run("RETURN 1").consume()
+
+
+def close_shared_drivers() -> None:
+    """Закрытие всех общих драйверов текущего процесса"""
+    pid = os.getpid()
+    with _shared_drivers_lock:
+        entries = list(_shared_drivers.values())
+        _shared_drivers.clear()
+    for owner_pid, driver in entries:
+        if owner_pid == pid:
+            driver.close()
+
+
+# Пулы потоков gather процесса: ключ max_workers -> пул
+_gather_executors: Dict[int, ThreadPoolExecutor] = {}
+_gather_executors_lock = threading.Lock()
+
+
+def _reset_gather_executors_after_fork() -> None:
+    """Сброс пулов потоков gather, унаследованных дочерним процессом после fork"""
+    global _gather_executors_lock
+    # Потоки родителя в потомке не существуют, пулы создаются заново
+    _gather_executors.clear()
+    _gather_executors_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_gather_executors_after_fork)
+
+
+def _get_gather_executor(max_workers: int) -> ThreadPoolExecutor:
+    """
+    Получить общий пул потоков gather заданного размера (создается лениво)
+
+    Args:
+        max_workers: Максимальное число одновременно выполняемых вызовов
+
+    Returns:
+        Пул потоков
+    """
+    if max_workers <= 0:
+        raise ValueError("Число потоков должно быть положительным")
+    with _gather_executors_lock:
+        executor = _gather_executors.get(max_workers)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='graph-gather')
+            _gather_executors[max_workers] = executor
+        return executor
+
+
+def _timed_call(call: Callable[[], Any]) -> Tuple[Any, Optional[BaseException], float]:
+    """
+    Выполнение вызова с замером времени
+
+    Args:
+        call: Вызов без аргументов
+
+    Returns:
+        Результат, исключение (или None) и время выполнения в секундах
+    """
+    started = time.perf_counter()
+    try:
+        return call(), None, time.perf_counter() - started
+    except Exception as error:
+        return None, error, time.perf_counter() - started
+
+
+# Узлы и связи хранятся без __dict__ (slots доступны в dataclass с Python 3.10)
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Интернирование строки: одинаковые uri и типы связей хранятся в одном экземпляре"""
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class TNode:
     """Структура узла графа"""
     id: str  # element ID
@@ -16,7 +170,7 @@ class TNode:
     arcs: Optional[List['TArc']] = None
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class TArc:
     """Структура связи графа"""
     id: str  # element ID
@@ -25,337 +179,4089 @@ class TArc:
     node_uri_to: str
 
 
-class GraphRepository:
-    """Репозиторий для работы с графовой базой данных Neo4j"""
+@dataclass
+class TBatchChunk:
+    """Статистика выполнения одной пачки массовой операции"""
+    key: str  # набор меток или тип связи
+    size: int  # число строк в пачке
+    seconds: float  # время выполнения запроса
+
+
+@dataclass
+class TPage:
+    """Страница выборки узлов"""
+    items: List[TNode]
+    next_cursor: Optional[str]  # токен следующей страницы или None, если страница последняя
+
+
+@dataclass
+class TGraphColumns:
+    """
+    Граф в столбцовом представлении (массивы NumPy)
+    
+    Концы связей закодированы индексами узлов в node_ids, типы связей -
+    индексами в arc_types.
+    """
+    node_ids: Any  # numpy.ndarray[object]: element ID узлов
+    node_uris: Any  # numpy.ndarray[object]: uri узлов
+    node_titles: Any  # numpy.ndarray[object]: title узлов
+    arc_from: Any  # numpy.ndarray[int64]: индекс исходного узла связи
+    arc_to: Any  # numpy.ndarray[int64]: индекс целевого узла связи
+    arc_type_codes: Any  # numpy.ndarray[int32]: индекс типа связи в arc_types
+    arc_types: List[str]  # типы связей
+
+
+@dataclass
+class TGatherResult:
+    """Результаты параллельно выполненных вызовов gather"""
+    results: List[Any]  # результаты в порядке вызовов
+    timings: List[float]  # время выполнения каждого вызова, секунды
+    seconds: float  # общее время gather, секунды
+
+
+@dataclass
+class TUpsertStats:
+    """Итог массового создания-или-обновления узлов"""
+    created: int  # число созданных узлов
+    updated: int  # число найденных и обновленных узлов
+
+
+@dataclass
+class TFlushStats:
+    """Итог сброса буфера BufferedGraphWriter"""
+    nodes: int = 0  # число созданных узлов
+    updates: int = 0  # число обновленных узлов
+    arcs: int = 0  # число созданных связей
+    arcs_skipped: int = 0  # связи, для которых не найден один из узлов
+    seconds: float = 0.0  # время записи, секунды
     
-    def __init__(self, uri: str, user: str, password: str, database: str = None):
+    def add(self, other: 'TFlushStats') -> None:
         """
-        Инициализация репозитория
+        Добавление статистики другого сброса
         
         Args:
-            uri: URI подключения к Neo4j
-            user: Имя пользователя
-            password: Пароль
-            database: Название базы данных (по умолчанию используется системная база)
+            other: Статистика сброса
         """
-        self.uri = uri
-        self.user = user
-        self.password = password
-        self.database = database
+        self.nodes += other.nodes
+        self.updates += other.updates
+        self.arcs += other.arcs
+        self.arcs_skipped += other.arcs_skipped
+        self.seconds += other.seconds
+
+
+@dataclass
+class TQueryEvent:
+    """Событие выполнения запроса, передаваемое обработчикам query_hooks"""
+    template: str  # текст запроса с нормализованными пробелами
+    parameter_sizes: Dict[str, int]  # размеры параметров (длина коллекций, 1 для скаляров)
+    access_mode: str  # READ_ACCESS или WRITE_ACCESS
+    rows: int = 0  # число возвращенных записей
+    seconds: float = 0.0  # клиентское время выполнения, секунды
+    result_available_after: Optional[int] = None  # время сервера до первой записи, мс
+    result_consumed_after: Optional[int] = None  # время сервера на выдачу результата, мс
+    error: Optional[BaseException] = None  # ошибка выполнения или None
+    query: Optional[str] = None  # исходный текст запроса
+    parameters: Optional[Dict[str, Any]] = None  # параметры запроса (не копируются)
+    
+    def record(self, rows: int, summary: Any) -> None:
+        """
+        Запись числа строк и серверного времени из сводки результата
+        
+        Args:
+            rows: Число возвращенных записей
+            summary: Сводка результата (neo4j.ResultSummary)
+        """
+        self.rows = rows
+        self.result_available_after = summary.result_available_after
+        self.result_consumed_after = summary.result_consumed_after
+
+
+# Размер пачки по умолчанию для массовых операций
+DEFAULT_BATCH_SIZE = 1000
+
+# Число потоков gather по умолчанию
+DEFAULT_GATHER_WORKERS = 8
+
+# Общая метка всех узлов репозитория: по ней строятся индекс и ограничение
+# уникальности uri, поэтому все поиски по uri выполняются как (n:Resource {uri: ...})
+BASE_LABEL = 'Resource'
+
+# Метки онтологии, для которых создаются индексы по uri
+SCHEMA_LABELS = ['Class', 'Object', 'DatatypeProperty', 'ObjectProperty', 'Property']
+
+# Границы корзин гистограмм длительностей по умолчанию, секунды
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class CypherTemplateCache:
+    """
+    Ограниченный LRU-кэш текстов Cypher запросов
+    
+    Ключ описывает форму запроса (операция, набор меток, тип связи), значения
+    всегда передаются параметрами. Поэтому одинаковые по форме вызовы
+    получают один и тот же текст запроса и попадают в кэш планов сервера.
+    """
+    
+    def __init__(self, maxsize: int = 256):
+        """
+        Args:
+            maxsize: Максимальное число хранимых запросов
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._templates: 'OrderedDict[Tuple, str]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Tuple, build: Callable[[], str]) -> str:
+        """
+        Получить текст запроса, при промахе построить и запомнить его
+        
+        Args:
+            key: Ключ формы запроса
+            build: Функция построения текста запроса
+            
+        Returns:
+            Текст запроса
+        """
+        with self._lock:
+            query = self._templates.get(key)
+            if query is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return query
+            self.misses += 1
+        
+        query = build()
+        with self._lock:
+            self._templates[key] = query
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.maxsize:
+                self._templates.popitem(last=False)
+                self.evictions += 1
+        return query
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Счетчики кэша
+        
+        Returns:
+            Словарь с размером кэша, числом попаданий, промахов и вытеснений
+        """
+        with self._lock:
+            return {
+                'size': len(self._templates),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+    
+    def clear(self) -> None:
+        """Очистка кэша и счетчиков"""
+        with self._lock:
+            self._templates.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+# Общий для процесса кэш запросов
+QUERY_TEMPLATES = CypherTemplateCache()
+
+
+class NodeCache:
+    """
+    Ограниченный LRU-кэш прочитанных данных по uri с временем жизни записей
+    
+    Для одного uri хранится несколько видов данных (узел, класс, объект,
+    signature), инвалидация uri удаляет их все. Отсутствующие узлы (None)
+    не кэшируются.
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            maxsize: Максимальное число хранимых uri
+            ttl: Время жизни записи в секундах (None - без ограничения)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, Dict[str, Tuple[Any, Optional[float]]]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, uri: str, kind: str = 'node') -> Optional[Any]:
+        """
+        Получить значение из кэша
+        
+        Args:
+            uri: URI узла
+            kind: Вид данных
+            
+        Returns:
+            Значение или None при промахе
+        """
+        with self._lock:
+            entry = self._entries.get(uri)
+            item = entry.get(kind) if entry else None
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del entry[kind]
+                if not entry:
+                    del self._entries[uri]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(uri)
+            self.hits += 1
+            return value
+    
+    def put(self, uri: str, value: Any, kind: str = 'node') -> None:
+        """
+        Сохранить значение в кэше
+        
+        Args:
+            uri: URI узла
+            value: Значение (None не сохраняется)
+            kind: Вид данных
+        """
+        if value is None:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries.setdefault(uri, {})[kind] = (value, expires_at)
+            self._entries.move_to_end(uri)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, *uris: str) -> None:
+        """
+        Удалить из кэша все данные указанных uri
+        
+        Args:
+            *uris: URI узлов
+        """
+        with self._lock:
+            for uri in uris:
+                self._entries.pop(uri, None)
+    
+    def invalidate_kind(self, kind: str) -> None:
+        """
+        Удалить из кэша данные одного вида для всех uri
+        
+        Args:
+            kind: Вид данных
+        """
+        with self._lock:
+            for uri in list(self._entries):
+                entry = self._entries[uri]
+                entry.pop(kind, None)
+                if not entry:
+                    del self._entries[uri]
+    
+    def clear(self) -> None:
+        """Очистка кэша (счетчики сохраняются)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Счетчики кэша
+        
+        Returns:
+            Словарь с размером кэша, числом попаданий, промахов и вытеснений
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class LatencyHistogram:
+    """
+    Потокобезопасная гистограмма длительностей с фиксированными корзинами
+    
+    Счетчики корзин накопительные (как в Prometheus): корзина le содержит
+    число наблюдений не дольше le секунд.
+    """
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        Инициализация гистограммы
+        
+        Args:
+            buckets: Возрастающие верхние границы корзин, секунды
+        """
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, seconds: float) -> None:
+        """
+        Добавление наблюдения
+        
+        Args:
+            seconds: Длительность, секунды
+        """
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+            self._count += 1
+            if seconds > self._max:
+                self._max = seconds
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Текущее состояние гистограммы
+        
+        Returns:
+            Словарь с накопительными счетчиками корзин, суммой, числом и максимумом наблюдений
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count, maximum = self._sum, self._count, self._max
+        buckets = {}
+        cumulative = 0
+        for bound, bucket_count in zip(list(self.buckets) + ['+Inf'], counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        return {'buckets': buckets, 'sum': total, 'count': count, 'max': maximum}
+
+
+@dataclass
+class PoolConfig:
+    """
+    Настройки пула соединений драйвера
+    
+    None означает значение драйвера по умолчанию.
+    """
+    max_connection_pool_size: Optional[int] = None  # максимум соединений на сервер
+    connection_acquisition_timeout: Optional[float] = None  # ожидание свободного соединения, секунды
+    liveness_check_timeout: Optional[float] = None  # проверять соединения, простаивавшие дольше, секунды
+    max_connection_lifetime: Optional[float] = None  # время жизни соединения, секунды
+    
+    def driver_config(self) -> Dict[str, Any]:
+        """
+        Параметры драйвера для GraphDatabase.driver
+        
+        Returns:
+            Заданные настройки пула
+        """
+        return {name: value for name, value in asdict(self).items() if value is not None}
+
+
+class PoolMetrics:
+    """
+    Метрики пула соединений драйвера
+    
+    Оборачивает получение соединения из пула драйвера, чтобы измерять время
+    получения соединения и считать таймауты. Время получения включает как
+    ожидание свободного соединения, так и открытие нового, поэтому это не
+    чистое время в очереди. Число занятых и свободных соединений читается из
+    пула в момент снимка.
+    
+    Использует внутренний API драйвера neo4j 5.15 (driver._pool.acquire и
+    текст ClientError о таймауте), поэтому версия драйвера закреплена в
+    requirements.txt. Если у драйвера нет такого пула, метрики не собираются
+    (supported = False, в снимке None), а запросы продолжают работать.
+    """
+    
+    def __init__(self, driver: Any, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        Инициализация метрик и подключение к пулу драйвера
+        
+        Args:
+            driver: Драйвер Neo4j (синхронный или асинхронный)
+            buckets: Границы корзин гистограммы времени получения, секунды
+        """
+        self.driver = driver
+        self.acquire_latency = LatencyHistogram(buckets)
+        self.acquisitions = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+        self.supported = self._install()
+    
+    def _install(self) -> bool:
+        """
+        Обертка метода получения соединения пула драйвера
+        
+        Returns:
+            False, если у драйвера нет пула с методом acquire
+        """
+        pool = getattr(self.driver, '_pool', None)
+        acquire = getattr(pool, 'acquire', None)
+        if acquire is None:
+            return False
+        
+        if asyncio.iscoroutinefunction(acquire):
+            async def timed_acquire(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    connection = await acquire(*args, **kwargs)
+                except Exception as error:
+                    self._observe(time.perf_counter() - started, error)
+                    raise
+                self._observe(time.perf_counter() - started)
+                return connection
+        else:
+            def timed_acquire(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    connection = acquire(*args, **kwargs)
+                except Exception as error:
+                    self._observe(time.perf_counter() - started, error)
+                    raise
+                self._observe(time.perf_counter() - started)
+                return connection
+        
+        pool.acquire = timed_acquire
+        return True
+    
+    def _observe(self, seconds: float, error: Optional[Exception] = None) -> None:
+        """
+        Учет одного получения соединения
+        
+        Args:
+            seconds: Время получения соединения, секунды
+            error: Ошибка получения соединения или None
+        """
+        timed_out = isinstance(error, ClientError) and 'failed to obtain a connection' in str(error)
+        with self._lock:
+            self.acquisitions += 1
+            if timed_out:
+                self.timeouts += 1
+        self.acquire_latency.observe(seconds)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Текущее состояние пула и метрик
+        
+        Returns:
+            Словарь с размером пула, числом занятых и свободных соединений,
+            числом получений соединения, таймаутов и гистограммой времени
+            получения (None для драйвера без поддерживаемого пула)
+        """
+        if not self.supported:
+            return {'max_size': None, 'in_use': None, 'idle': None, 'acquisitions': None,
+                    'timeouts': None, 'acquire_latency_seconds': None}
+        pool = getattr(self.driver, '_pool', None)
+        in_use = idle = 0
+        # Копии коллекций пула: снимок не берет блокировку пула
+        for connections in list(getattr(pool, 'connections', {}).values()):
+            for connection in list(connections):
+                if connection.in_use:
+                    in_use += 1
+                else:
+                    idle += 1
+        pool_config = getattr(pool, 'pool_config', None)
+        with self._lock:
+            acquisitions, timeouts = self.acquisitions, self.timeouts
+        return {
+            'max_size': getattr(pool_config, 'max_connection_pool_size', None),
+            'in_use': in_use,
+            'idle': idle,
+            'acquisitions': acquisitions,
+            'timeouts': timeouts,
+            'acquire_latency_seconds': self.acquire_latency.snapshot()
+        }
+
+
+# Метрики пулов: драйвер -> PoolMetrics (драйвер подключается один раз)
+_pool_metrics: 'weakref.WeakKeyDictionary[Any, PoolMetrics]' = weakref.WeakKeyDictionary()
+_pool_metrics_lock = threading.Lock()
+
+
+def get_pool_metrics(driver: Any) -> PoolMetrics:
+    """
+    Получить метрики пула драйвера (подключаются при первом обращении)
+
+    Args:
+        driver: Драйвер Neo4j
+
+    Returns:
+        Метрики пула драйвера
+    """
+    with _pool_metrics_lock:
+        metrics = _pool_metrics.get(driver)
+        if metrics is None:
+            metrics = PoolMetrics(driver)
+            _pool_metrics[driver] = metrics
+        return metrics
+
+
+def _parameter_sizes(parameters: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Размеры параметров запроса: длина для коллекций, 1 для скалярных значений
+
+    Args:
+        parameters: Параметры запроса
+
+    Returns:
+        Словарь имя параметра -> размер
+    """
+    return {
+        name: len(value) if isinstance(value, (list, tuple, dict, set)) else 1
+        for name, value in (parameters or {}).items()
+    }
+
+
+class QueryStats:
+    """
+    Агрегатор событий запросов по шаблонам (обработчик query_hooks)
+    
+    Для каждого шаблона запроса копит число выполнений и ошибок, число
+    строк, гистограмму клиентского времени и суммы серверных
+    result_available_after/result_consumed_after. Снимок можно сохранить
+    в JSON (dump) или отдать в текстовом формате Prometheus (to_prometheus).
+    
+    Число шаблонов ограничено max_templates: create_object/update_object
+    строят шаблон на каждый набор полей, поэтому события новых шаблонов
+    сверх лимита учитываются в общей записи OTHER_TEMPLATE.
+    """
+    
+    OTHER_TEMPLATE = 'other'
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS, max_templates: int = 200):
+        """
+        Инициализация агрегатора
+        
+        Args:
+            buckets: Границы корзин гистограмм клиентского времени, секунды
+            max_templates: Максимальное число отдельно учитываемых шаблонов
+        """
+        self.buckets = buckets
+        self.max_templates = max_templates
+        self._templates: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def __call__(self, event: TQueryEvent) -> None:
+        """
+        Учет события запроса
+        
+        Args:
+            event: Событие выполненного запроса
+        """
+        with self._lock:
+            template = event.template
+            if template not in self._templates and len(self._templates) >= self.max_templates:
+                template = self.OTHER_TEMPLATE
+            stats = self._templates.get(template)
+            if stats is None:
+                stats = {
+                    'count': 0, 'errors': 0, 'rows': 0,
+                    'available_after_ms': 0, 'consumed_after_ms': 0,
+                    'seconds': LatencyHistogram(self.buckets)
+                }
+                self._templates[template] = stats
+            stats['count'] += 1
+            stats['rows'] += event.rows
+            if event.error is not None:
+                stats['errors'] += 1
+            stats['available_after_ms'] += event.result_available_after or 0
+            stats['consumed_after_ms'] += event.result_consumed_after or 0
+        stats['seconds'].observe(event.seconds)
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Текущая статистика по шаблонам
+        
+        Returns:
+            Словарь шаблон запроса -> счетчики и гистограмма клиентского времени
+        """
+        with self._lock:
+            items = [(template, dict(stats)) for template, stats in self._templates.items()]
+        for _, stats in items:
+            stats['seconds'] = stats['seconds'].snapshot()
+        return dict(items)
+    
+    def reset(self) -> None:
+        """Очистка накопленной статистики"""
+        with self._lock:
+            self._templates.clear()
+    
+    def dump(self, path: str) -> None:
+        """
+        Сохранение снимка статистики в JSON-файл
+        
+        Args:
+            path: Путь к файлу
+        """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.snapshot(), file, ensure_ascii=False, indent=2)
+    
+    def to_prometheus(self, prefix: str = 'neo4j_query') -> str:
+        """
+        Статистика в текстовом формате Prometheus
+        
+        Args:
+            prefix: Префикс имен метрик
+            
+        Returns:
+            Текст метрик; шаблон запроса передается меткой template
+        """
+        lines = [f'# TYPE {prefix}_seconds histogram']
+        counters = []
+        for template, stats in self.snapshot().items():
+            label = template.replace('\\', '\\\\').replace('"', '\\"')
+            seconds = stats['seconds']
+            for bound, count in seconds['buckets'].items():
+                lines.append(f'{prefix}_seconds_bucket{{template="{label}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_seconds_sum{{template="{label}"}} {seconds["sum"]}')
+            lines.append(f'{prefix}_seconds_count{{template="{label}"}} {seconds["count"]}')
+            for name in ('errors', 'rows', 'available_after_ms', 'consumed_after_ms'):
+                counters.append(f'{prefix}_{name}_total{{template="{label}"}} {stats[name]}')
+        return '\n'.join(lines + counters) + '\n'
+
+
+def _truncate_parameters(value: Any, limit: int = 10) -> Any:
+    """
+    Сокращение параметров запроса для журнала: длинные списки обрезаются
+
+    Args:
+        value: Значение параметра
+        limit: Максимальное число сохраняемых элементов списка
+
+    Returns:
+        Значение, пригодное для JSON
+    """
+    if isinstance(value, dict):
+        return {str(key): _truncate_parameters(item, limit) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = [_truncate_parameters(item, limit) for item in list(value)[:limit]]
+        if len(value) > limit:
+            items.append(f'... еще {len(value) - limit}')
+        return items
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _collect_plan(plan: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Сокращенное дерево плана запроса из сводки результата
+
+    Args:
+        plan: План (summary.plan) или профиль (summary.profile) драйвера
+
+    Returns:
+        Дерево операторов с деталями, а для PROFILE - с dbHits и rows
+    """
+    if not plan:
+        return None
+    arguments = plan.get('args') or plan.get('arguments') or {}
+    node = {
+        'operator': plan.get('operatorType'),
+        'details': arguments.get('Details'),
+        'identifiers': plan.get('identifiers', [])
+    }
+    for key, name in (('dbHits', 'db_hits'), ('rows', 'rows')):
+        if key in plan:
+            node[name] = plan[key]
+    node['children'] = [_collect_plan(child) for child in plan.get('children', [])]
+    return node
+
+
+def _plan_total(plan: Optional[Dict[str, Any]], key: str) -> int:
+    """
+    Сумма счетчика по всем операторам плана
+
+    Args:
+        plan: Дерево плана из _collect_plan
+        key: Имя счетчика (db_hits)
+
+    Returns:
+        Сумма счетчика
+    """
+    if not plan:
+        return 0
+    return plan.get(key, 0) + sum(_plan_total(child, key) for child in plan['children'])
+
+
+class SlowQueryLog:
+    """
+    Журнал медленных запросов (обработчик query_hooks)
+    
+    Запросы не быстрее threshold секунд записываются строками JSON в файл
+    с ротацией (logging.handlers.RotatingFileHandler): шаблон, сокращенные
+    параметры, время, строки и серверное время. Для доли profile_rate
+    медленных запросов сохраняется план: чтения повторно выполняются под
+    PROFILE (операторы с db hits и rows), изменения - только под EXPLAIN,
+    чтобы не применять их второй раз. План снимается только для
+    синхронного репозитория, подключенного через attach.
+    """
+    
+    def __init__(self, path: str, threshold: float = 1.0, profile_rate: float = 0.0,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        """
+        Инициализация журнала
+        
+        Args:
+            path: Путь к файлу журнала
+            threshold: Порог длительности запроса, секунды
+            profile_rate: Доля медленных запросов, для которых снимается план (0..1)
+            max_bytes: Размер файла, после которого выполняется ротация
+            backup_count: Число хранимых старых файлов
+        """
+        self.path = path
+        self.threshold = threshold
+        self.profile_rate = profile_rate
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Собственный логгер на файл: записи не попадают в корневые обработчики
+        self._logger = logging.getLogger(f'{__name__}.slow_queries.{os.path.abspath(path)}')
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+    
+    def close(self) -> None:
+        """Закрытие файла журнала"""
+        for handler in list(self._logger.handlers):
+            self._logger.removeHandler(handler)
+            handler.close()
+    
+    def attach(self, repository: 'GraphRepository') -> None:
+        """
+        Подключение журнала к репозиторию со снятием планов его драйвером
+        
+        Args:
+            repository: Синхронный или асинхронный репозиторий
+        """
+        repository.add_query_hook(lambda event: self.observe(event, repository))
+    
+    def __call__(self, event: TQueryEvent) -> None:
+        """
+        Учет события запроса без снятия плана
+        
+        Args:
+            event: Событие выполненного запроса
+        """
+        self.observe(event)
+    
+    def observe(self, event: TQueryEvent, repository: Any = None) -> None:
+        """
+        Запись медленного запроса в журнал
+        
+        Args:
+            event: Событие выполненного запроса
+            repository: Репозиторий для снятия плана (None - без плана)
+        """
+        if event.seconds < self.threshold:
+            return
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime()),
+            'template': event.template,
+            'parameters': _truncate_parameters(event.parameters or {}),
+            'access_mode': event.access_mode,
+            'seconds': round(event.seconds, 6),
+            'rows': event.rows,
+            'result_available_after': event.result_available_after,
+            'result_consumed_after': event.result_consumed_after,
+            'error': repr(event.error) if event.error is not None else None
+        }
+        if isinstance(repository, GraphRepository) and random.random() < self.profile_rate:
+            entry.update(self._capture_plan(event, repository))
+        self._logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+    
+    def _capture_plan(self, event: TQueryEvent, repository: 'GraphRepository') -> Dict[str, Any]:
+        """
+        Снятие плана медленного запроса
+        
+        Args:
+            event: Событие выполненного запроса
+            repository: Синхронный репозиторий
+            
+        Returns:
+            Поля записи журнала: режим, план и суммарные db hits
+        """
+        mode = 'PROFILE' if event.access_mode == READ_ACCESS else 'EXPLAIN'
+        try:
+            # Отдельная сессия в обход _execute_query, чтобы не вызывать обработчики повторно
+            with repository._session(default_access_mode=event.access_mode) as session:
+                summary = session.run(f'{mode} {event.query or event.template}', event.parameters or {}).consume()
+        except Exception as error:
+            return {'plan_mode': mode, 'plan_error': repr(error)}
+        plan = _collect_plan(summary.profile if mode == 'PROFILE' else summary.plan)
+        entry = {'plan_mode': mode, 'plan': plan}
+        if mode == 'PROFILE':
+            entry['db_hits'] = _plan_total(plan, 'db_hits')
+        return entry
+    
+    @staticmethod
+    def read(path: str, include_rotated: bool = True) -> List[Dict[str, Any]]:
+        """
+        Чтение записей журнала
+        
+        Args:
+            path: Путь к файлу журнала
+            include_rotated: Читать также файлы после ротации (path.1, path.2, ...)
+            
+        Returns:
+            Записи от старых к новым
+        """
+        paths = [path]
+        if include_rotated:
+            index = 1
+            while os.path.exists(f'{path}.{index}'):
+                paths.insert(0, f'{path}.{index}')
+                index += 1
+        entries = []
+        for file_path in paths:
+            if not os.path.exists(file_path):
+                continue
+            with open(file_path, encoding='utf-8') as file:
+                for line in file:
+                    line = line.strip()
+                    if line:
+                        entries.append(json.loads(line))
+        return entries
+
+
+class _GraphColumnsBuilder:
+    """Накопление узлов и связей графа в столбцы для TGraphColumns"""
+    
+    def __init__(self):
+        self.node_index: Dict[str, int] = {}
+        self.node_ids: List[str] = []
+        self.node_uris: List[str] = []
+        self.node_titles: List[str] = []
+        self.type_index: Dict[str, int] = {}
+        self.arc_from = array('q')
+        self.arc_to = array('q')
+        self.arc_type_codes = array('i')
+    
+    def add_node(self, record: Dict[str, Any]) -> None:
+        """
+        Добавление узла из результата COLUMNS_NODES_QUERY
+        
+        Args:
+            record: Результат запроса (element_id, uri, title)
+        """
+        self.node_index[record['element_id']] = len(self.node_ids)
+        self.node_ids.append(record['element_id'])
+        self.node_uris.append(record['uri'])
+        self.node_titles.append(record['title'])
+    
+    def add_arc(self, record: Dict[str, Any]) -> None:
+        """
+        Добавление связи из результата COLUMNS_ARCS_QUERY
+        
+        Args:
+            record: Результат запроса (node_from, node_to, type)
+        """
+        node_from = self.node_index.get(record['node_from'])
+        node_to = self.node_index.get(record['node_to'])
+        # Пропускаем связи узлов, созданных после чтения списка узлов
+        if node_from is None or node_to is None:
+            return
+        self.arc_from.append(node_from)
+        self.arc_to.append(node_to)
+        self.arc_type_codes.append(self.type_index.setdefault(record['type'], len(self.type_index)))
+    
+    def build(self, np) -> TGraphColumns:
+        """
+        Построение столбцов
+        
+        Args:
+            np: Модуль numpy
+            
+        Returns:
+            Столбцы узлов и список связей с целочисленными концами
+        """
+        # np.array копирует буферы array: np.frombuffer вернул бы представления
+        # только для чтения, и изменение столбцов на месте завершалось бы ошибкой
+        return TGraphColumns(
+            node_ids=np.array(self.node_ids, dtype=object),
+            node_uris=np.array(self.node_uris, dtype=object),
+            node_titles=np.array(self.node_titles, dtype=object),
+            arc_from=np.array(self.arc_from, dtype=np.int64),
+            arc_to=np.array(self.arc_to, dtype=np.int64),
+            arc_type_codes=np.array(self.arc_type_codes, dtype=np.int32),
+            arc_types=list(self.type_index)
+        )
+
+
+def _import_numpy():
+    """Ленивый импорт numpy для столбцового режима"""
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("Для столбцового режима требуется numpy (pip install numpy)")
+    return np
+
+
+class _GraphRepositoryBase(ABC):
+    """
+    Общая часть синхронного и асинхронного репозиториев
+    
+    Содержит тексты и построители запросов, подготовку строк массовых
+    операций, разбор результатов и работу с кэшами. Выполнение запросов
+    реализуют GraphRepository и AsyncGraphRepository.
+    """
+    
+    ALL_NODES_QUERY = """
+        MATCH (n)
+        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
+        """
+    
+    # Связи возвращаются списками [element_id, type, node_uri_to]: collect
+    # пропускает null, поэтому узлы без связей получают пустой список
+    ALL_NODES_AND_ARCS_QUERY = """
+        MATCH (n)
+        OPTIONAL MATCH (n)-[r]->(m)
+        WITH n, collect(CASE WHEN r IS NULL THEN null ELSE [elementId(r), type(r), m.uri] END) as arcs
+        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title, arcs
+        """
+    
+    COLUMNS_NODES_QUERY = """
+        MATCH (n)
+        RETURN elementId(n) as element_id, n.uri as uri, n.title as title
+        """
+    
+    COLUMNS_ARCS_QUERY = """
+        MATCH (n)-[r]->(m)
+        RETURN elementId(n) as node_from, elementId(m) as node_to, type(r) as type
+        """
+    
+    NODE_BY_URI_QUERY = """
+        MATCH (n:Resource {uri: $uri})
+        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
+        """
+    
+    UPDATE_NODE_QUERY = """
+        MATCH (n:Resource {uri: $uri})
+        SET n += $props
+        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
+        """
+    
+    UPDATE_NODES_QUERY = """
+        UNWIND $rows AS row
+        MATCH (n:Resource {uri: row.uri})
+        SET n += row.props
+        RETURN count(n) as updated
+        """
+    
+    DELETE_NODE_QUERY = """
+        MATCH (n:Resource {uri: $uri})
+        DETACH DELETE n
+        """
+    
+    DELETE_NODES_QUERY = """
+        UNWIND $uris AS uri
+        MATCH (n:Resource {uri: uri})
+        DETACH DELETE n
+        """
+    
+    # Удаление связей по elementId (и одной связи в delete_arc_by_id). Равенство
+    # elementId(r) переменной UNWIND планируется как DirectedRelationshipByElementIdSeek,
+    # а не перебор связей: план проверяет TestQueryPlans (EXPLAIN на сервере)
+    DELETE_ARCS_QUERY = """
+        UNWIND $arc_ids AS arc_id
+        MATCH ()-[r]->()
+        WHERE elementId(r) = arc_id
+        DELETE r
+        """
+    
+    def __init__(self, uri: str, user: str, password: str, database: str = None,
+                 driver: Any = None, templates: CypherTemplateCache = None,
+                 cache: NodeCache = None, max_transaction_retry_time: Optional[float] = None,
+                 bookmark_manager: Any = None, pool: PoolConfig = None,
+                 query_hooks: Iterable[Callable[[TQueryEvent], None]] = None):
+        """
+        Инициализация репозитория
+        
+        Args:
+            uri: URI подключения к Neo4j
+            user: Имя пользователя
+            password: Пароль
+            database: Название базы данных (по умолчанию используется системная база)
+            driver: Готовый драйвер (например, из get_shared_driver). Репозиторий
+                только берет из него сессии и не закрывает его в close()
+            templates: Кэш текстов запросов (по умолчанию общий QUERY_TEMPLATES)
+            cache: Кэш прочитанных узлов по uri (по умолчанию не используется)
+            max_transaction_retry_time: Максимальное время повторов управляемой
+                транзакции при временных ошибках, секунды (для собственного драйвера;
+                по умолчанию значение драйвера)
+            bookmark_manager: Менеджер закладок сессий (по умолчанию общий менеджер
+                драйвера, поэтому чтение видит предыдущие записи через этот драйвер)
+            pool: Настройки пула соединений собственного драйвера (по умолчанию
+                значения драйвера)
+            query_hooks: Обработчики событий выполнения запросов TQueryEvent
+                (например, QueryStats). Без обработчиков сводка результата не читается
+        """
+        self.uri = uri
+        self.user = user
+        self.password = password
+        self.database = database
+        
+        self._driver_config = {}
+        if max_transaction_retry_time is not None:
+            self._driver_config['max_transaction_retry_time'] = max_transaction_retry_time
+        if pool is not None:
+            self._driver_config.update(pool.driver_config())
+        
+        self.driver = driver or self._create_driver()
+        self._owns_driver = driver is None and self.driver is not None
+        # Метрики пула подключаются сразу, чтобы учитывать все получения соединений;
+        # у репозитория без драйвера (граф в памяти) пула и закладок нет
+        self._pool_metrics = get_pool_metrics(self.driver) if self.driver is not None else None
+        self.bookmark_manager = bookmark_manager or getattr(self.driver, 'execute_query_bookmark_manager', None)
+        self.templates = templates or QUERY_TEMPLATES
+        self.cache = cache
+        self.query_hooks = list(query_hooks or [])
+    
+    def add_query_hook(self, hook: Callable[[TQueryEvent], None]) -> None:
+        """
+        Подключение обработчика событий выполнения запросов
+        
+        Args:
+            hook: Функция, получающая TQueryEvent после каждого запроса
+        """
+        self.query_hooks.append(hook)
+    
+    @contextmanager
+    def _instrument(self, query: str, parameters: Optional[Dict[str, Any]], access_mode: str):
+        """
+        Замер выполнения запроса для обработчиков query_hooks
+        
+        Функция транзакции заполняет строки и серверное время через
+        event.record, время и ошибка фиксируются при выходе из блока,
+        после чего событие передается обработчикам. При повторах
+        управляемой транзакции учитывается последняя попытка.
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            access_mode: READ_ACCESS или WRITE_ACCESS
+            
+        Yields:
+            Событие запроса или None, если обработчиков нет
+        """
+        if not self.query_hooks:
+            yield None
+            return
+        
+        event = TQueryEvent(' '.join(query.split()), _parameter_sizes(parameters), access_mode,
+                            query=query, parameters=parameters)
+        started = time.perf_counter()
+        try:
+            yield event
+        except Exception as error:
+            event.error = error
+            raise
+        finally:
+            event.seconds = time.perf_counter() - started
+            for hook in self.query_hooks:
+                hook(event)
+    
+    def pool_metrics(self) -> Dict[str, Any]:
+        """
+        Метрики пула соединений драйвера репозитория
+        
+        Returns:
+            Словарь с числом занятых и свободных соединений, таймаутов получения
+            соединения и гистограммой времени получения (см. PoolMetrics.snapshot)
+        """
+        return self._pool_metrics.snapshot()
+    
+    @abstractmethod
+    def _create_driver(self):
+        """
+        Создание собственного драйвера репозитория
+        
+        Returns:
+            Драйвер Neo4j
+        """
+    
+    @abstractmethod
+    def _current_transaction(self):
+        """
+        Текущая транзакция unit_of_work
+        
+        Returns:
+            Транзакция или None, если блок unit_of_work не открыт
+        """
+    
+    @abstractmethod
+    def _dirty_uris(self) -> Optional[set]:
+        """
+        URI, измененные в текущем блоке unit_of_work
+        
+        Returns:
+            Набор URI или None, если блок unit_of_work не открыт
+        """
+    
+    def _cache_get(self, uri: str, kind: str = 'node') -> Optional[Any]:
+        """
+        Чтение из кэша узлов (внутри unit_of_work кэш не используется)
+        
+        Args:
+            uri: URI узла
+            kind: Вид данных
+            
+        Returns:
+            Значение или None при промахе
+        """
+        if self.cache is None or self._current_transaction() is not None:
+            return None
+        return self.cache.get(uri, kind)
+    
+    def _cache_put(self, uri: str, value: Any, kind: str = 'node') -> None:
+        """
+        Запись прочитанных данных в кэш узлов
+        
+        Args:
+            uri: URI узла
+            value: Значение
+            kind: Вид данных
+        """
+        if self.cache is not None and self._current_transaction() is None:
+            self.cache.put(uri, value, kind)
+    
+    def _invalidate(self, *uris: str) -> None:
+        """
+        Инвалидация кэша узлов после изменения
+        
+        Args:
+            *uris: URI измененных узлов (без аргументов - весь кэш)
+        """
+        if self.cache is None:
+            return
+        dirty = self._dirty_uris()
+        if not uris:
+            self.cache.clear()
+        else:
+            self.cache.invalidate(*uris)
+        if dirty is not None:
+            # None в наборе означает сброс всего кэша
+            dirty.update(uris or [None])
+    
+    def _invalidate_committed(self, dirty: set) -> None:
+        """
+        Повторная инвалидация после фиксации unit_of_work: другие потоки
+        могли успеть прочитать и закэшировать старые данные
+        
+        Args:
+            dirty: URI, измененные в транзакции
+        """
+        if None in dirty:
+            self._invalidate()
+        elif dirty:
+            self._invalidate(*dirty)
+    
+    def _bind_call(self, call: Union[Callable[[], Any], Tuple]) -> Callable[[], Any]:
+        """
+        Приведение вызова gather к функции без аргументов
+        
+        Args:
+            call: Функция без аргументов или кортеж (метод, *аргументы)
+            
+        Returns:
+            Функция без аргументов
+        """
+        if isinstance(call, tuple):
+            func, *args = call
+            return lambda: func(*args)
+        return call
+    
+    def _gather_result(self, outcomes: List[Tuple[Any, Optional[BaseException], float]],
+                       seconds: float) -> TGatherResult:
+        """
+        Сборка результата gather
+        
+        Ошибка первого упавшего вызова пробрасывается после завершения всех вызовов.
+        
+        Args:
+            outcomes: Результат, исключение и время каждого вызова
+            seconds: Общее время gather
+            
+        Returns:
+            Результаты и время вызовов
+        """
+        for _, error, _ in outcomes:
+            if error is not None:
+                raise error
+        return TGatherResult(
+            results=[result for result, _, _ in outcomes],
+            timings=[timing for _, _, timing in outcomes],
+            seconds=seconds
+        )
+    
+    def generate_random_string(self, length: int = 10) -> str:
+        """
+        Генерация случайной строки для URI узла
+        
+        Args:
+            length: Длина генерируемой строки
+            
+        Returns:
+            Случайная строка
+        """
+        letters = string.ascii_lowercase + string.digits
+        return ''.join(random.choice(letters) for _ in range(length))
+    
+    def _build_labels_clause(self, labels: List[str]) -> str:
+        """
+        Безопасное построение строки меток для Cypher запроса
+        
+        Args:
+            labels: Список меток
+            
+        Returns:
+            Строка меток в формате Cypher
+        """
+        if not labels:
+            return ''
+        # Безопасно экранируем метки
+        escaped_labels = [self._escape_name(label) for label in labels]
+        return ':' + ':'.join(escaped_labels)
+    
+    def _escape_name(self, name: str) -> str:
+        """
+        Экранирование имени метки, типа связи или свойства для Cypher запроса
+        
+        Args:
+            name: Имя
+            
+        Returns:
+            Имя в обратных кавычках
+        """
+        return f"`{name.replace('`', '``')}`"
+    
+    def _template(self, key: Tuple, build: Callable[[], str]) -> str:
+        """
+        Получение текста запроса из кэша запросов
+        
+        Args:
+            key: Ключ формы запроса (операция, метки, тип связи)
+            build: Функция построения текста запроса при промахе
+            
+        Returns:
+            Текст запроса
+        """
+        return self.templates.get(key, build)
+    
+    def _with_base_label(self, labels: List[str]) -> List[str]:
+        """
+        Добавление общей метки BASE_LABEL к списку меток узла
+        
+        Args:
+            labels: Список меток
+            
+        Returns:
+            Список меток с общей меткой
+        """
+        labels = list(labels)
+        if BASE_LABEL not in labels:
+            labels.append(BASE_LABEL)
+        return labels
+    
+    def collect_node(self, node_data: Dict[str, Any]) -> TNode:
+        """
+        Трансформация данных узла из БД в объект TNode
+        
+        Args:
+            node_data: Данные узла из базы данных
+            
+        Returns:
+            Объект TNode
+        """
+        return TNode(
+            id=node_data.get('element_id', ''),
+            uri=_intern(node_data.get('uri', '')),
+            description=node_data.get('description', ''),
+            title=node_data.get('title', ''),
+            arcs=node_data.get('arcs', [])
+        )
+    
+    def collect_arc(self, arc_data: Dict[str, Any]) -> TArc:
+        """
+        Трансформация данных связи из БД в объект TArc
+        
+        Args:
+            arc_data: Данные связи из базы данных
+            
+        Returns:
+            Объект TArc
+        """
+        return TArc(
+            id=arc_data.get('element_id', ''),
+            uri=_intern(arc_data.get('uri', '')),
+            node_uri_from=_intern(arc_data.get('node_uri_from', '')),
+            node_uri_to=_intern(arc_data.get('node_uri_to', ''))
+        )
+    
+    def collect_node_record(self, record: Record) -> TNode:
+        """
+        Трансформация записи узла в объект TNode без промежуточного словаря
+        
+        Запись должна содержать поля в порядке element_id, uri, description,
+        title и, необязательно, arcs в формате collect_arcs_values.
+        
+        Args:
+            record: Запись результата запроса
+            
+        Returns:
+            Объект TNode
+        """
+        uri = _intern(record[1])
+        arcs = self.collect_arcs_values(uri, record[4]) if len(record) > 4 else []
+        return TNode(record[0], uri, record[2], record[3], arcs)
+    
+    def collect_node_with_arcs(self, node_data: Dict[str, Any]) -> TNode:
+        """
+        Трансформация результата ALL_NODES_AND_ARCS_QUERY в объект TNode со связями
+        
+        Args:
+            node_data: Данные узла со списком arcs в формате collect_arcs_values
+            
+        Returns:
+            Объект TNode
+        """
+        uri = _intern(node_data['uri'])
+        arcs = self.collect_arcs_values(uri, node_data['arcs'])
+        return TNode(node_data['element_id'], uri, node_data['description'], node_data['title'], arcs)
+    
+    def collect_arcs_values(self, node_uri: str, arcs_values: List[List[Any]]) -> List[TArc]:
+        """
+        Трансформация списка связей [element_id, type, node_uri_to] в объекты TArc
+        
+        Args:
+            node_uri: URI исходного узла
+            arcs_values: Значения связей в порядке element_id, type, node_uri_to
+            
+        Returns:
+            Список объектов TArc
+        """
+        return [TArc(values[0], _intern(values[1]), node_uri, _intern(values[2])) for values in arcs_values]
+    
+    def _nodes_by_labels_query(self, labels: List[str]) -> str:
+        """
+        Запрос выборки узлов по меткам
+        
+        Args:
+            labels: Непустой список меток
+            
+        Returns:
+            Текст запроса
+        """
+        labels = tuple(sorted(set(labels)))
+        return self._template(('get_nodes_by_labels', labels), lambda: f"""
+        MATCH (n{self._build_labels_clause(list(labels))})
+        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
+        """)
+    
+    def encode_cursor(self, uri: str, element_id: str) -> str:
+        """
+        Кодирование ключа последнего узла страницы в непрозрачный токен
+        
+        Args:
+            uri: URI узла
+            element_id: Element ID узла
+            
+        Returns:
+            Токен продолжения
+        """
+        raw = json.dumps([uri, element_id], ensure_ascii=False).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+    
+    def decode_cursor(self, cursor: str) -> Tuple[str, str]:
+        """
+        Декодирование токена продолжения
+        
+        Args:
+            cursor: Токен продолжения
+            
+        Returns:
+            Пара (uri, element_id) последнего узла предыдущей страницы
+        """
+        try:
+            uri, element_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, TypeError, UnicodeError):
+            raise ValueError("Некорректный токен продолжения")
+        return uri, element_id
+    
+    def _page_statement(self, pattern: str, limit: int, cursor: Optional[str] = None,
+                        condition: Optional[str] = None,
+                        with_arcs: bool = False) -> Tuple[str, Dict[str, Any]]:
+        """
+        Запрос страницы узлов по ключу (uri, elementId)
+        
+        Вместо SKIP используется условие на ключ последнего узла предыдущей
+        страницы, поэтому стоимость страницы не зависит от ее номера.
+        Запрашивается на один узел больше limit, чтобы узнать, есть ли
+        следующая страница.
+        
+        Args:
+            pattern: Шаблон узла n в MATCH, например "(n:`Class`)"
+            limit: Максимальное число узлов на странице
+            cursor: Токен продолжения предыдущей страницы
+            condition: Дополнительное условие WHERE
+            with_arcs: Загрузить исходящие связи узлов
+            
+        Returns:
+            Текст запроса и его параметры
+        """
+        if limit <= 0:
+            raise ValueError("Размер страницы должен быть положительным")
+        
+        parameters: Dict[str, Any] = {'limit': limit + 1}
+        if cursor:
+            after_uri, after_id = self.decode_cursor(cursor)
+            parameters.update(after_uri=after_uri, after_id=after_id)
+        
+        def build() -> str:
+            conditions = ["n.uri IS NOT NULL"]
+            if cursor:
+                conditions.append("n.uri >= $after_uri AND (n.uri > $after_uri OR elementId(n) > $after_id)")
+            if condition:
+                conditions.append(condition)
+            
+            arcs_clause = ""
+            arcs_return = ""
+            if with_arcs:
+                arcs_clause = """
+        OPTIONAL MATCH (n)-[r]->(m)
+        WITH n, collect({
+            element_id: elementId(r),
+            uri: type(r),
+            node_uri_from: n.uri,
+            node_uri_to: m.uri
+        }) as arcs
+        ORDER BY n.uri, elementId(n)"""
+                arcs_return = ", arcs"
+            
+            return f"""
+        MATCH {pattern}
+        WHERE {' AND '.join(conditions)}
+        WITH n
+        ORDER BY n.uri, elementId(n)
+        LIMIT $limit{arcs_clause}
+        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title{arcs_return}
+        """
+        
+        query = self._template(('page', pattern, bool(cursor), condition, with_arcs), build)
+        return query, parameters
+    
+    def _collect_page(self, results: List[Dict[str, Any]], limit: int, with_arcs: bool = False) -> TPage:
+        """
+        Сборка страницы из результатов запроса _page_statement
+        
+        Args:
+            results: Результаты запроса (до limit + 1 узлов)
+            limit: Максимальное число узлов на странице
+            with_arcs: Результаты содержат связи узлов
+            
+        Returns:
+            Страница узлов
+        """
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            last = results[-1]
+            next_cursor = self.encode_cursor(last['uri'], last['element_id'])
+        
+        items = []
+        for result in results:
+            node = self.collect_node(result)
+            if with_arcs:
+                node.arcs = [self.collect_arc(arc) for arc in result.get('arcs', []) if arc.get('element_id')]
+            items.append(node)
+        return TPage(items=items, next_cursor=next_cursor)
+    
+    def _nodes_page_pattern(self, labels: Optional[List[str]] = None) -> str:
+        """
+        Шаблон узла для страницы узлов с указанными метками
+        
+        Args:
+            labels: Список меток (по умолчанию общая метка)
+            
+        Returns:
+            Шаблон узла n
+        """
+        return f"(n{self._build_labels_clause(sorted(set(labels or [BASE_LABEL])))})"
+    
+    def _create_node_statement(self, params: Dict[str, Any]) -> str:
+        """
+        Подготовка запроса создания узла
+        
+        В params добавляется сгенерированный uri и удаляются метки.
+        
+        Args:
+            params: Параметры узла (title, description, labels и т.д.)
+            
+        Returns:
+            Текст запроса
+        """
+        # Генерируем URI если не указан
+        if 'uri' not in params:
+            params['uri'] = f"node_{self.generate_random_string()}"
+        
+        # Извлекаем метки если есть
+        labels = tuple(sorted(set(self._with_base_label(params.pop('labels', [])))))
+        
+        return self._template(('create_node', labels), lambda: f"""
+        CREATE (n{self._build_labels_clause(list(labels))} $props)
+        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
+        """)
+    
+    def _create_arc_query(self, arc_type: str) -> str:
+        """
+        Запрос создания связи заданного типа
+        
+        Args:
+            arc_type: Тип связи
+            
+        Returns:
+            Текст запроса
+        """
+        # Безопасно экранируем тип связи
+        return self._template(('create_arc', arc_type), lambda: f"""
+        MATCH (n1:Resource {{uri: $node1_uri}}), (n2:Resource {{uri: $node2_uri}})
+        CREATE (n1)-[r{self._build_labels_clause([arc_type])} $props]->(n2)
+        RETURN elementId(r) as element_id, type(r) as uri, n1.uri as node_uri_from, n2.uri as node_uri_to
+        """)
+    
+    def _chunks(self, rows: List[Any], size: int) -> Iterator[List[Any]]:
+        """
+        Разбиение списка на пачки
+        
+        Args:
+            rows: Исходный список
+            size: Размер пачки
+            
+        Returns:
+            Итератор по пачкам
+        """
+        if size <= 0:
+            raise ValueError("Размер пачки должен быть положительным")
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+    
+    def _group_nodes(self, params_list: List[Dict[str, Any]]) -> Dict[Tuple[str, ...], List[Dict[str, Any]]]:
+        """
+        Группировка строк массового создания узлов по набору меток
+        
+        Args:
+            params_list: Параметры узлов (как в create_node)
+            
+        Returns:
+            Строки {'idx', 'props'} по наборам меток
+        """
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for index, params in enumerate(params_list):
+            props = dict(params)
+            labels = tuple(sorted(set(self._with_base_label(props.pop('labels', [])))))
+            if 'uri' not in props:
+                props['uri'] = f"node_{self.generate_random_string()}"
+            groups.setdefault(labels, []).append({'idx': index, 'props': props})
+        return groups
+    
+    def _create_nodes_query(self, labels: Tuple[str, ...]) -> str:
+        """
+        Запрос создания пачки узлов с заданным набором меток
+        
+        Args:
+            labels: Отсортированный набор меток
+            
+        Returns:
+            Текст запроса
+        """
+        return self._template(('create_nodes', labels), lambda: f"""
+            UNWIND $rows AS row
+            CREATE (n{self._build_labels_clause(list(labels))})
+            SET n = row.props
+            RETURN row.idx as idx, elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
+            """)
+    
+    def _group_arcs(self, arcs: List[Tuple]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Группировка строк массового создания связей по типу
+        
+        Args:
+            arcs: Кортежи (node1_uri, node2_uri[, arc_type[, properties]])
+            
+        Returns:
+            Строки {'idx', 'node1_uri', 'node2_uri', 'props'} по типам связей
+        """
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for index, arc in enumerate(arcs):
+            node1_uri, node2_uri = arc[0], arc[1]
+            arc_type = arc[2] if len(arc) > 2 else "RELATES_TO"
+            properties = arc[3] if len(arc) > 3 else None
+            groups.setdefault(arc_type, []).append({
+                'idx': index,
+                'node1_uri': node1_uri,
+                'node2_uri': node2_uri,
+                'props': properties or {}
+            })
+        return groups
+    
+    def _create_arcs_query(self, arc_type: str) -> str:
+        """
+        Запрос создания пачки связей заданного типа
+        
+        Args:
+            arc_type: Тип связи
+            
+        Returns:
+            Текст запроса
+        """
+        return self._template(('create_arcs', arc_type), lambda: f"""
+            UNWIND $rows AS row
+            MATCH (n1:Resource {{uri: row.node1_uri}}), (n2:Resource {{uri: row.node2_uri}})
+            CREATE (n1)-[r{self._build_labels_clause([arc_type])}]->(n2)
+            SET r = row.props
+            RETURN row.idx as idx, elementId(r) as element_id, type(r) as uri, n1.uri as node_uri_from, n2.uri as node_uri_to
+            """)
+    
+    def _arcs_uris(self, rows: List[Dict[str, Any]]) -> set:
+        """
+        URI концов связей пачки
+        
+        Args:
+            rows: Строки из _group_arcs
+            
+        Returns:
+            Набор URI узлов
+        """
+        return {uri for row in rows for uri in (row['node1_uri'], row['node2_uri'])}
+    
+    def _group_upserts(self, rows: List[Dict[str, Any]]) -> Dict[Tuple[str, ...], List[Dict[str, Any]]]:
+        """
+        Группировка строк upsert_nodes по набору меток
+        
+        Args:
+            rows: Параметры узлов, каждая строка содержит uri
+            
+        Returns:
+            Строки {'uri', 'props'} по наборам меток (без общей метки)
+        """
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row in rows:
+            props = dict(row)
+            labels = tuple(sorted(set(props.pop('labels', [])) - {BASE_LABEL}))
+            if props.get('uri') is None:
+                raise ValueError("Строка upsert_nodes не содержит uri")
+            groups.setdefault(labels, []).append({'uri': props.pop('uri'), 'props': props})
+        return groups
+    
+    def _upsert_nodes_query(self, labels: Tuple[str, ...]) -> str:
+        """
+        Запрос upsert пачки узлов с заданным набором меток
+        
+        Args:
+            labels: Отсортированный набор меток (без общей метки)
+            
+        Returns:
+            Текст запроса
+        """
+        def build() -> str:
+            labels_set = f"\n            SET n{self._build_labels_clause(list(labels))}" if labels else ""
+            return f"""
+            UNWIND $rows AS row
+            MERGE (n{self._build_labels_clause([BASE_LABEL])} {{uri: row.uri}})
+            SET n += row.props{labels_set}
+            """
+        return self._template(('upsert_nodes', labels), build)
+    
+    def _merge_counters(self, counters_list: Iterable[SummaryCounters]) -> SummaryCounters:
+        """
+        Суммирование счетчиков изменений нескольких запросов
+        
+        Args:
+            counters_list: Счетчики отдельных запросов
+            
+        Returns:
+            Суммарные счетчики
+        """
+        total = SummaryCounters({})
+        for counters in counters_list:
+            for name in ('nodes_created', 'nodes_deleted', 'relationships_created', 'relationships_deleted',
+                         'properties_set', 'labels_added', 'labels_removed', 'indexes_added',
+                         'indexes_removed', 'constraints_added', 'constraints_removed', 'system_updates'):
+                setattr(total, name, getattr(total, name) + getattr(counters, name))
+        return total
+    
+    def _schema_statements(self) -> List[str]:
+        """
+        Запросы создания ограничений и индексов по uri
+        
+        Returns:
+            Список запросов
+        """
+        statements = [
+            f"CREATE CONSTRAINT {BASE_LABEL.lower()}_uri_unique IF NOT EXISTS "
+            f"FOR (n{self._build_labels_clause([BASE_LABEL])}) REQUIRE n.uri IS UNIQUE"
+        ]
+        for label in SCHEMA_LABELS:
+            statements.append(
+                f"CREATE INDEX {label.lower()}_uri_index IF NOT EXISTS "
+                f"FOR (n{self._build_labels_clause([label])}) ON (n.uri)"
+            )
+        return statements
+    
+    def _migrate_base_label_query(self) -> str:
+        """
+        Запрос добавления общей метки узлам пачками транзакций
+        
+        Узлы перебираются одним проходом, а метка ставится во вложенных
+        транзакциях по $batch_size строк. Повторный запрос с LIMIT на каждую
+        пачку заново просматривал бы уже помеченные узлы (O(N²/batch_size)).
+        
+        Returns:
+            Текст запроса
+        """
+        return f"""
+        MATCH (n)
+        WHERE n.uri IS NOT NULL AND NOT n{self._build_labels_clause([BASE_LABEL])}
+        CALL {{
+            WITH n
+            SET n{self._build_labels_clause([BASE_LABEL])}
+        }} IN TRANSACTIONS OF $batch_size ROWS
+        RETURN count(n) as updated
+        """
+
+
+class GraphRepository(_GraphRepositoryBase):
+    """Репозиторий для работы с графовой базой данных Neo4j"""
+    
+    def __init__(self, uri: str, user: str, password: str, database: str = None,
+                 driver: Driver = None, templates: CypherTemplateCache = None,
+                 cache: NodeCache = None, max_transaction_retry_time: Optional[float] = None,
+                 bookmark_manager: Any = None, pool: PoolConfig = None,
+                 query_hooks: Iterable[Callable[[TQueryEvent], None]] = None):
+        """
+        Инициализация репозитория
+        
+        Args:
+            uri: URI подключения к Neo4j
+            user: Имя пользователя
+            password: Пароль
+            database: Название базы данных (по умолчанию используется системная база)
+            driver: Готовый драйвер (например, из get_shared_driver). Репозиторий
+                только берет из него сессии и не закрывает его в close()
+            templates: Кэш текстов запросов (по умолчанию общий QUERY_TEMPLATES)
+            cache: Кэш прочитанных узлов по uri (по умолчанию не используется)
+            max_transaction_retry_time: Максимальное время повторов управляемой
+                транзакции при временных ошибках, секунды (для собственного драйвера;
+                по умолчанию значение драйвера)
+            bookmark_manager: Менеджер закладок сессий (по умолчанию общий менеджер
+                драйвера, поэтому чтение видит предыдущие записи через этот драйвер)
+            pool: Настройки пула соединений собственного драйвера (по умолчанию
+                значения драйвера)
+            query_hooks: Обработчики событий выполнения запросов TQueryEvent
+                (например, QueryStats). Без обработчиков сводка результата не читается
+        """
+        super().__init__(uri, user, password, database, driver, templates, cache,
+                         max_transaction_retry_time, bookmark_manager, pool, query_hooks)
+        # Транзакция unit_of_work своя у каждого потока
+        self._local = threading.local()
+    
+    def _create_driver(self) -> Driver:
+        return GraphDatabase.driver(self.uri, auth=(self.user, self.password), **self._driver_config)
+    
+    @classmethod
+    def from_shared_driver(cls, uri: str, user: str, password: str, database: str = None, **kwargs):
+        """
+        Создать репозиторий поверх общего драйвера процесса
+        
+        Args:
+            uri: URI подключения к Neo4j
+            user: Имя пользователя
+            password: Пароль
+            database: Название базы данных
+            **kwargs: Параметры репозитория; max_transaction_retry_time и pool
+                передаются в настройки общего драйвера
+            
+        Returns:
+            Репозиторий, не владеющий драйвером
+        """
+        retry_time = kwargs.pop('max_transaction_retry_time', None)
+        pool = kwargs.pop('pool', None)
+        config = {'max_transaction_retry_time': retry_time} if retry_time is not None else {}
+        if pool is not None:
+            config.update(pool.driver_config())
+        driver = get_shared_driver(uri, user, password, database, **config)
+        return cls(uri, user, password, database, driver=driver, **kwargs)
+    
+    def close(self):
+        """Закрытие соединения с базой данных (общий драйвер не закрывается)"""
+        if self.driver and self._owns_driver:
+            self.driver.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Единица работы: одна сессия и одна явная транзакция
+        
+        Все методы репозитория, вызванные внутри блока в том же потоке,
+        выполняются в этой транзакции. Фиксация происходит один раз при выходе
+        из блока, при исключении транзакция откатывается. Вложенные блоки
+        используют внешнюю транзакцию.
+        
+        Yields:
+            Репозиторий
+        """
+        if self._current_transaction() is not None:
+            yield self
+            return
+        
+        with self._session() as session:
+            tx = session.begin_transaction()
+            self._local.tx = tx
+            self._local.dirty = set()
+            # Фиксация вне ветки отката: неудачный commit закрывает транзакцию,
+            # и rollback скрыл бы исходную ошибку
+            try:
+                yield self
+            except BaseException:
+                tx.rollback()
+                raise
+            else:
+                tx.commit()
+            finally:
+                self._local.tx = None
+                tx.close()
+                dirty, self._local.dirty = self._local.dirty, None
+                self._invalidate_committed(dirty)
+    
+    def _session(self, **config):
+        """
+        Открытие сессии общего пула драйвера
+        
+        Args:
+            **config: Дополнительные параметры сессии (например, fetch_size)
+            
+        Returns:
+            Сессия Neo4j
+        """
+        return self.driver.session(database=self.database, bookmark_manager=self.bookmark_manager, **config)
+    
+    def _current_transaction(self):
+        """
+        Текущая транзакция unit_of_work для потока
+        
+        Returns:
+            Транзакция или None, если блок unit_of_work не открыт
+        """
+        return getattr(self._local, 'tx', None)
+    
+    def _dirty_uris(self) -> Optional[set]:
+        return getattr(self._local, 'dirty', None)
+    
+    def _execute_managed(self, work: Callable[[Any], Any], access_mode: str = WRITE_ACCESS) -> Any:
+        """
+        Выполнение функции транзакции в управляемой транзакции
+        
+        Внутри unit_of_work функция выполняется в ее транзакции. Иначе драйвер
+        выполняет ее через execute_read/execute_write и повторяет при временных
+        ошибках (с экспоненциальной задержкой) в пределах
+        max_transaction_retry_time, поэтому функция должна быть идемпотентной.
+        Чтения в кластере направляются на реплики чтения.
+        
+        Args:
+            work: Функция, получающая транзакцию
+            access_mode: READ_ACCESS для чтения, WRITE_ACCESS для изменения
+            
+        Returns:
+            Результат функции
+        """
+        tx = self._current_transaction()
+        if tx is not None:
+            return work(tx)
+        
+        with self._session() as session:
+            if access_mode == READ_ACCESS:
+                return session.execute_read(work)
+            return session.execute_write(work)
+    
+    def _execute_query(self, query: str, parameters: Dict[str, Any] = None,
+                       access_mode: str = WRITE_ACCESS) -> List[Dict[str, Any]]:
+        """
+        Выполнение запроса к базе данных в управляемой транзакции
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            access_mode: READ_ACCESS для чтения, WRITE_ACCESS для изменения
+            
+        Returns:
+            Список результатов запроса
+        """
+        with self._instrument(query, parameters, access_mode) as event:
+            def work(tx) -> List[Dict[str, Any]]:
+                result = tx.run(query, parameters or {})
+                records = [record.data() for record in result]
+                if event is not None:
+                    event.record(len(records), result.consume())
+                return records
+            
+            return self._execute_managed(work, access_mode)
+    
+    def _run_auto_commit(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Выполнение запроса в неявной (auto-commit) транзакции без повторов
+        
+        Нужно для запросов, которые нельзя выполнить в явной транзакции,
+        например CALL { ... } IN TRANSACTIONS.
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            
+        Returns:
+            Список результатов запроса
+        """
+        with self._instrument(query, parameters, WRITE_ACCESS) as event:
+            def collect(result) -> List[Dict[str, Any]]:
+                records = [record.data() for record in result]
+                if event is not None:
+                    event.record(len(records), result.consume())
+                return records
+            
+            tx = self._current_transaction()
+            if tx is not None:
+                return collect(tx.run(query, parameters or {}))
+            
+            with self._session() as session:
+                return collect(session.run(query, parameters or {}))
+    
+    def iter_records(self, query: str, parameters: Dict[str, Any] = None,
+                     fetch_size: Optional[int] = None, access_mode: str = READ_ACCESS) -> Iterator[Record]:
+        """
+        Потоковое выполнение запроса
+        
+        Записи читаются из курсора драйвера по мере итерации пачками по
+        fetch_size, поэтому результат не накапливается в памяти целиком.
+        Сессия остается открытой, пока итератор не исчерпан или не закрыт.
+        Уже выданные записи нельзя отозвать, поэтому потоковый запрос
+        выполняется вне execute_read/execute_write: он не повторяется при
+        временных ошибках и не передается query_hooks, но маршрутизируется по
+        access_mode. Этот путь используют только потоковые методы iter_*,
+        остальные чтения выполняются через _execute_query.
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            fetch_size: Число записей, запрашиваемых у сервера за раз
+                (по умолчанию значение драйвера)
+            access_mode: READ_ACCESS для чтения, WRITE_ACCESS для изменения
+            
+        Yields:
+            Записи результата (neo4j.Record)
+        """
+        tx = self._current_transaction()
+        if tx is not None:
+            yield from tx.run(query, parameters or {})
+            return
+        
+        config = {'fetch_size': fetch_size} if fetch_size else {}
+        with self._session(default_access_mode=access_mode, **config) as session:
+            yield from session.run(query, parameters or {})
+    
+    def iter_query(self, query: str, parameters: Dict[str, Any] = None,
+                   fetch_size: Optional[int] = None, access_mode: str = READ_ACCESS) -> Iterator[Dict[str, Any]]:
+        """
+        Потоковое выполнение запроса с выдачей записей в виде словарей
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            fetch_size: Число записей, запрашиваемых у сервера за раз
+            access_mode: READ_ACCESS для чтения, WRITE_ACCESS для изменения
+            
+        Yields:
+            Записи результата в виде словарей
+        """
+        for record in self.iter_records(query, parameters, fetch_size, access_mode):
+            yield record.data()
+    
+    def _execute_summary(self, query: str, parameters: Dict[str, Any] = None):
+        """
+        Выполнение изменяющего запроса в управляемой транзакции с получением статистики
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            
+        Returns:
+            Счетчики изменений (SummaryCounters)
+        """
+        with self._instrument(query, parameters, WRITE_ACCESS) as event:
+            def work(tx) -> SummaryCounters:
+                # Получаем статистику выполнения запроса
+                summary = tx.run(query, parameters or {}).consume()
+                if event is not None:
+                    event.record(0, summary)
+                return summary.counters
+            
+            return self._execute_managed(work)
+    
+    def gather(self, *calls: Union[Callable[[], Any], Tuple],
+               max_workers: int = DEFAULT_GATHER_WORKERS) -> TGatherResult:
+        """
+        Параллельное выполнение независимых вызовов чтения
+        
+        Каждый вызов выполняется в общем пуле потоков из max_workers потоков
+        и берет свою сессию из пула соединений драйвера, поэтому общее время
+        близко к времени самого долгого вызова, а не к сумме. Внутри
+        unit_of_work вызовы выполняются последовательно в ее транзакции.
+        Вызовы не должны сами вызывать gather, иначе пул может исчерпаться.
+        
+        Args:
+            *calls: Функции без аргументов или кортежи (метод, *аргументы),
+                например (repo.get_class, class_uri)
+            max_workers: Максимальное число одновременно выполняемых вызовов
+            
+        Returns:
+            Результаты вызовов в порядке аргументов и время каждого вызова
+        """
+        bound = [self._bind_call(call) for call in calls]
+        started = time.perf_counter()
+        if self._current_transaction() is not None or len(bound) <= 1:
+            outcomes = [_timed_call(call) for call in bound]
+        else:
+            executor = _get_gather_executor(max_workers)
+            futures = [executor.submit(_timed_call, call) for call in bound]
+            outcomes = [future.result() for future in futures]
+        return self._gather_result(outcomes, time.perf_counter() - started)
+    
+    def get_all_nodes(self) -> List[TNode]:
+        """
+        Получить все узлы графа
+        
+        Returns:
+            Список всех узлов
+        """
+        results = self._execute_query(self.ALL_NODES_QUERY, access_mode=READ_ACCESS)
+        return [self.collect_node(result) for result in results]
+    
+    def iter_all_nodes(self, fetch_size: Optional[int] = None) -> Iterator[TNode]:
+        """
+        Потоково получить все узлы графа
+        
+        Args:
+            fetch_size: Число записей, запрашиваемых у сервера за раз
+            
+        Yields:
+            Узлы графа
+        """
+        for record in self.iter_records(self.ALL_NODES_QUERY, fetch_size=fetch_size):
+            yield self.collect_node_record(record)
+    
+    def get_all_nodes_and_arcs(self) -> List[TNode]:
+        """
+        Получить все узлы с их связями
+        
+        Returns:
+            Список узлов с их связями
+        """
+        results = self._execute_query(self.ALL_NODES_AND_ARCS_QUERY, access_mode=READ_ACCESS)
+        return [self.collect_node_with_arcs(result) for result in results]
+    
+    def iter_all_nodes_and_arcs(self, fetch_size: Optional[int] = None) -> Iterator[TNode]:
+        """
+        Потоково получить все узлы с их связями
+        
+        Args:
+            fetch_size: Число записей, запрашиваемых у сервера за раз
+            
+        Yields:
+            Узлы графа с их исходящими связями
+        """
+        for record in self.iter_records(self.ALL_NODES_AND_ARCS_QUERY, fetch_size=fetch_size):
+            yield self.collect_node_record(record)
+    
+    def get_graph_columns(self, fetch_size: Optional[int] = None) -> TGraphColumns:
+        """
+        Получить весь граф в столбцовом представлении для анализа
+        
+        Узлы и связи читаются управляемыми транзакциями чтения и сразу
+        складываются в столбцы, объекты TNode/TArc не создаются. Требуется numpy.
+        
+        Args:
+            fetch_size: Не используется (для совместимости; для потокового
+                чтения - iter_records)
+            
+        Returns:
+            Столбцы узлов и список связей с целочисленными концами
+        """
+        np = _import_numpy()
+        columns = _GraphColumnsBuilder()
+        for record in self._execute_query(self.COLUMNS_NODES_QUERY, access_mode=READ_ACCESS):
+            columns.add_node(record)
+        for record in self._execute_query(self.COLUMNS_ARCS_QUERY, access_mode=READ_ACCESS):
+            columns.add_arc(record)
+        return columns.build(np)
+    
+    def get_nodes_by_labels(self, labels: List[str]) -> List[TNode]:
+        """
+        Получить выборку узлов по их меткам
+        
+        Args:
+            labels: Список меток для поиска
+            
+        Returns:
+            Список узлов с указанными метками
+        """
+        if not labels:
+            return []
+        
+        results = self._execute_query(self._nodes_by_labels_query(labels), access_mode=READ_ACCESS)
+        return [self.collect_node(result) for result in results]
+    
+    def _fetch_page(self, pattern: str, limit: int, cursor: Optional[str] = None,
+                    condition: Optional[str] = None, with_arcs: bool = False) -> TPage:
+        """
+        Получение страницы узлов по ключу (uri, elementId)
+        
+        Args:
+            pattern: Шаблон узла n в MATCH, например "(n:`Class`)"
+            limit: Максимальное число узлов на странице
+            cursor: Токен продолжения предыдущей страницы
+            condition: Дополнительное условие WHERE
+            with_arcs: Загрузить исходящие связи узлов
+            
+        Returns:
+            Страница узлов
+        """
+        query, parameters = self._page_statement(pattern, limit, cursor, condition, with_arcs)
+        results = self._execute_query(query, parameters, access_mode=READ_ACCESS)
+        return self._collect_page(results, limit, with_arcs)
+    
+    def get_nodes_page(self, limit: int, cursor: Optional[str] = None,
+                       labels: Optional[List[str]] = None) -> TPage:
+        """
+        Получить страницу узлов (всех или с указанными метками)
+        
+        Args:
+            limit: Максимальное число узлов на странице
+            cursor: Токен продолжения, полученный с предыдущей страницей
+            labels: Список меток для фильтрации
+            
+        Returns:
+            Страница узлов, упорядоченных по uri
+        """
+        return self._fetch_page(self._nodes_page_pattern(labels), limit, cursor)
+    
+    def get_nodes_and_arcs_page(self, limit: int, cursor: Optional[str] = None) -> TPage:
+        """
+        Получить страницу узлов с их связями
+        
+        Args:
+            limit: Максимальное число узлов на странице
+            cursor: Токен продолжения, полученный с предыдущей страницей
+            
+        Returns:
+            Страница узлов с их связями, упорядоченных по uri
+        """
+        return self._fetch_page(self._nodes_page_pattern(), limit, cursor, with_arcs=True)
+    
+    def get_node_by_uri(self, uri: str) -> Optional[TNode]:
+        """
+        Получить узел по URI
+        
+        Args:
+            uri: URI узла
+            
+        Returns:
+            Узел или None, если не найден
+        """
+        cached = self._cache_get(uri)
+        if cached is not None:
+            return cached
+        
+        results = self._execute_query(self.NODE_BY_URI_QUERY, {'uri': uri}, access_mode=READ_ACCESS)
+        if results:
+            node = self.collect_node(results[0])
+            self._cache_put(uri, node)
+            return node
+        return None
+    
+    def create_node(self, params: Dict[str, Any]) -> TNode:
+        """
+        Создать новый узел
+        
+        Args:
+            params: Параметры узла (title, description, labels и т.д.)
+            
+        Returns:
+            Созданный узел
+        """
+        query = self._create_node_statement(params)
+        
+        results = self._execute_query(query, {'props': params.copy()})
+        if results:
+            return self.collect_node(results[0])
+        raise Exception("Не удалось создать узел")
+    
+    def create_arc(self, node1_uri: str, node2_uri: str, arc_type: str = "RELATES_TO", properties: Dict[str, Any] = None) -> TArc:
+        """
+        Создать связь между узлами
+        
+        Args:
+            node1_uri: URI первого узла
+            node2_uri: URI второго узла
+            arc_type: Тип связи
+            properties: Дополнительные свойства связи
+            
+        Returns:
+            Созданная связь
+        """
+        results = self._execute_query(self._create_arc_query(arc_type), {
+            'node1_uri': node1_uri,
+            'node2_uri': node2_uri,
+            'props': properties or {}
+        })
+        self._invalidate(node1_uri, node2_uri)
+        
+        if results:
+            return self.collect_arc(results[0])
+        raise Exception("Не удалось создать связь")
+    
+    def _run_chunk(self, key: str, query: str, rows: List[Dict[str, Any]],
+                   on_chunk: Optional[Callable[[TBatchChunk], None]]) -> List[Dict[str, Any]]:
+        """
+        Выполнение одной пачки массовой операции с замером времени
+        
+        Args:
+            key: Набор меток или тип связи пачки
+            query: Cypher запрос с UNWIND $rows
+            rows: Строки пачки
+            on_chunk: Функция, получающая статистику пачки
+            
+        Returns:
+            Результаты запроса
+        """
+        started = time.perf_counter()
+        results = self._execute_query(query, {'rows': rows})
+        if on_chunk:
+            on_chunk(TBatchChunk(key=key, size=len(rows), seconds=time.perf_counter() - started))
+        return results
+    
+    def create_nodes(self, params_list: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE,
+                     on_chunk: Optional[Callable[[TBatchChunk], None]] = None) -> List[TNode]:
+        """
+        Массовое создание узлов
+        
+        Узлы группируются по набору меток, каждая пачка группы создается одним
+        запросом UNWIND.
+        
+        Args:
+            params_list: Параметры узлов (как в create_node)
+            batch_size: Максимальное число узлов в одном запросе
+            on_chunk: Функция, получающая статистику каждой пачки (TBatchChunk)
+            
+        Returns:
+            Созданные узлы в порядке входного списка
+        """
+        nodes: List[Optional[TNode]] = [None] * len(params_list)
+        for labels, rows in self._group_nodes(params_list).items():
+            labels_clause = self._build_labels_clause(list(labels))
+            query = self._create_nodes_query(labels)
+            for chunk in self._chunks(rows, batch_size):
+                for result in self._run_chunk(labels_clause, query, chunk, on_chunk):
+                    nodes[result['idx']] = self.collect_node(result)
+        
+        if any(node is None for node in nodes):
+            raise Exception("Не удалось создать узлы")
+        return nodes
+    
+    def create_arcs(self, arcs: List[Tuple], batch_size: int = DEFAULT_BATCH_SIZE,
+                    on_chunk: Optional[Callable[[TBatchChunk], None]] = None) -> List[TArc]:
+        """
+        Массовое создание связей
+        
+        Связи группируются по типу, каждая пачка группы создается одним
+        запросом UNWIND.
+        
+        Args:
+            arcs: Кортежи (node1_uri, node2_uri[, arc_type[, properties]])
+            batch_size: Максимальное число связей в одном запросе
+            on_chunk: Функция, получающая статистику каждой пачки (TBatchChunk)
+            
+        Returns:
+            Созданные связи в порядке входного списка (связи, для которых
+            не найден один из узлов, пропускаются)
+        """
+        created: Dict[int, TArc] = {}
+        for arc_type, rows in self._group_arcs(arcs).items():
+            query = self._create_arcs_query(arc_type)
+            for chunk in self._chunks(rows, batch_size):
+                for result in self._run_chunk(arc_type, query, chunk, on_chunk):
+                    created[result['idx']] = self.collect_arc(result)
+                self._invalidate(*self._arcs_uris(chunk))
+        
+        return [created[index] for index in sorted(created)]
+    
+    def delete_node_by_uri(self, uri: str) -> bool:
+        """
+        Удалить узел по URI
+        
+        Args:
+            uri: URI узла для удаления
+            
+        Returns:
+            True если узел удален, False если не найден
+        """
+        counters = self._execute_summary(self.DELETE_NODE_QUERY, {'uri': uri})
+        self._invalidate(uri)
+        return counters.nodes_deleted > 0
+    
+    def delete_arc_by_id(self, arc_id: str) -> bool:
+        """
+        Удалить связь по element ID
+        
+        Args:
+            arc_id: Element ID связи для удаления
+            
+        Returns:
+            True если связь удалена, False если не найдена
+        """
+        counters = self._execute_summary(self.DELETE_ARCS_QUERY, {'arc_ids': [arc_id]})
+        # Концы связи неизвестны, поэтому сбрасывается весь кэш
+        self._invalidate()
+        return counters.relationships_deleted > 0
+    
+    def upsert_nodes(self, rows: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> TUpsertStats:
+        """
+        Массовое идемпотентное создание-или-обновление узлов
+        
+        Узел ищется по uri (MERGE по ограничению уникальности ensure_schema),
+        найденный узел обновляется остальными свойствами строки, отсутствующий -
+        создается. Строки группируются по набору меток, пачка группы
+        выполняется одним запросом.
+        
+        Args:
+            rows: Параметры узлов (как в create_node), каждая строка содержит uri
+            batch_size: Максимальное число узлов в одном запросе
+            
+        Returns:
+            Число созданных и обновленных узлов
+        """
+        created = 0
+        total = 0
+        for labels, group in self._group_upserts(rows).items():
+            query = self._upsert_nodes_query(labels)
+            for chunk in self._chunks(group, batch_size):
+                created += self._execute_summary(query, {'rows': chunk}).nodes_created
+                total += len(chunk)
+                self._invalidate(*(row['uri'] for row in chunk))
+        return TUpsertStats(created=created, updated=total - created)
+    
+    def update_nodes(self, updates: Dict[str, Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Массовое обновление свойств узлов
+        
+        Args:
+            updates: Новые свойства узлов по их URI
+            batch_size: Максимальное число узлов в одном запросе
+            
+        Returns:
+            Число обновленных узлов
+        """
+        rows = [{'uri': uri, 'props': props} for uri, props in updates.items() if props]
+        updated = 0
+        for chunk in self._chunks(rows, batch_size):
+            results = self._execute_query(self.UPDATE_NODES_QUERY, {'rows': chunk})
+            updated += results[0]['updated'] if results else 0
+            self._invalidate(*(row['uri'] for row in chunk))
+        return updated
+    
+    def delete_nodes_by_uris(self, uris: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> SummaryCounters:
+        """
+        Массовое удаление узлов по URI
+        
+        Каждая пачка удаляется одним запросом UNWIND в своей транзакции
+        (внутри unit_of_work - в общей транзакции).
+        
+        Args:
+            uris: URI узлов для удаления
+            batch_size: Максимальное число узлов в одном запросе
+            
+        Returns:
+            Суммарные счетчики изменений (nodes_deleted, relationships_deleted)
+        """
+        # Итератор нельзя пройти дважды: для запросов и для инвалидации кэша
+        uris = list(uris)
+        counters = self._merge_counters(
+            self._execute_summary(self.DELETE_NODES_QUERY, {'uris': chunk})
+            for chunk in self._chunks(uris, batch_size)
+        )
+        # Без uri _invalidate сбросил бы весь кэш
+        if uris:
+            self._invalidate(*uris)
+        return counters
+    
+    def delete_arcs_by_ids(self, arc_ids: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> SummaryCounters:
+        """
+        Массовое удаление связей по element ID
+        
+        Args:
+            arc_ids: Element ID связей для удаления
+            batch_size: Максимальное число связей в одном запросе
+            
+        Returns:
+            Суммарные счетчики изменений (relationships_deleted)
+        """
+        counters = self._merge_counters(
+            self._execute_summary(self.DELETE_ARCS_QUERY, {'arc_ids': chunk})
+            for chunk in self._chunks(list(arc_ids), batch_size)
+        )
+        self._invalidate()
+        return counters
+    
+    def update_node(self, uri: str, params: Dict[str, Any]) -> Optional[TNode]:
+        """
+        Обновить узел
+        
+        Args:
+            uri: URI узла для обновления
+            params: Новые параметры узла
+            
+        Returns:
+            Обновленный узел или None если не найден
+        """
+        if not params:
+            return None
+        
+        results = self._execute_query(self.UPDATE_NODE_QUERY, {'uri': uri, 'props': params})
+        self._invalidate(uri)
+        if results:
+            return self.collect_node(results[0])
+        return None
+    
+    # ==================== СХЕМА ====================
+    
+    def ensure_schema(self) -> List[str]:
+        """
+        Идемпотентное создание ограничений и индексов по uri
+        
+        Для общей метки создается ограничение уникальности uri, для меток
+        онтологии (SCHEMA_LABELS) - индексы. Существующие узлы без общей
+        метки нужно предварительно перенести через migrate_base_label.
+        Нельзя вызывать внутри unit_of_work: схема меняется в отдельных транзакциях.
+        
+        Returns:
+            Список выполненных запросов
+        """
+        statements = self._schema_statements()
+        for statement in statements:
+            self._execute_summary(statement)
+        return statements
+    
+    def migrate_base_label(self, batch_size: int = 10000) -> int:
+        """
+        Добавление общей метки всем узлам с uri, у которых ее еще нет
+        
+        Узлы просматриваются одним проходом, метка ставится пачками вложенных
+        транзакций (CALL { ... } IN TRANSACTIONS), чтобы не держать одну
+        большую транзакцию. Запрос выполняется в неявной транзакции, поэтому
+        его нельзя вызывать внутри unit_of_work.
+        
+        Args:
+            batch_size: Число узлов, обрабатываемых одной вложенной транзакцией
+            
+        Returns:
+            Число обновленных узлов
+        """
+        results = self._run_auto_commit(self._migrate_base_label_query(), {'batch_size': batch_size})
+        return results[0]['updated'] if results else 0
+    
+    def run_custom_query(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Выполнение произвольного запроса Cypher
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            
+        Returns:
+            Результаты запроса
+        """
+        return self._run_auto_commit(query, parameters)
+
+
+class AsyncGraphRepository(_GraphRepositoryBase):
+    """
+    Асинхронный репозиторий для работы с графовой базой данных Neo4j
+    
+    Асинхронный двойник GraphRepository на AsyncDriver: те же методы
+    (корутины) и те же результаты TNode/TArc, потоковые методы iter_*
+    являются асинхронными итераторами. Транзакция unit_of_work хранится
+    в contextvars и видна только задаче, открывшей блок.
+    """
+    
+    def __init__(self, uri: str, user: str, password: str, database: str = None,
+                 driver: AsyncDriver = None, templates: CypherTemplateCache = None,
+                 cache: NodeCache = None, max_transaction_retry_time: Optional[float] = None,
+                 bookmark_manager: Any = None, pool: PoolConfig = None,
+                 query_hooks: Iterable[Callable[[TQueryEvent], None]] = None):
+        """
+        Инициализация асинхронного репозитория
+        
+        Args:
+            uri: URI подключения к Neo4j
+            user: Имя пользователя
+            password: Пароль
+            database: Название базы данных (по умолчанию используется системная база)
+            driver: Готовый AsyncDriver. Репозиторий только берет из него сессии
+                и не закрывает его в close()
+            templates: Кэш текстов запросов (по умолчанию общий QUERY_TEMPLATES)
+            cache: Кэш прочитанных узлов по uri (по умолчанию не используется)
+            max_transaction_retry_time: Максимальное время повторов управляемой
+                транзакции при временных ошибках, секунды (для собственного драйвера;
+                по умолчанию значение драйвера)
+            bookmark_manager: Менеджер закладок сессий (по умолчанию общий менеджер
+                драйвера, поэтому чтение видит предыдущие записи через этот драйвер)
+            pool: Настройки пула соединений собственного драйвера (по умолчанию
+                значения драйвера)
+            query_hooks: Обработчики событий выполнения запросов TQueryEvent
+                (например, QueryStats). Без обработчиков сводка результата не читается
+        """
+        super().__init__(uri, user, password, database, driver, templates, cache,
+                         max_transaction_retry_time, bookmark_manager, pool, query_hooks)
+        # Пара (транзакция, измененные uri) текущего unit_of_work задачи
+        self._uow: ContextVar[Optional[Tuple[Any, set]]] = ContextVar(f'graph_repository_uow_{id(self)}', default=None)
+    
+    def _create_driver(self) -> AsyncDriver:
+        return AsyncGraphDatabase.driver(self.uri, auth=(self.user, self.password), **self._driver_config)
+    
+    async def close(self):
+        """Закрытие соединения с базой данных (переданный драйвер не закрывается)"""
+        if self.driver and self._owns_driver:
+            await self.driver.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+    
+    @asynccontextmanager
+    async def unit_of_work(self):
+        """
+        Единица работы: одна сессия и одна явная транзакция
+        
+        Все методы репозитория, вызванные внутри блока в той же задаче,
+        выполняются в этой транзакции. Транзакция не допускает параллельных
+        запросов, поэтому внутри блока вызовы нужно ожидать по очереди.
+        
+        Yields:
+            Репозиторий
+        """
+        if self._current_transaction() is not None:
+            yield self
+            return
+        
+        async with self._session() as session:
+            tx = await session.begin_transaction()
+            dirty: set = set()
+            token = self._uow.set((tx, dirty))
+            try:
+                yield self
+            except BaseException:
+                await tx.rollback()
+                raise
+            else:
+                await tx.commit()
+            finally:
+                self._uow.reset(token)
+                await tx.close()
+                self._invalidate_committed(dirty)
+    
+    def _session(self, **config):
+        """
+        Открытие асинхронной сессии драйвера
+        
+        Args:
+            **config: Дополнительные параметры сессии (например, fetch_size)
+            
+        Returns:
+            Асинхронная сессия Neo4j
+        """
+        return self.driver.session(database=self.database, bookmark_manager=self.bookmark_manager, **config)
+    
+    def _current_transaction(self):
+        state = self._uow.get()
+        return state[0] if state else None
+    
+    def _dirty_uris(self) -> Optional[set]:
+        state = self._uow.get()
+        return state[1] if state else None
+    
+    async def _execute_managed(self, work: Callable[[Any], Awaitable[Any]], access_mode: str = WRITE_ACCESS) -> Any:
+        """
+        Выполнение функции транзакции в управляемой транзакции (см. GraphRepository._execute_managed)
+        
+        Args:
+            work: Корутинная функция, получающая транзакцию
+            access_mode: READ_ACCESS для чтения, WRITE_ACCESS для изменения
+            
+        Returns:
+            Результат функции
+        """
+        tx = self._current_transaction()
+        if tx is not None:
+            return await work(tx)
+        
+        async with self._session() as session:
+            if access_mode == READ_ACCESS:
+                return await session.execute_read(work)
+            return await session.execute_write(work)
+    
+    async def _execute_query(self, query: str, parameters: Dict[str, Any] = None,
+                             access_mode: str = WRITE_ACCESS) -> List[Dict[str, Any]]:
+        """
+        Выполнение запроса к базе данных в управляемой транзакции
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            access_mode: READ_ACCESS для чтения, WRITE_ACCESS для изменения
+            
+        Returns:
+            Список результатов запроса
+        """
+        with self._instrument(query, parameters, access_mode) as event:
+            async def work(tx) -> List[Dict[str, Any]]:
+                result = await tx.run(query, parameters or {})
+                records = [record.data() async for record in result]
+                if event is not None:
+                    event.record(len(records), await result.consume())
+                return records
+            
+            return await self._execute_managed(work, access_mode)
+    
+    async def _run_auto_commit(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Выполнение запроса в неявной (auto-commit) транзакции без повторов
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            
+        Returns:
+            Список результатов запроса
+        """
+        with self._instrument(query, parameters, WRITE_ACCESS) as event:
+            async def collect(result) -> List[Dict[str, Any]]:
+                records = [record.data() async for record in result]
+                if event is not None:
+                    event.record(len(records), await result.consume())
+                return records
+            
+            tx = self._current_transaction()
+            if tx is not None:
+                return await collect(await tx.run(query, parameters or {}))
+            
+            async with self._session() as session:
+                return await collect(await session.run(query, parameters or {}))
+    
+    async def iter_records(self, query: str, parameters: Dict[str, Any] = None,
+                           fetch_size: Optional[int] = None,
+                           access_mode: str = READ_ACCESS) -> AsyncIterator[Record]:
+        """
+        Потоковое выполнение запроса
+        
+        Записи читаются из курсора драйвера пачками по fetch_size по мере
+        итерации. Сессия остается открытой, пока итератор не исчерпан или
+        не закрыт (aclose). Потоковый запрос не повторяется драйвером, но
+        маршрутизируется по access_mode.
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            fetch_size: Число записей, запрашиваемых у сервера за раз
+            access_mode: READ_ACCESS для чтения, WRITE_ACCESS для изменения
+            
+        Yields:
+            Записи результата (neo4j.Record)
+        """
+        tx = self._current_transaction()
+        if tx is not None:
+            async for record in await tx.run(query, parameters or {}):
+                yield record
+            return
+        
+        config = {'fetch_size': fetch_size} if fetch_size else {}
+        async with self._session(default_access_mode=access_mode, **config) as session:
+            async for record in await session.run(query, parameters or {}):
+                yield record
+    
+    async def iter_query(self, query: str, parameters: Dict[str, Any] = None,
+                         fetch_size: Optional[int] = None,
+                         access_mode: str = READ_ACCESS) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Потоковое выполнение запроса с выдачей записей в виде словарей
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            fetch_size: Число записей, запрашиваемых у сервера за раз
+            access_mode: READ_ACCESS для чтения, WRITE_ACCESS для изменения
+            
+        Yields:
+            Записи результата в виде словарей
+        """
+        async for record in self.iter_records(query, parameters, fetch_size, access_mode):
+            yield record.data()
+    
+    async def _execute_summary(self, query: str, parameters: Dict[str, Any] = None):
+        """
+        Выполнение изменяющего запроса в управляемой транзакции с получением статистики
+        
+        Args:
+            query: Cypher запрос
+            parameters: Параметры запроса
+            
+        Returns:
+            Счетчики изменений (SummaryCounters)
+        """
+        with self._instrument(query, parameters, WRITE_ACCESS) as event:
+            async def work(tx) -> SummaryCounters:
+                result = await tx.run(query, parameters or {})
+                summary = await result.consume()
+                if event is not None:
+                    event.record(0, summary)
+                return summary.counters
+            
+            return await self._execute_managed(work)
+    
+    async def gather(self, *calls: Union[Callable[[], Awaitable[Any]], Tuple],
+                     max_workers: int = DEFAULT_GATHER_WORKERS) -> TGatherResult:
+        """
+        Конкурентное выполнение независимых вызовов чтения
+        
+        Одновременно выполняется не более max_workers корутин, каждая в своей
+        сессии. Внутри unit_of_work вызовы выполняются последовательно.
+        
+        Args:
+            *calls: Функции без аргументов, возвращающие корутину, или кортежи
+                (метод, *аргументы)
+            max_workers: Максимальное число одновременно выполняемых вызовов
+            
+        Returns:
+            Результаты вызовов в порядке аргументов и время каждого вызова
+        """
+        if max_workers <= 0:
+            raise ValueError("Число одновременных вызовов должно быть положительным")
+        bound = [self._bind_call(call) for call in calls]
+        semaphore = asyncio.Semaphore(max_workers)
+        
+        async def timed(call):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    return await call(), None, time.perf_counter() - started
+                except Exception as error:
+                    return None, error, time.perf_counter() - started
+        
+        started = time.perf_counter()
+        if self._current_transaction() is not None:
+            outcomes = [await timed(call) for call in bound]
+        else:
+            outcomes = await asyncio.gather(*(timed(call) for call in bound))
+        return self._gather_result(list(outcomes), time.perf_counter() - started)
+    
+    async def get_all_nodes(self) -> List[TNode]:
+        """Получить все узлы графа"""
+        results = await self._execute_query(self.ALL_NODES_QUERY, access_mode=READ_ACCESS)
+        return [self.collect_node(result) for result in results]
+    
+    async def iter_all_nodes(self, fetch_size: Optional[int] = None) -> AsyncIterator[TNode]:
+        """Потоково получить все узлы графа"""
+        async for record in self.iter_records(self.ALL_NODES_QUERY, fetch_size=fetch_size):
+            yield self.collect_node_record(record)
+    
+    async def get_all_nodes_and_arcs(self) -> List[TNode]:
+        """Получить все узлы с их связями"""
+        results = await self._execute_query(self.ALL_NODES_AND_ARCS_QUERY, access_mode=READ_ACCESS)
+        return [self.collect_node_with_arcs(result) for result in results]
+    
+    async def iter_all_nodes_and_arcs(self, fetch_size: Optional[int] = None) -> AsyncIterator[TNode]:
+        """Потоково получить все узлы с их связями"""
+        async for record in self.iter_records(self.ALL_NODES_AND_ARCS_QUERY, fetch_size=fetch_size):
+            yield self.collect_node_record(record)
+    
+    async def get_graph_columns(self, fetch_size: Optional[int] = None) -> TGraphColumns:
+        """Получить весь граф в столбцовом представлении для анализа (требуется numpy)"""
+        np = _import_numpy()
+        columns = _GraphColumnsBuilder()
+        for record in await self._execute_query(self.COLUMNS_NODES_QUERY, access_mode=READ_ACCESS):
+            columns.add_node(record)
+        for record in await self._execute_query(self.COLUMNS_ARCS_QUERY, access_mode=READ_ACCESS):
+            columns.add_arc(record)
+        return columns.build(np)
+    
+    async def get_nodes_by_labels(self, labels: List[str]) -> List[TNode]:
+        """Получить выборку узлов по их меткам"""
+        if not labels:
+            return []
+        
+        results = await self._execute_query(self._nodes_by_labels_query(labels), access_mode=READ_ACCESS)
+        return [self.collect_node(result) for result in results]
+    
+    async def _fetch_page(self, pattern: str, limit: int, cursor: Optional[str] = None,
+                          condition: Optional[str] = None, with_arcs: bool = False) -> TPage:
+        """Получение страницы узлов по ключу (uri, elementId)"""
+        query, parameters = self._page_statement(pattern, limit, cursor, condition, with_arcs)
+        results = await self._execute_query(query, parameters, access_mode=READ_ACCESS)
+        return self._collect_page(results, limit, with_arcs)
+    
+    async def get_nodes_page(self, limit: int, cursor: Optional[str] = None,
+                             labels: Optional[List[str]] = None) -> TPage:
+        """Получить страницу узлов (всех или с указанными метками)"""
+        return await self._fetch_page(self._nodes_page_pattern(labels), limit, cursor)
+    
+    async def get_nodes_and_arcs_page(self, limit: int, cursor: Optional[str] = None) -> TPage:
+        """Получить страницу узлов с их связями"""
+        return await self._fetch_page(self._nodes_page_pattern(), limit, cursor, with_arcs=True)
+    
+    async def get_node_by_uri(self, uri: str) -> Optional[TNode]:
+        """Получить узел по URI"""
+        cached = self._cache_get(uri)
+        if cached is not None:
+            return cached
+        
+        results = await self._execute_query(self.NODE_BY_URI_QUERY, {'uri': uri}, access_mode=READ_ACCESS)
+        if results:
+            node = self.collect_node(results[0])
+            self._cache_put(uri, node)
+            return node
+        return None
+    
+    async def create_node(self, params: Dict[str, Any]) -> TNode:
+        """Создать новый узел"""
+        query = self._create_node_statement(params)
+        
+        results = await self._execute_query(query, {'props': params.copy()})
+        if results:
+            return self.collect_node(results[0])
+        raise Exception("Не удалось создать узел")
+    
+    async def create_arc(self, node1_uri: str, node2_uri: str, arc_type: str = "RELATES_TO", properties: Dict[str, Any] = None) -> TArc:
+        """Создать связь между узлами"""
+        results = await self._execute_query(self._create_arc_query(arc_type), {
+            'node1_uri': node1_uri,
+            'node2_uri': node2_uri,
+            'props': properties or {}
+        })
+        self._invalidate(node1_uri, node2_uri)
+        
+        if results:
+            return self.collect_arc(results[0])
+        raise Exception("Не удалось создать связь")
+    
+    async def _run_chunk(self, key: str, query: str, rows: List[Dict[str, Any]],
+                         on_chunk: Optional[Callable[[TBatchChunk], None]]) -> List[Dict[str, Any]]:
+        """Выполнение одной пачки массовой операции с замером времени"""
+        started = time.perf_counter()
+        results = await self._execute_query(query, {'rows': rows})
+        if on_chunk:
+            on_chunk(TBatchChunk(key=key, size=len(rows), seconds=time.perf_counter() - started))
+        return results
+    
+    async def create_nodes(self, params_list: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE,
+                           on_chunk: Optional[Callable[[TBatchChunk], None]] = None) -> List[TNode]:
+        """Массовое создание узлов"""
+        nodes: List[Optional[TNode]] = [None] * len(params_list)
+        for labels, rows in self._group_nodes(params_list).items():
+            labels_clause = self._build_labels_clause(list(labels))
+            query = self._create_nodes_query(labels)
+            for chunk in self._chunks(rows, batch_size):
+                for result in await self._run_chunk(labels_clause, query, chunk, on_chunk):
+                    nodes[result['idx']] = self.collect_node(result)
+        
+        if any(node is None for node in nodes):
+            raise Exception("Не удалось создать узлы")
+        return nodes
+    
+    async def create_arcs(self, arcs: List[Tuple], batch_size: int = DEFAULT_BATCH_SIZE,
+                          on_chunk: Optional[Callable[[TBatchChunk], None]] = None) -> List[TArc]:
+        """Массовое создание связей"""
+        created: Dict[int, TArc] = {}
+        for arc_type, rows in self._group_arcs(arcs).items():
+            query = self._create_arcs_query(arc_type)
+            for chunk in self._chunks(rows, batch_size):
+                for result in await self._run_chunk(arc_type, query, chunk, on_chunk):
+                    created[result['idx']] = self.collect_arc(result)
+                self._invalidate(*self._arcs_uris(chunk))
+        
+        return [created[index] for index in sorted(created)]
+    
+    async def delete_node_by_uri(self, uri: str) -> bool:
+        """Удалить узел по URI"""
+        counters = await self._execute_summary(self.DELETE_NODE_QUERY, {'uri': uri})
+        self._invalidate(uri)
+        return counters.nodes_deleted > 0
+    
+    async def delete_arc_by_id(self, arc_id: str) -> bool:
+        """Удалить связь по element ID"""
+        counters = await self._execute_summary(self.DELETE_ARCS_QUERY, {'arc_ids': [arc_id]})
+        self._invalidate()
+        return counters.relationships_deleted > 0
+    
+    async def upsert_nodes(self, rows: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> TUpsertStats:
+        """Массовое идемпотентное создание-или-обновление узлов по uri"""
+        created = 0
+        total = 0
+        for labels, group in self._group_upserts(rows).items():
+            query = self._upsert_nodes_query(labels)
+            for chunk in self._chunks(group, batch_size):
+                created += (await self._execute_summary(query, {'rows': chunk})).nodes_created
+                total += len(chunk)
+                self._invalidate(*(row['uri'] for row in chunk))
+        return TUpsertStats(created=created, updated=total - created)
+    
+    async def update_nodes(self, updates: Dict[str, Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Массовое обновление свойств узлов"""
+        rows = [{'uri': uri, 'props': props} for uri, props in updates.items() if props]
+        updated = 0
+        for chunk in self._chunks(rows, batch_size):
+            results = await self._execute_query(self.UPDATE_NODES_QUERY, {'rows': chunk})
+            updated += results[0]['updated'] if results else 0
+            self._invalidate(*(row['uri'] for row in chunk))
+        return updated
+    
+    async def delete_nodes_by_uris(self, uris: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> SummaryCounters:
+        """Массовое удаление узлов по URI"""
+        uris = list(uris)
+        counters = self._merge_counters([
+            await self._execute_summary(self.DELETE_NODES_QUERY, {'uris': chunk})
+            for chunk in self._chunks(uris, batch_size)
+        ])
+        if uris:
+            self._invalidate(*uris)
+        return counters
+    
+    async def delete_arcs_by_ids(self, arc_ids: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> SummaryCounters:
+        """Массовое удаление связей по element ID"""
+        counters = self._merge_counters([
+            await self._execute_summary(self.DELETE_ARCS_QUERY, {'arc_ids': chunk})
+            for chunk in self._chunks(list(arc_ids), batch_size)
+        ])
+        self._invalidate()
+        return counters
+    
+    async def update_node(self, uri: str, params: Dict[str, Any]) -> Optional[TNode]:
+        """Обновить узел"""
+        if not params:
+            return None
+        
+        results = await self._execute_query(self.UPDATE_NODE_QUERY, {'uri': uri, 'props': params})
+        self._invalidate(uri)
+        if results:
+            return self.collect_node(results[0])
+        return None
+    
+    # ==================== СХЕМА ====================
+    
+    async def ensure_schema(self) -> List[str]:
+        """Идемпотентное создание ограничений и индексов по uri"""
+        statements = self._schema_statements()
+        for statement in statements:
+            await self._execute_summary(statement)
+        return statements
+    
+    async def migrate_base_label(self, batch_size: int = 10000) -> int:
+        """Добавление общей метки всем узлам с uri пачками вложенных транзакций"""
+        results = await self._run_auto_commit(self._migrate_base_label_query(), {'batch_size': batch_size})
+        return results[0]['updated'] if results else 0
+    
+    async def run_custom_query(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Выполнение произвольного запроса Cypher"""
+        return await self._run_auto_commit(query, parameters)
+
+
+class BufferedGraphWriter:
+    """
+    Буфер отложенной записи для потокового создания узлов и связей
+    
+    create_node, create_arc и update_node только ставят операцию в очередь,
+    а запись выполняется пачками (create_nodes, update_nodes, create_arcs)
+    при накоплении batch_size операций или по возрасту старейшей операции
+    max_age. При сбросе сначала создаются узлы, затем применяются
+    обновления и создаются связи, поэтому связь может ссылаться на узел,
+    еще находящийся в буфере. Обновление узла из буфера объединяется
+    с его созданием.
+    
+    При background=True запись выполняет фоновый поток, а производитель
+    блокируется, только если в буфере max_pending операций. Ошибка
+    фоновой записи поднимается при следующем обращении к буферу, а
+    операции сбойной пачки не повторяются.
+    """
+    
+    def __init__(self, repository: 'GraphRepository', batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_age: Optional[float] = 1.0, max_pending: Optional[int] = None,
+                 background: bool = True, on_flush: Optional[Callable[[TFlushStats], None]] = None):
+        """
+        Инициализация буфера
+        
+        Args:
+            repository: Синхронный репозиторий для записи
+            batch_size: Число операций, при котором буфер сбрасывается
+            max_age: Максимальный возраст операции в буфере, секунды
+                (None - сброс только по размеру и вручную)
+            max_pending: Число операций в буфере, при котором производитель
+                ждет записи (по умолчанию 10 * batch_size)
+            background: Выполнять запись в фоновом потоке. Иначе запись
+                выполняется в потоке производителя, когда при добавлении
+                операции буфер заполнен или устарел
+            on_flush: Функция, получающая статистику каждого сброса
+        """
+        if batch_size <= 0:
+            raise ValueError("Размер пачки должен быть положительным")
+        self.repository = repository
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.max_pending = max_pending or 10 * batch_size
+        self.on_flush = on_flush
+        self.stats = TFlushStats()
+        
+        self._nodes: List[Dict[str, Any]] = []
+        self._buffered_nodes: Dict[str, Dict[str, Any]] = {}
+        self._updates: Dict[str, Dict[str, Any]] = {}
+        self._arcs: List[Tuple] = []
+        self._oldest: Optional[float] = None
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        
+        self._condition = threading.Condition()
+        # Сбросы выполняются по одному, чтобы связи не обгоняли свои узлы
+        self._write_lock = threading.Lock()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name='BufferedGraphWriter', daemon=True)
+            self._thread.start()
+    
+    @property
+    def pending(self) -> int:
+        """Число операций в буфере"""
+        return len(self._nodes) + len(self._updates) + len(self._arcs)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def create_node(self, params: Dict[str, Any]) -> str:
+        """
+        Поставить создание узла в очередь
+        
+        Args:
+            params: Параметры узла (как в GraphRepository.create_node)
+            
+        Returns:
+            URI узла (генерируется, если не задан), по которому на узел
+            можно ссылаться в create_arc до записи
+        """
+        params = dict(params)
+        if 'uri' not in params:
+            params['uri'] = f"node_{self.repository.generate_random_string()}"
+        
+        def enqueue() -> None:
+            self._nodes.append(params)
+            self._buffered_nodes[params['uri']] = params
+        
+        self._enqueue(enqueue)
+        return params['uri']
+    
+    def create_arc(self, node1_uri: str, node2_uri: str, arc_type: str = "RELATES_TO",
+                   properties: Dict[str, Any] = None) -> None:
+        """
+        Поставить создание связи в очередь
+        
+        Args:
+            node1_uri: URI первого узла (в базе или в буфере)
+            node2_uri: URI второго узла (в базе или в буфере)
+            arc_type: Тип связи
+            properties: Дополнительные свойства связи
+        """
+        self._enqueue(lambda: self._arcs.append((node1_uri, node2_uri, arc_type, properties or {})))
+    
+    def update_node(self, uri: str, params: Dict[str, Any]) -> None:
+        """
+        Поставить обновление свойств узла в очередь
+        
+        Args:
+            uri: URI узла (в базе или в буфере)
+            params: Новые свойства узла
+        """
+        def enqueue() -> None:
+            buffered = self._buffered_nodes.get(uri)
+            if buffered is not None:
+                buffered.update(params)
+            else:
+                self._updates.setdefault(uri, {}).update(params)
+        
+        self._enqueue(enqueue)
+    
+    def _enqueue(self, operation: Callable[[], None]) -> None:
+        """
+        Добавление операции в буфер с ожиданием при переполнении
+        
+        Args:
+            operation: Функция, изменяющая буфер под блокировкой
+        """
+        with self._condition:
+            self._raise_error()
+            if self._closed:
+                raise RuntimeError("Буфер записи закрыт")
+            while self._thread is not None and self.pending >= self.max_pending:
+                self._condition.wait()
+                self._raise_error()
+            operation()
+            first = self._oldest is None
+            if first:
+                self._oldest = time.monotonic()
+            due = self._due()
+            if due or first:
+                # Фоновый поток пересчитывает срок сброса по возрасту
+                self._condition.notify_all()
+        if due and self._thread is None:
+            self.flush()
+    
+    def _raise_error(self) -> None:
+        """Подъем ошибки фоновой записи (вызывается под блокировкой)"""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+    
+    def _take(self) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]], List[Tuple]]:
+        """
+        Извлечение содержимого буфера (вызывается под блокировкой)
+        
+        Returns:
+            Узлы, обновления и связи для записи
+        """
+        batch = (self._nodes, self._updates, self._arcs)
+        self._nodes, self._updates, self._arcs = [], {}, []
+        self._buffered_nodes = {}
+        self._oldest = None
+        return batch
+    
+    def flush(self) -> TFlushStats:
+        """
+        Запись всех операций буфера
+        
+        Returns:
+            Статистика сброса
+        """
+        with self._write_lock:
+            with self._condition:
+                self._raise_error()
+                batch = self._take()
+                self._condition.notify_all()
+            return self._write(*batch)
+    
+    def _write(self, nodes: List[Dict[str, Any]], updates: Dict[str, Dict[str, Any]],
+               arcs: List[Tuple]) -> TFlushStats:
+        """
+        Запись извлеченных операций пачками
+        
+        Args:
+            nodes: Параметры создаваемых узлов
+            updates: Новые свойства узлов по URI
+            arcs: Кортежи создаваемых связей
+            
+        Returns:
+            Статистика сброса
+        """
+        started = time.perf_counter()
+        if nodes:
+            self.repository.create_nodes(nodes, self.batch_size)
+        if updates:
+            self.repository.update_nodes(updates, self.batch_size)
+        created_arcs = len(self.repository.create_arcs(arcs, self.batch_size)) if arcs else 0
+        
+        stats = TFlushStats(
+            nodes=len(nodes),
+            updates=len(updates),
+            arcs=created_arcs,
+            arcs_skipped=len(arcs) - created_arcs,
+            seconds=time.perf_counter() - started
+        )
+        with self._condition:
+            self.stats.add(stats)
+        if self.on_flush and (nodes or updates or arcs):
+            self.on_flush(stats)
+        return stats
+    
+    def _run(self) -> None:
+        """Цикл фоновой записи"""
+        while True:
+            with self._condition:
+                while not self._closed and not self._due():
+                    self._condition.wait(self._wait_timeout())
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as error:
+                with self._condition:
+                    self._error = error
+                    self._condition.notify_all()
+    
+    def _due(self) -> bool:
+        """Пора ли сбрасывать буфер (вызывается под блокировкой)"""
+        if self.pending >= self.batch_size:
+            return True
+        return (self.max_age is not None and self._oldest is not None
+                and time.monotonic() - self._oldest >= self.max_age)
+    
+    def _wait_timeout(self) -> Optional[float]:
+        """Время ожидания фонового потока до сброса по возрасту (вызывается под блокировкой)"""
+        if self.max_age is None or self._oldest is None:
+            return None
+        return max(0.0, self._oldest + self.max_age - time.monotonic())
+    
+    def close(self) -> TFlushStats:
+        """
+        Остановка фоновой записи и запись оставшихся операций
+        
+        Returns:
+            Статистика последнего сброса
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.flush()
+
+
+class _MemoryNode:
+    """Узел графа в памяти"""
+    __slots__ = ('id', 'labels', 'props')
+    
+    def __init__(self, element_id: str, labels: Iterable[str], props: Dict[str, Any]):
+        self.id = element_id
+        self.labels = set(labels)
+        self.props = props
+
+
+class _MemoryArc:
+    """Связь графа в памяти"""
+    __slots__ = ('id', 'type', 'start', 'end', 'props')
+    
+    def __init__(self, element_id: str, arc_type: str, start: _MemoryNode, end: _MemoryNode,
+                 props: Dict[str, Any]):
+        self.id = element_id
+        self.type = arc_type
+        self.start = start
+        self.end = end
+        self.props = props
+
+
+class MemoryGraph:
+    """
+    Граф в памяти процесса для MemoryGraphRepository
+    
+    Хранит узлы и связи с индексами по uri и меткам и списками смежности
+    (исходящие и входящие связи узла). Порядок обхода совпадает с порядком
+    создания. Изменения выполняются под общей реентерабельной блокировкой;
+    transaction() держит ее до конца блока и при исключении откатывает
+    изменения блока по журналу отмены.
+    """
+    
+    def __init__(self):
+        """Инициализация пустого графа"""
+        self.nodes: Dict[str, _MemoryNode] = {}
+        self.arcs: Dict[str, _MemoryArc] = {}
+        # Упорядоченные множества (dict со значениями None) идентификаторов
+        self.uri_index: Dict[Any, Dict[str, None]] = {}
+        self.label_index: Dict[str, Dict[str, None]] = {}
+        self.out_arcs: Dict[str, Dict[str, None]] = {}
+        self.in_arcs: Dict[str, Dict[str, None]] = {}
+        self.lock = threading.RLock()
+        self._journal: Optional[List[Callable[[], None]]] = None
+        self._next_id = 0
+    
+    @classmethod
+    def from_repository(cls, repository: 'GraphRepository', fetch_size: Optional[int] = None) -> 'MemoryGraph':
+        """
+        Копия графа Neo4j в памяти (например, как модель для чтения)
+        
+        Element ID узлов и связей сохраняются, поэтому токены продолжения
+        страниц совместимы с исходной базой.
+        
+        Args:
+            repository: Синхронный репозиторий исходной базы
+            fetch_size: Число записей, запрашиваемых у сервера за раз
+            
+        Returns:
+            Граф в памяти
+        """
+        graph = cls()
+        for record in repository.iter_records(
+                "MATCH (n) RETURN elementId(n), labels(n), properties(n)", fetch_size=fetch_size):
+            graph._index_node(_MemoryNode(record[0], record[1], dict(record[2])))
+        for record in repository.iter_records(
+                "MATCH (n)-[r]->(m) RETURN elementId(r), type(r), elementId(n), elementId(m), properties(r)",
+                fetch_size=fetch_size):
+            graph._index_arc(_MemoryArc(record[0], record[1], graph.nodes[record[2]],
+                                        graph.nodes[record[3]], dict(record[4])))
+        return graph
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Транзакция: блокировка графа на время блока и откат при исключении
+        
+        Вложенные блоки того же потока входят во внешнюю транзакцию.
+        """
+        with self.lock:
+            if self._journal is not None:
+                yield
+                return
+            self._journal = []
+            try:
+                yield
+            except BaseException:
+                for undo in reversed(self._journal):
+                    undo()
+                raise
+            finally:
+                self._journal = None
+    
+    def _log(self, undo: Callable[[], None]) -> None:
+        """
+        Запись действия отмены в журнал открытой транзакции
         
-        self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+        Args:
+            undo: Функция, отменяющая изменение
+        """
+        if self._journal is not None:
+            self._journal.append(undo)
     
-    def close(self):
-        """Закрытие соединения с базой данных"""
-        if self.driver:
-            self.driver.close()
+    def _new_id(self) -> str:
+        """Новый element ID"""
+        self._next_id += 1
+        return f"memory:{self._next_id}"
     
-    def __enter__(self):
-        return self
+    def _index_node(self, node: _MemoryNode) -> None:
+        """Добавление узла в граф и индексы"""
+        self.nodes[node.id] = node
+        self.out_arcs[node.id] = {}
+        self.in_arcs[node.id] = {}
+        for label in node.labels:
+            self.label_index.setdefault(label, {})[node.id] = None
+        if node.props.get('uri') is not None:
+            self.uri_index.setdefault(node.props['uri'], {})[node.id] = None
     
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+    def _unindex_node(self, node: _MemoryNode) -> None:
+        """Удаление узла без связей из графа и индексов"""
+        del self.nodes[node.id]
+        del self.out_arcs[node.id]
+        del self.in_arcs[node.id]
+        for label in node.labels:
+            self.label_index[label].pop(node.id, None)
+        if node.props.get('uri') is not None:
+            self.uri_index[node.props['uri']].pop(node.id, None)
+    
+    def _index_arc(self, arc: _MemoryArc) -> None:
+        """Добавление связи в граф и списки смежности"""
+        self.arcs[arc.id] = arc
+        self.out_arcs[arc.start.id][arc.id] = None
+        self.in_arcs[arc.end.id][arc.id] = None
     
-    def _execute_query(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    def _unindex_arc(self, arc: _MemoryArc) -> None:
+        """Удаление связи из графа и списков смежности"""
+        del self.arcs[arc.id]
+        self.out_arcs[arc.start.id].pop(arc.id, None)
+        self.in_arcs[arc.end.id].pop(arc.id, None)
+    
+    def add_node(self, labels: Iterable[str], props: Dict[str, Any]) -> _MemoryNode:
         """
-        Выполнение запроса к базе данных
+        Создание узла (свойства со значением None не сохраняются)
         
         Args:
-            query: Cypher запрос
-            parameters: Параметры запроса
+            labels: Метки узла
+            props: Свойства узла
             
         Returns:
-            Список результатов запроса
+            Созданный узел
         """
-        with self.driver.session(database=self.database) as session:
-            result = session.run(query, parameters or {})
-            return [record.data() for record in result]
+        with self.lock:
+            node = _MemoryNode(self._new_id(), labels,
+                               {key: value for key, value in props.items() if value is not None})
+            self._index_node(node)
+            self._log(lambda: self._unindex_node(node))
+            return node
     
-    def generate_random_string(self, length: int = 10) -> str:
+    def add_arc(self, start: _MemoryNode, end: _MemoryNode, arc_type: str,
+                props: Dict[str, Any] = None) -> _MemoryArc:
         """
-        Генерация случайной строки для URI узла
+        Создание связи
         
         Args:
-            length: Длина генерируемой строки
+            start: Исходный узел
+            end: Целевой узел
+            arc_type: Тип связи
+            props: Свойства связи
             
         Returns:
-            Случайная строка
+            Созданная связь
         """
-        letters = string.ascii_lowercase + string.digits
-        return ''.join(random.choice(letters) for _ in range(length))
+        with self.lock:
+            arc = _MemoryArc(self._new_id(), arc_type, start, end,
+                             {key: value for key, value in (props or {}).items() if value is not None})
+            self._index_arc(arc)
+            self._log(lambda: self._unindex_arc(arc))
+            return arc
     
-    def _build_labels_clause(self, labels: List[str]) -> str:
+    def remove_arc(self, arc: _MemoryArc) -> None:
         """
-        Безопасное построение строки меток для Cypher запроса
+        Удаление связи
         
         Args:
-            labels: Список меток
-            
-        Returns:
-            Строка меток в формате Cypher
+            arc: Связь
         """
-        if not labels:
-            return ''
-        # Безопасно экранируем метки
-        escaped_labels = [f"`{label.replace('`', '``')}`" for label in labels]
-        return ':' + ':'.join(escaped_labels)
+        with self.lock:
+            self._unindex_arc(arc)
+            self._log(lambda: self._index_arc(arc))
     
-    def collect_node(self, node_data: Dict[str, Any]) -> TNode:
+    def remove_node(self, node: _MemoryNode) -> int:
         """
-        Трансформация данных узла из БД в объект TNode
+        Удаление узла вместе с его связями (DETACH DELETE)
         
         Args:
-            node_data: Данные узла из базы данных
+            node: Узел
             
         Returns:
-            Объект TNode
+            Число удаленных связей
         """
-        return TNode(
-            id=node_data.get('element_id', ''),
-            uri=node_data.get('uri', ''),
-            description=node_data.get('description', ''),
-            title=node_data.get('title', ''),
-            arcs=node_data.get('arcs', [])
-        )
+        with self.lock:
+            arcs = [self.arcs[arc_id] for arc_id in
+                    {**self.out_arcs[node.id], **self.in_arcs[node.id]}]
+            for arc in arcs:
+                self.remove_arc(arc)
+            self._unindex_node(node)
+            self._log(lambda: self._index_node(node))
+            return len(arcs)
     
-    def collect_arc(self, arc_data: Dict[str, Any]) -> TArc:
+    def set_props(self, node: _MemoryNode, props: Dict[str, Any]) -> None:
         """
-        Трансформация данных связи из БД в объект TArc
+        Обновление свойств узла (SET n += props: None удаляет свойство)
         
         Args:
-            arc_data: Данные связи из базы данных
-            
-        Returns:
-            Объект TArc
+            node: Узел
+            props: Новые свойства
         """
-        return TArc(
-            id=arc_data.get('element_id', ''),
-            uri=arc_data.get('uri', ''),
-            node_uri_from=arc_data.get('node_uri_from', ''),
-            node_uri_to=arc_data.get('node_uri_to', '')
-        )
+        with self.lock:
+            old_props = node.props
+            new_props = dict(old_props)
+            for key, value in props.items():
+                if value is None:
+                    new_props.pop(key, None)
+                else:
+                    new_props[key] = value
+            self._replace_props(node, new_props)
+            self._log(lambda: self._replace_props(node, old_props))
     
-    def get_all_nodes(self) -> List[TNode]:
+    def _replace_props(self, node: _MemoryNode, props: Dict[str, Any]) -> None:
+        """Замена свойств узла с обновлением индекса uri"""
+        old_uri, new_uri = node.props.get('uri'), props.get('uri')
+        node.props = props
+        if old_uri != new_uri:
+            if old_uri is not None:
+                self.uri_index[old_uri].pop(node.id, None)
+            if new_uri is not None:
+                self.uri_index.setdefault(new_uri, {})[node.id] = None
+    
+    def add_labels(self, node: _MemoryNode, labels: Iterable[str]) -> int:
         """
-        Получить все узлы графа
+        Добавление меток узлу
         
+        Args:
+            node: Узел
+            labels: Метки
+            
         Returns:
-            Список всех узлов
+            Число добавленных меток
         """
-        query = """
-        MATCH (n)
-        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
-        """
-        results = self._execute_query(query)
-        return [self.collect_node(result) for result in results]
+        with self.lock:
+            added = set(labels) - node.labels
+            for label in added:
+                node.labels.add(label)
+                self.label_index.setdefault(label, {})[node.id] = None
+            
+            def undo() -> None:
+                for label in added:
+                    node.labels.discard(label)
+                    self.label_index[label].pop(node.id, None)
+            self._log(undo)
+            return len(added)
     
-    def get_all_nodes_and_arcs(self) -> List[TNode]:
+    def find(self, uri: Any, label: Optional[str] = None) -> List[_MemoryNode]:
         """
-        Получить все узлы с их связями
+        Поиск узлов по uri
         
+        Args:
+            uri: URI узла
+            label: Метка, которую должен иметь узел
+            
         Returns:
-            Список узлов с их связями
-        """
-        query = """
-        MATCH (n)
-        OPTIONAL MATCH (n)-[r]->(m)
-        WITH n, collect({
-            element_id: elementId(r),
-            uri: type(r),
-            node_uri_from: n.uri,
-            node_uri_to: m.uri
-        }) as arcs
-        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title, arcs
+            Найденные узлы
         """
-        results = self._execute_query(query)
-        nodes = []
-        for result in results:
-            node = self.collect_node(result)
-            # Фильтруем пустые связи (когда узел не имеет исходящих связей)
-            node.arcs = [self.collect_arc(arc) for arc in result.get('arcs', []) if arc.get('element_id')]
-            nodes.append(node)
-        return nodes
+        with self.lock:
+            nodes = [self.nodes[node_id] for node_id in self.uri_index.get(uri, ())]
+        return [node for node in nodes if label is None or label in node.labels]
     
-    def get_nodes_by_labels(self, labels: List[str]) -> List[TNode]:
+    def with_labels(self, labels: Iterable[str]) -> List[_MemoryNode]:
         """
-        Получить выборку узлов по их меткам
+        Узлы, имеющие все указанные метки, в порядке создания
         
         Args:
-            labels: Список меток для поиска
+            labels: Метки
             
         Returns:
-            Список узлов с указанными метками
+            Узлы
         """
-        if not labels:
-            return []
-        
-        labels_clause = self._build_labels_clause(labels)
-        query = f"""
-        MATCH (n{labels_clause})
-        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
-        """
-        results = self._execute_query(query)
-        return [self.collect_node(result) for result in results]
+        with self.lock:
+            indexes = sorted((self.label_index.get(label, {}) for label in set(labels)), key=len)
+            if not indexes:
+                return list(self.nodes.values())
+            return [self.nodes[node_id] for node_id in indexes[0]
+                    if all(node_id in index for index in indexes[1:])]
     
-    def get_node_by_uri(self, uri: str) -> Optional[TNode]:
+    def outgoing(self, node: _MemoryNode, arc_type: Optional[str] = None) -> List[_MemoryArc]:
         """
-        Получить узел по URI
+        Исходящие связи узла
         
         Args:
-            uri: URI узла
+            node: Узел
+            arc_type: Тип связи (None - любой)
             
         Returns:
-            Узел или None, если не найден
+            Связи в порядке создания
         """
-        query = """
-            MATCH (n {uri: $uri})
-            RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
-        """
-        results = self._execute_query(query, {'uri': uri})
-        if results:
-            return self.collect_node(results[0])
-        return None
+        with self.lock:
+            arcs = [self.arcs[arc_id] for arc_id in self.out_arcs[node.id]]
+        return [arc for arc in arcs if arc_type is None or arc.type == arc_type]
     
-    def create_node(self, params: Dict[str, Any]) -> TNode:
+    def incoming(self, node: _MemoryNode, arc_type: Optional[str] = None) -> List[_MemoryArc]:
         """
-        Создать новый узел
+        Входящие связи узла
         
         Args:
-            params: Параметры узла (title, description, labels и т.д.)
+            node: Узел
+            arc_type: Тип связи (None - любой)
             
         Returns:
-            Созданный узел
+            Связи в порядке создания
         """
-        # Генерируем URI если не указан
-        if 'uri' not in params:
-            params['uri'] = f"node_{self.generate_random_string()}"
+        with self.lock:
+            arcs = [self.arcs[arc_id] for arc_id in self.in_arcs[node.id]]
+        return [arc for arc in arcs if arc_type is None or arc.type == arc_type]
+
+
+class MemoryGraphRepository(_GraphRepositoryBase):
+    """
+    Репозиторий с графом в памяти процесса вместо Neo4j
+    
+    Реализует методы GraphRepository над узлами и связями с теми же
+    результатами TNode/TArc поверх MemoryGraph, поэтому подходит для
+    интеграционных тестов и замеров логики репозитория без сервера и как
+    модель для чтения. Произвольный Cypher (run_custom_query, iter_query,
+    iter_records, _execute_query) графом в памяти не выполняется: эти методы
+    есть для совместимости интерфейса, но вызывают TypeError, и код,
+    которому они нужны, должен работать с GraphRepository.
+    unit_of_work блокирует граф до конца блока и откатывает его изменения
+    при исключении.
+    """
+    
+    def __init__(self, uri: str = 'memory://', user: str = None, password: str = None,
+                 database: str = None, graph: MemoryGraph = None, cache: NodeCache = None,
+                 query_hooks: Iterable[Callable[[TQueryEvent], None]] = None, **kwargs):
+        """
+        Инициализация репозитория
         
-        # Извлекаем метки если есть
-        labels = params.pop('labels', [])
-        labels_clause = self._build_labels_clause(labels)
+        Args:
+            uri: Не используется (для совместимости с GraphRepository)
+            user: Не используется
+            password: Не используется
+            database: Не используется
+            graph: Граф в памяти (по умолчанию новый пустой граф)
+            cache: Кэш прочитанных узлов по uri (по умолчанию не используется)
+            query_hooks: Обработчики событий запросов (запросы не выполняются,
+                поэтому события не создаются)
+            **kwargs: Параметры драйвера GraphRepository (driver, pool и т.д.),
+                которые игнорируются
+        """
+        super().__init__(uri, user, password, database, templates=kwargs.get('templates'),
+                         cache=cache, query_hooks=query_hooks)
+        self.graph = graph if graph is not None else MemoryGraph()
+        # Признак открытого unit_of_work свой у каждого потока
+        self._local = threading.local()
+    
+    def close(self):
+        """Закрытие репозитория (граф остается доступным другим репозиториям)"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def pool_metrics(self) -> Dict[str, Any]:
+        """Метрики пула соединений (у графа в памяти пула нет)"""
+        return {}
+    
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Единица работы: изменения блока применяются атомарно
         
-        # Создаем параметры для безопасного запроса
-        query_params = params.copy()
+        Граф блокируется до конца блока, при исключении изменения блока
+        откатываются. Вложенные блоки используют внешнюю транзакцию.
         
-        query = f"""
-        CREATE (n{labels_clause} $props)
-        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
+        Yields:
+            Репозиторий
         """
+        if self._current_transaction() is not None:
+            yield self
+            return
         
-        results = self._execute_query(query, {'props': query_params})
-        if results:
-            return self.collect_node(results[0])
-        raise Exception("Не удалось создать узел")
+        with self.graph.transaction():
+            self._local.tx = self.graph
+            self._local.dirty = set()
+            try:
+                yield self
+            finally:
+                self._local.tx = None
+                dirty, self._local.dirty = self._local.dirty, None
+                self._invalidate_committed(dirty)
     
-    def create_arc(self, node1_uri: str, node2_uri: str, arc_type: str = "RELATES_TO", properties: Dict[str, Any] = None) -> TArc:
+    def _create_driver(self):
+        """Драйвера у графа в памяти нет"""
+        return None
+    
+    def _current_transaction(self):
+        return getattr(self._local, 'tx', None)
+    
+    def _dirty_uris(self) -> Optional[set]:
+        return getattr(self._local, 'dirty', None)
+    
+    def gather(self, *calls: Union[Callable[[], Any], Tuple],
+               max_workers: int = DEFAULT_GATHER_WORKERS) -> TGatherResult:
         """
-        Создать связь между узлами
+        Выполнение вызовов чтения (последовательно: чтения графа в памяти не ждут сети)
         
         Args:
-            node1_uri: URI первого узла
-            node2_uri: URI второго узла
-            arc_type: Тип связи
-            properties: Дополнительные свойства связи
+            *calls: Функции без аргументов или кортежи (метод, *аргументы)
+            max_workers: Не используется (для совместимости с GraphRepository)
             
         Returns:
-            Созданная связь
+            Результаты вызовов в порядке аргументов и время каждого вызова
         """
-        # Безопасно экранируем тип связи
-        safe_arc_type = arc_type.replace('`', '``')
-        
-        query = f"""
-        MATCH (n1 {{uri: $node1_uri}}), (n2 {{uri: $node2_uri}})
-        CREATE (n1)-[r:`{safe_arc_type}` $props]->(n2)
-        RETURN elementId(r) as element_id, type(r) as uri, n1.uri as node_uri_from, n2.uri as node_uri_to
+        started = time.perf_counter()
+        outcomes = [_timed_call(self._bind_call(call)) for call in calls]
+        return self._gather_result(outcomes, time.perf_counter() - started)
+    
+    # ==================== ПРЕОБРАЗОВАНИЕ УЗЛОВ ====================
+    
+    def _node_data(self, node: _MemoryNode) -> Dict[str, Any]:
         """
+        Данные узла в виде результата запроса
         
-        results = self._execute_query(query, {
-            'node1_uri': node1_uri,
-            'node2_uri': node2_uri,
-            'props': properties or {}
-        })
+        Args:
+            node: Узел графа
+            
+        Returns:
+            Словарь element_id, uri, description, title
+        """
+        props = node.props
+        return {
+            'element_id': node.id,
+            'uri': props.get('uri'),
+            'description': props.get('description'),
+            'title': props.get('title')
+        }
+    
+    def _arc_data(self, arc: _MemoryArc) -> Dict[str, Any]:
+        """
+        Данные связи в виде результата запроса
         
-        if results:
-            return self.collect_arc(results[0])
-        raise Exception("Не удалось создать связь")
+        Args:
+            arc: Связь графа
+            
+        Returns:
+            Словарь element_id, uri (тип), node_uri_from, node_uri_to
+        """
+        return {
+            'element_id': arc.id,
+            'uri': arc.type,
+            'node_uri_from': arc.start.props.get('uri'),
+            'node_uri_to': arc.end.props.get('uri')
+        }
     
-    def delete_node_by_uri(self, uri: str) -> bool:
+    def _to_node(self, node: _MemoryNode) -> TNode:
+        return self.collect_node(self._node_data(node))
+    
+    def _to_node_with_arcs(self, node: _MemoryNode) -> TNode:
+        uri = _intern(node.props.get('uri'))
+        arcs = [[arc.id, arc.type, arc.end.props.get('uri')] for arc in self.graph.outgoing(node)]
+        return TNode(node.id, uri, node.props.get('description'), node.props.get('title'),
+                     self.collect_arcs_values(uri, arcs))
+    
+    def _page(self, nodes: List[_MemoryNode], limit: int, cursor: Optional[str] = None,
+              with_arcs: bool = False) -> TPage:
         """
-        Удалить узел по URI
+        Страница узлов по ключу (uri, elementId), как _page_statement
         
         Args:
-            uri: URI узла для удаления
+            nodes: Узлы-кандидаты
+            limit: Максимальное число узлов на странице
+            cursor: Токен продолжения предыдущей страницы
+            with_arcs: Загрузить исходящие связи узлов
             
         Returns:
-            True если узел удален, False если не найден
+            Страница узлов
         """
-        query = """
-        MATCH (n {uri: $uri})
-        DETACH DELETE n
+        if limit <= 0:
+            raise ValueError("Размер страницы должен быть положительным")
+        keyed = [(node.props['uri'], node.id, node) for node in nodes if node.props.get('uri') is not None]
+        if cursor:
+            after = self.decode_cursor(cursor)
+            keyed = [item for item in keyed if (item[0], item[1]) > after]
+        keyed.sort(key=lambda item: (item[0], item[1]))
+        
+        results = []
+        for _, _, node in keyed[:limit + 1]:
+            data = self._node_data(node)
+            if with_arcs:
+                data['arcs'] = [self._arc_data(arc) for arc in self.graph.outgoing(node)]
+            results.append(data)
+        return self._collect_page(results, limit, with_arcs)
+    
+    # ==================== ЧТЕНИЕ ====================
+    
+    def get_all_nodes(self) -> List[TNode]:
+        """Получить все узлы графа"""
+        with self.graph.lock:
+            return [self._to_node(node) for node in self.graph.nodes.values()]
+    
+    def iter_all_nodes(self, fetch_size: Optional[int] = None) -> Iterator[TNode]:
+        """Потоково получить все узлы графа (по снимку на момент вызова)"""
+        yield from self.get_all_nodes()
+    
+    def get_all_nodes_and_arcs(self) -> List[TNode]:
+        """Получить все узлы с их связями"""
+        with self.graph.lock:
+            return [self._to_node_with_arcs(node) for node in self.graph.nodes.values()]
+    
+    def iter_all_nodes_and_arcs(self, fetch_size: Optional[int] = None) -> Iterator[TNode]:
+        """Потоково получить все узлы с их связями (по снимку на момент вызова)"""
+        yield from self.get_all_nodes_and_arcs()
+    
+    def get_graph_columns(self, fetch_size: Optional[int] = None) -> TGraphColumns:
+        """Получить весь граф в столбцовом представлении для анализа"""
+        np = _import_numpy()
+        columns = _GraphColumnsBuilder()
+        with self.graph.lock:
+            for node in self.graph.nodes.values():
+                columns.add_node({'element_id': node.id, 'uri': node.props.get('uri'), 'title': node.props.get('title')})
+            for arc in self.graph.arcs.values():
+                columns.add_arc({'node_from': arc.start.id, 'node_to': arc.end.id, 'type': arc.type})
+        return columns.build(np)
+    
+    def get_nodes_by_labels(self, labels: List[str]) -> List[TNode]:
+        """Получить выборку узлов по их меткам"""
+        if not labels:
+            return []
+        return [self._to_node(node) for node in self.graph.with_labels(labels)]
+    
+    def get_nodes_page(self, limit: int, cursor: Optional[str] = None,
+                       labels: Optional[List[str]] = None) -> TPage:
+        """Получить страницу узлов (всех или с указанными метками)"""
+        with self.graph.lock:
+            return self._page(self.graph.with_labels(labels or [BASE_LABEL]), limit, cursor)
+    
+    def get_nodes_and_arcs_page(self, limit: int, cursor: Optional[str] = None) -> TPage:
+        """Получить страницу узлов с их связями"""
+        with self.graph.lock:
+            return self._page(self.graph.with_labels([BASE_LABEL]), limit, cursor, with_arcs=True)
+    
+    def get_node_by_uri(self, uri: str) -> Optional[TNode]:
+        """Получить узел по URI"""
+        cached = self._cache_get(uri)
+        if cached is not None:
+            return cached
+        
+        nodes = self.graph.find(uri, BASE_LABEL)
+        if nodes:
+            node = self._to_node(nodes[0])
+            self._cache_put(uri, node)
+            return node
+        return None
+    
+    # ==================== СОЗДАНИЕ ====================
+    
+    def create_node(self, params: Dict[str, Any]) -> TNode:
         """
+        Создать новый узел
         
-        with self.driver.session(database=self.database) as session:
-            result = session.run(query, {'uri': uri})
-            # Получаем статистику выполнения запроса
-            summary = result.consume()
-            return summary.counters.nodes_deleted > 0
+        Как и GraphRepository.create_node, добавляет в params сгенерированный
+        uri и удаляет из них метки.
+        """
+        if 'uri' not in params:
+            params['uri'] = f"node_{self.generate_random_string()}"
+        labels = self._with_base_label(params.pop('labels', []))
+        return self._to_node(self.graph.add_node(labels, params))
     
-    def delete_arc_by_id(self, arc_id: str) -> bool:
+    def _add_arcs(self, node1_uri: str, node2_uri: str, arc_type: str,
+                  properties: Optional[Dict[str, Any]]) -> List[_MemoryArc]:
         """
-        Удалить связь по element ID
+        Создание связей между всеми узлами с заданными uri (как MATCH ... CREATE)
         
         Args:
-            arc_id: Element ID связи для удаления
+            node1_uri: URI исходного узла
+            node2_uri: URI целевого узла
+            arc_type: Тип связи
+            properties: Свойства связи
             
         Returns:
-            True если связь удалена, False если не найдена
+            Созданные связи (пустой список, если один из узлов не найден)
         """
-        query = """
-        MATCH ()-[r]->()
-        WHERE elementId(r) = $arc_id
-        DELETE r
+        with self.graph.transaction():
+            return [self.graph.add_arc(start, end, arc_type, properties)
+                    for start in self.graph.find(node1_uri, BASE_LABEL)
+                    for end in self.graph.find(node2_uri, BASE_LABEL)]
+    
+    def create_arc(self, node1_uri: str, node2_uri: str, arc_type: str = "RELATES_TO",
+                   properties: Dict[str, Any] = None) -> TArc:
+        """Создать связь между узлами"""
+        arcs = self._add_arcs(node1_uri, node2_uri, arc_type, properties)
+        self._invalidate(node1_uri, node2_uri)
+        
+        if arcs:
+            return self.collect_arc(self._arc_data(arcs[0]))
+        raise Exception("Не удалось создать связь")
+    
+    def create_nodes(self, params_list: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE,
+                     on_chunk: Optional[Callable[[TBatchChunk], None]] = None) -> List[TNode]:
+        """Массовое создание узлов (пачки по набору меток, как в GraphRepository)"""
+        nodes: List[Optional[TNode]] = [None] * len(params_list)
+        for labels, rows in self._group_nodes(params_list).items():
+            labels_clause = self._build_labels_clause(list(labels))
+            for chunk in self._chunks(rows, batch_size):
+                started = time.perf_counter()
+                with self.graph.transaction():
+                    for row in chunk:
+                        nodes[row['idx']] = self._to_node(self.graph.add_node(labels, row['props']))
+                if on_chunk:
+                    on_chunk(TBatchChunk(key=labels_clause, size=len(chunk), seconds=time.perf_counter() - started))
+        return nodes
+    
+    def create_arcs(self, arcs: List[Tuple], batch_size: int = DEFAULT_BATCH_SIZE,
+                    on_chunk: Optional[Callable[[TBatchChunk], None]] = None) -> List[TArc]:
+        """Массовое создание связей (связи без одного из узлов пропускаются)"""
+        created: Dict[int, TArc] = {}
+        for arc_type, rows in self._group_arcs(arcs).items():
+            for chunk in self._chunks(rows, batch_size):
+                started = time.perf_counter()
+                with self.graph.transaction():
+                    for row in chunk:
+                        for arc in self._add_arcs(row['node1_uri'], row['node2_uri'], arc_type, row['props']):
+                            created[row['idx']] = self.collect_arc(self._arc_data(arc))
+                if on_chunk:
+                    on_chunk(TBatchChunk(key=arc_type, size=len(chunk), seconds=time.perf_counter() - started))
+                self._invalidate(*self._arcs_uris(chunk))
+        
+        return [created[index] for index in sorted(created)]
+    
+    # ==================== ОБНОВЛЕНИЕ И УДАЛЕНИЕ ====================
+    
+    def _delete_nodes(self, nodes: List[_MemoryNode]) -> Tuple[int, int]:
         """
+        Удаление узлов вместе со связями
         
-        with self.driver.session(database=self.database) as session:
-            result = session.run(query, {'arc_id': arc_id})
-            # Получаем статистику выполнения запроса
-            summary = result.consume()
-            return summary.counters.relationships_deleted > 0
+        Args:
+            nodes: Узлы
+            
+        Returns:
+            Число удаленных узлов и связей
+        """
+        nodes_deleted = 0
+        arcs_deleted = 0
+        with self.graph.transaction():
+            for node in nodes:
+                # Узел мог быть удален раньше (повтор в списке)
+                if node.id in self.graph.nodes:
+                    arcs_deleted += self.graph.remove_node(node)
+                    nodes_deleted += 1
+        return nodes_deleted, arcs_deleted
     
-    def update_node(self, uri: str, params: Dict[str, Any]) -> Optional[TNode]:
+    def delete_node_by_uri(self, uri: str) -> bool:
+        """Удалить узел по URI"""
+        nodes_deleted, _ = self._delete_nodes(self.graph.find(uri, BASE_LABEL))
+        self._invalidate(uri)
+        return nodes_deleted > 0
+    
+    def delete_arc_by_id(self, arc_id: str) -> bool:
+        """Удалить связь по element ID"""
+        with self.graph.transaction():
+            arc = self.graph.arcs.get(arc_id)
+            if arc is not None:
+                self.graph.remove_arc(arc)
+        self._invalidate()
+        return arc is not None
+    
+    def upsert_nodes(self, rows: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> TUpsertStats:
+        """Массовое идемпотентное создание-или-обновление узлов по uri (как MERGE)"""
+        created = 0
+        total = 0
+        for labels, group in self._group_upserts(rows).items():
+            for chunk in self._chunks(group, batch_size):
+                with self.graph.transaction():
+                    for row in chunk:
+                        nodes = self.graph.find(row['uri'], BASE_LABEL)
+                        if not nodes:
+                            nodes = [self.graph.add_node([BASE_LABEL], {'uri': row['uri']})]
+                            created += 1
+                        for node in nodes:
+                            self.graph.set_props(node, row['props'])
+                            self.graph.add_labels(node, labels)
+                total += len(chunk)
+                self._invalidate(*(row['uri'] for row in chunk))
+        return TUpsertStats(created=created, updated=total - created)
+    
+    def _update_matched(self, uri: str, props: Dict[str, Any]) -> List[_MemoryNode]:
         """
-        Обновить узел
+        Обновление свойств узлов с заданным uri (SET n += props)
         
         Args:
-            uri: URI узла для обновления
-            params: Новые параметры узла
+            uri: URI узла
+            props: Новые свойства
             
         Returns:
-            Обновленный узел или None если не найден
+            Обновленные узлы
         """
+        with self.graph.transaction():
+            nodes = self.graph.find(uri, BASE_LABEL)
+            for node in nodes:
+                self.graph.set_props(node, props)
+        return nodes
+    
+    def update_nodes(self, updates: Dict[str, Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Массовое обновление свойств узлов"""
+        rows = [{'uri': uri, 'props': props} for uri, props in updates.items() if props]
+        updated = 0
+        for chunk in self._chunks(rows, batch_size):
+            with self.graph.transaction():
+                for row in chunk:
+                    updated += len(self._update_matched(row['uri'], row['props']))
+            self._invalidate(*(row['uri'] for row in chunk))
+        return updated
+    
+    def delete_nodes_by_uris(self, uris: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> SummaryCounters:
+        """Массовое удаление узлов по URI"""
+        counters = SummaryCounters({})
+        for chunk in self._chunks(list(uris), batch_size):
+            with self.graph.transaction():
+                for uri in chunk:
+                    nodes_deleted, arcs_deleted = self._delete_nodes(self.graph.find(uri, BASE_LABEL))
+                    counters.nodes_deleted += nodes_deleted
+                    counters.relationships_deleted += arcs_deleted
+            self._invalidate(*chunk)
+        return counters
+    
+    def delete_arcs_by_ids(self, arc_ids: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> SummaryCounters:
+        """Массовое удаление связей по element ID"""
+        counters = SummaryCounters({})
+        for chunk in self._chunks(list(arc_ids), batch_size):
+            with self.graph.transaction():
+                for arc_id in chunk:
+                    arc = self.graph.arcs.get(arc_id)
+                    if arc is not None:
+                        self.graph.remove_arc(arc)
+                        counters.relationships_deleted += 1
+        if arc_ids:
+            self._invalidate()
+        return counters
+    
+    def update_node(self, uri: str, params: Dict[str, Any]) -> Optional[TNode]:
+        """Обновить узел"""
         if not params:
             return None
         
-        query = """
-        MATCH (n {uri: $uri})
-        SET n += $props
-        RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
-        """
-        
-        results = self._execute_query(query, {'uri': uri, 'props': params})
-        if results:
-            return self.collect_node(results[0])
+        nodes = self._update_matched(uri, params)
+        self._invalidate(uri)
+        if nodes:
+            return self._to_node(nodes[0])
         return None
     
-    def run_custom_query(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    # ==================== СХЕМА ====================
+    
+    def ensure_schema(self) -> List[str]:
+        """Индексы по uri и меткам у графа в памяти есть всегда, запросы не выполняются"""
+        return []
+    
+    def migrate_base_label(self, batch_size: int = 10000) -> int:
+        """Добавление общей метки всем узлам с uri, у которых ее еще нет"""
+        with self.graph.transaction():
+            nodes = [node for node in self.graph.nodes.values()
+                     if node.props.get('uri') is not None and BASE_LABEL not in node.labels]
+            for node in nodes:
+                self.graph.add_labels(node, [BASE_LABEL])
+        return len(nodes)
+    
+    # ==================== ПРОИЗВОЛЬНЫЙ CYPHER ====================
+    
+    def _cypher_unsupported(self, method: str) -> TypeError:
         """
-        Выполнение произвольного запроса Cypher
+        Ошибка вызова метода, выполняющего Cypher
         
         Args:
-            query: Cypher запрос
-            parameters: Параметры запроса
+            method: Имя метода
             
         Returns:
-            Результаты запроса
+            Исключение для raise
         """
-        return self._execute_query(query, parameters)
+        return TypeError(f"{type(self).__name__}.{method}: граф в памяти не выполняет Cypher, "
+                         f"используйте GraphRepository")
+    
+    def _execute_query(self, query: str, parameters: Dict[str, Any] = None,
+                       access_mode: str = WRITE_ACCESS) -> List[Dict[str, Any]]:
+        """Не поддерживается: вызывает TypeError"""
+        raise self._cypher_unsupported('_execute_query')
+    
+    def iter_records(self, query: str, parameters: Dict[str, Any] = None,
+                     fetch_size: Optional[int] = None, access_mode: str = READ_ACCESS) -> Iterator[Record]:
+        """Не поддерживается: вызывает TypeError"""
+        raise self._cypher_unsupported('iter_records')
+    
+    def iter_query(self, query: str, parameters: Dict[str, Any] = None,
+                   fetch_size: Optional[int] = None, access_mode: str = READ_ACCESS) -> Iterator[Dict[str, Any]]:
+        """Не поддерживается: вызывает TypeError"""
+        raise self._cypher_unsupported('iter_query')
+    
+    def run_custom_query(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Не поддерживается: вызывает TypeError"""
+        raise self._cypher_unsupported('run_custom_query')
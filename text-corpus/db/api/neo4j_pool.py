@@ -0,0 +1,189 @@
+import logging
+
+from django.conf import settings
+
+from .graph_repository import (MemoryGraph, NodeCache, PoolConfig, QueryStats, SlowQueryLog,
+                               get_shared_driver, warm_up_driver)
+from .graph_repository import get_pool_metrics as get_driver_pool_metrics
+from .ontology_repository import MemoryOntologyRepository, OntologyRepository
+
+
+logger = logging.getLogger(__name__)
+
+_node_cache = None
+_memory_graph = None
+_query_stats = None
+_slow_query_log = None
+
+
+def get_node_cache():
+    """
+    Общий кэш узлов рабочего процесса, настроенный из settings.NEO4J_NODE_CACHE_*
+
+    Returns:
+        Кэш узлов или None, если кэш отключен
+    """
+    global _node_cache
+    size = getattr(settings, 'NEO4J_NODE_CACHE_SIZE', 0)
+    if size <= 0:
+        return None
+    if _node_cache is None:
+        _node_cache = NodeCache(maxsize=size, ttl=getattr(settings, 'NEO4J_NODE_CACHE_TTL', None))
+    return _node_cache
+
+
+def get_query_stats():
+    """
+    Общая статистика запросов рабочего процесса (settings.NEO4J_QUERY_STATS)
+
+    Returns:
+        Агрегатор QueryStats или None, если статистика отключена
+    """
+    global _query_stats
+    if not getattr(settings, 'NEO4J_QUERY_STATS', False):
+        return None
+    if _query_stats is None:
+        _query_stats = QueryStats(max_templates=getattr(settings, 'NEO4J_QUERY_STATS_MAX_TEMPLATES', 200))
+    return _query_stats
+
+
+def get_slow_query_log():
+    """
+    Журнал медленных запросов рабочего процесса (settings.NEO4J_SLOW_QUERY_*)
+
+    Returns:
+        Журнал SlowQueryLog или None, если журнал отключен
+    """
+    global _slow_query_log
+    threshold = getattr(settings, 'NEO4J_SLOW_QUERY_THRESHOLD', 0)
+    if threshold <= 0:
+        return None
+    if _slow_query_log is None:
+        _slow_query_log = SlowQueryLog(
+            settings.NEO4J_SLOW_QUERY_LOG,
+            threshold=threshold,
+            profile_rate=getattr(settings, 'NEO4J_SLOW_QUERY_PROFILE_RATE', 0.0),
+            max_bytes=getattr(settings, 'NEO4J_SLOW_QUERY_MAX_BYTES', 10 * 1024 * 1024),
+            backup_count=getattr(settings, 'NEO4J_SLOW_QUERY_BACKUP_COUNT', 5)
+        )
+    return _slow_query_log
+
+
+def get_pool_config() -> PoolConfig:
+    """
+    Настройки пула соединений из settings.NEO4J_*
+
+    Returns:
+        Настройки пула общего драйвера
+    """
+    return PoolConfig(
+        max_connection_pool_size=getattr(settings, 'NEO4J_MAX_CONNECTION_POOL_SIZE', None),
+        connection_acquisition_timeout=getattr(settings, 'NEO4J_CONNECTION_ACQUISITION_TIMEOUT', None),
+        liveness_check_timeout=getattr(settings, 'NEO4J_LIVENESS_CHECK_TIMEOUT', None),
+        max_connection_lifetime=getattr(settings, 'NEO4J_MAX_CONNECTION_LIFETIME', None)
+    )
+
+
+def get_driver():
+    """
+    Общий драйвер Neo4j рабочего процесса, настроенный из settings.NEO4J_*
+
+    Returns:
+        Драйвер Neo4j
+    """
+    return get_shared_driver(
+        settings.NEO4J_URI,
+        settings.NEO4J_USER,
+        settings.NEO4J_PASSWORD,
+        settings.NEO4J_DATABASE,
+        max_transaction_retry_time=getattr(settings, 'NEO4J_MAX_TRANSACTION_RETRY_TIME', 30.0),
+        **get_pool_config().driver_config()
+    )
+
+
+def uses_memory_backend() -> bool:
+    """
+    Хранится ли онтология в памяти рабочего процесса (settings.NEO4J_BACKEND)
+
+    Returns:
+        True для NEO4J_BACKEND = 'memory'
+    """
+    return getattr(settings, 'NEO4J_BACKEND', 'neo4j') == 'memory'
+
+
+def get_memory_graph() -> MemoryGraph:
+    """
+    Общий граф в памяти рабочего процесса для NEO4J_BACKEND = 'memory'
+
+    Returns:
+        Граф в памяти
+    """
+    global _memory_graph
+    if _memory_graph is None:
+        _memory_graph = MemoryGraph()
+    return _memory_graph
+
+
+def get_pool_metrics():
+    """
+    Метрики пула соединений общего драйвера рабочего процесса
+
+    Returns:
+        Словарь с числом занятых и свободных соединений, таймаутов и гистограммой
+        времени получения соединения (пустой для графа в памяти)
+    """
+    if uses_memory_backend():
+        return {}
+    return get_driver_pool_metrics(get_driver()).snapshot()
+
+
+def warm_up():
+    """Проверка соединения с Neo4j и прогрев пула при старте процесса"""
+    if uses_memory_backend():
+        return
+    warm_up_driver(get_driver(), settings.NEO4J_DATABASE)
+
+
+def warm_up_server():
+    """
+    Прогрев при старте серверного процесса (settings.NEO4J_WARM_UP_ON_STARTUP)
+
+    Вызывается из core/wsgi.py и core/asgi.py, которые загружают gunicorn и
+    runserver, поэтому остальные команды manage.py к Neo4j не подключаются
+    """
+    if not getattr(settings, 'NEO4J_WARM_UP_ON_STARTUP', False):
+        return
+    try:
+        warm_up()
+    except Exception as e:
+        # Недоступный Neo4j не должен мешать запуску остальных частей приложения
+        logger.warning("Neo4j warm-up failed: %s", e)
+
+
+def get_ontology_repository() -> OntologyRepository:
+    """
+    Репозиторий онтологии, берущий сессии из общего драйвера
+
+    При NEO4J_BACKEND = 'memory' возвращается репозиторий над общим графом
+    в памяти рабочего процесса.
+
+    Returns:
+        Репозиторий онтологии (close() не закрывает общий драйвер)
+    """
+    if uses_memory_backend():
+        return MemoryOntologyRepository(graph=get_memory_graph(), cache=get_node_cache())
+
+    stats = get_query_stats()
+    repository = OntologyRepository(
+        uri=settings.NEO4J_URI,
+        user=settings.NEO4J_USER,
+        password=settings.NEO4J_PASSWORD,
+        database=settings.NEO4J_DATABASE,
+        driver=get_driver(),
+        cache=get_node_cache(),
+        query_hooks=[stats] if stats is not None else None
+    )
+    slow_query_log = get_slow_query_log()
+    if slow_query_log is not None:
+        slow_query_log.attach(repository)
+    return repository
@@ -1,8 +1,11 @@
 import json
 import os
-from typing import List, Dict, Any, Optional, Union
+import time
+from typing import List, Dict, Any, Optional, Union, Tuple, Callable
 from dataclasses import dataclass
-from .graph_repository import GraphRepository, TNode, TArc
+from neo4j import READ_ACCESS
+from .graph_repository import (GraphRepository, AsyncGraphRepository, MemoryGraphRepository,
+                              TNode, TArc, TPage, TGatherResult, TBatchChunk, BASE_LABEL, DEFAULT_BATCH_SIZE)
 
 
 @dataclass
@@ -10,6 +13,7 @@ class SignatureParam:
     """Параметр DatatypeProperty в signature"""
     title: str
     uri: str
+    source_class_uri: Optional[str] = None  # класс, у которого объявлен параметр (сам класс или предок)
 
 
 @dataclass
@@ -19,6 +23,7 @@ class SignatureObjParam:
     uri: str
     target_class_uri: str
     relation_direction: int  # 1 - от объекта, -1 - к объекту
+    source_class_uri: Optional[str] = None  # класс, у которого объявлен параметр (сам класс или предок)
 
 
 @dataclass
@@ -28,10 +33,623 @@ class Signature:
     obj_params: List[SignatureObjParam]  # ObjectProperty
 
 
-class OntologyRepository(GraphRepository):
+@dataclass
+class ObjectUpdate:
+    """Результат update_object_fields: объект и измененные поля"""
+    obj: TNode
+    inserted: List[str]  # добавленные свойства
+    updated: List[str]  # измененные свойства (включая title и description)
+    deleted: List[str]  # удаленные свойства
+    
+    @property
+    def changed(self) -> List[str]:
+        """Все измененные поля"""
+        return self.inserted + self.updated + self.deleted
+
+
+@dataclass
+class ClassOverview:
+    """Данные страницы класса, прочитанные параллельно"""
+    cls: Optional[TNode]
+    parents: List[TNode]
+    children: List[TNode]
+    objects: List[TNode]
+    signature: Signature
+    timings: Dict[str, float]  # время чтения каждой части, секунды
+
+
+class _OntologyRepositoryBase:
+    """Тексты запросов онтологии и разбор их результатов, общие для синхронного и асинхронного репозиториев"""
+    
+    PARENT_CLASSES_QUERY = """
+        MATCH (c:Class)
+        WHERE NOT (c)-[:subclass_of]->()
+        RETURN elementId(c) as element_id, c.uri as uri, c.description as description, c.title as title
+        """
+    
+    PARENT_CLASSES_PATTERN = "(n:Class)"
+    PARENT_CLASSES_CONDITION = "NOT (n)-[:subclass_of]->()"
+    
+    CLASS_QUERY = """
+        MATCH (c:Class {uri: $class_uri})
+        RETURN elementId(c) as element_id, c.uri as uri, c.description as description, c.title as title
+        """
+    
+    CLASS_PARENTS_QUERY = """
+        MATCH (c:Class {uri: $class_uri})-[:subclass_of]->(parent:Class)
+        RETURN elementId(parent) as element_id, parent.uri as uri, parent.description as description, parent.title as title
+        """
+    
+    CLASS_CHILDREN_QUERY = """
+        MATCH (c:Class {uri: $class_uri})<-[:subclass_of]-(child:Class)
+        RETURN elementId(child) as element_id, child.uri as uri, child.description as description, child.title as title
+        """
+    
+    CLASS_OBJECTS_QUERY = """
+        MATCH (c:Class {uri: $class_uri})<-[:instance_of]-(obj:Object)
+        RETURN elementId(obj) as element_id, obj.uri as uri, obj.description as description, obj.title as title
+        """
+    
+    # Получаем всех потомков класса (рекурсивно)
+    DELETE_CLASS_QUERY = """
+        MATCH (c:Class {uri: $class_uri})
+        OPTIONAL MATCH (c)-[:subclass_of*]->(descendant:Class)
+        WITH collect(DISTINCT c) + collect(DISTINCT descendant) as classes_to_delete
+        UNWIND classes_to_delete as class_to_delete
+        OPTIONAL MATCH (class_to_delete)<-[:instance_of]-(obj:Object)
+        WITH collect(DISTINCT class_to_delete) + collect(DISTINCT obj) as nodes_to_delete
+        UNWIND nodes_to_delete as node_to_delete
+        DETACH DELETE node_to_delete
+        RETURN count(node_to_delete) as deleted_count
+        """
+    
+    # Удаляем связь domain и сам атрибут
+    DELETE_CLASS_ATTRIBUTE_QUERY = """
+        MATCH (attr:DatatypeProperty {uri: $attr_uri})-[r:applies_to]->(c:Class {uri: $class_uri})
+        DELETE r
+        WITH attr
+        DETACH DELETE attr
+        RETURN count(attr) as deleted_count
+        """
+    
+    OBJECT_QUERY = """
+        MATCH (obj:Object {uri: $object_uri})
+        RETURN elementId(obj) as element_id, obj.uri as uri, obj.description as description, obj.title as title
+        """
+    
+    # Объект и его свойства списками [тип связи, uri, value] для update_object_fields
+    OBJECT_STATE_QUERY = """
+        MATCH (obj:Object {uri: $object_uri})
+        OPTIONAL MATCH (obj)-[r]->(prop:Property)
+        WITH obj, collect(CASE WHEN r IS NULL THEN null ELSE [type(r), prop.uri, prop.value] END) as properties
+        RETURN elementId(obj) as element_id, obj.uri as uri, obj.description as description, obj.title as title, properties
+        """
+    
+    # Параметры класса и всех его предков по subclass_of: DatatypeProperty и
+    # ObjectProperty с классом-диапазоном, depth - расстояние до предка (0 - сам класс).
+    # Предки собираются через DISTINCT (обход с отсечением посещенных узлов), а
+    # расстояние - shortestPath до каждого предка: перебор всех путей с
+    # min(length(path)) растет экспоненциально на ромбовидных иерархиях
+    SIGNATURE_QUERY = """
+        MATCH (c:Class {uri: $class_uri})
+        CALL {
+            WITH c
+            RETURN c as ancestor, 0 as depth
+            UNION
+            WITH c
+            MATCH (c)-[:subclass_of*1..]->(ancestor:Class)
+            WITH DISTINCT c, ancestor
+            WHERE ancestor <> c
+            MATCH path = shortestPath((c)-[:subclass_of*1..]->(ancestor))
+            RETURN ancestor, length(path) as depth
+        }
+        MATCH (ancestor)<-[:applies_to]-(property)
+        WHERE property:DatatypeProperty OR property:ObjectProperty
+        OPTIONAL MATCH (property)-[:points_to]->(target:Class)
+        WITH ancestor, depth, property, target
+        WHERE property:DatatypeProperty OR target IS NOT NULL
+        RETURN ancestor.uri as class_uri, depth, property.uri as uri, property.title as title,
+               property:ObjectProperty as is_object, target.uri as target_class_uri
+        """
+    
+    # Части страницы класса в порядке полей ClassOverview
+    CLASS_OVERVIEW_PARTS = ('cls', 'parents', 'children', 'objects', 'signature')
+    
+    def _class_overview_calls(self, class_uri: str) -> List[Tuple]:
+        """
+        Вызовы чтения частей страницы класса для gather
+        
+        Args:
+            class_uri: URI класса
+            
+        Returns:
+            Кортежи (метод, URI класса) в порядке CLASS_OVERVIEW_PARTS
+        """
+        return [(method, class_uri) for method in (
+            self.get_class, self.get_class_parents, self.get_class_children,
+            self.get_class_objects, self.collect_signature
+        )]
+    
+    def _collect_class_overview(self, gathered: TGatherResult) -> ClassOverview:
+        """
+        Сборка ClassOverview из результата gather
+        
+        Args:
+            gathered: Результаты вызовов _class_overview_calls
+            
+        Returns:
+            Данные страницы класса
+        """
+        overview = dict(zip(self.CLASS_OVERVIEW_PARTS, gathered.results))
+        return ClassOverview(timings=dict(zip(self.CLASS_OVERVIEW_PARTS, gathered.timings)), **overview)
+    
+    def _object_properties(self, object_data: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        """
+        Свойства объекта, сохраняемые отдельными узлами Property
+        
+        Args:
+            object_data: Данные объекта (title, description, свойства)
+            
+        Returns:
+            Пары (имя свойства, значение)
+        """
+        return [(key, value) for key, value in object_data.items()
+                if key not in ['title', 'description'] and value is not None]
+    
+    def _generate_uris(self, prefix: str, count: int) -> List[str]:
+        """
+        Генерация нескольких различных URI на клиенте
+        
+        Args:
+            prefix: Префикс URI
+            count: Число URI
+            
+        Returns:
+            Список URI
+        """
+        uris: Dict[str, None] = {}
+        while len(uris) < count:
+            uris[f"{prefix}_{self.generate_random_string()}"] = None
+        return list(uris)
+    
+    def _object_property_nodes(self, object_data: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Узлы Property объекта с URI, сгенерированными одной пачкой
+        
+        Args:
+            object_data: Данные объекта (title, description, свойства)
+            
+        Returns:
+            Пары (имя свойства - тип связи, свойства узла Property)
+        """
+        properties = self._object_properties(object_data)
+        uris = self._generate_uris('prop', len(properties))
+        return [(key, {'uri': uri, 'value': str(value)}) for (key, value), uri in zip(properties, uris)]
+    
+    def _object_params(self, class_uri: str, object_data: Dict[str, Any]) -> Tuple[
+            Dict[str, Any], List[Tuple[str, str]], List[Tuple[str, Dict[str, Any]]]]:
+        """
+        Параметры, связи и узлы Property нового объекта
+        
+        Args:
+            class_uri: URI класса
+            object_data: Данные объекта (title, description, свойства)
+            
+        Returns:
+            Параметры узла, связи и свойства для _create_linked_node
+        """
+        params = {
+            'uri': f"obj_{self.generate_random_string()}",
+            'title': object_data.get('title', ''),
+            'description': object_data.get('description', ''),
+            'labels': ['Object']
+        }
+        return params, [('instance_of', class_uri)], self._object_property_nodes(object_data)
+    
+    def _object_rows(self, class_uri: str, signature: Signature,
+                     rows: List[Dict[str, Any]]) -> Tuple[Tuple[str, ...], List[Dict[str, Any]]]:
+        """
+        Проверка строк create_objects по signature класса и подготовка строк запроса
+        
+        Args:
+            class_uri: URI класса
+            signature: Signature класса
+            rows: Данные объектов (как object_data в create_object)
+            
+        Returns:
+            Используемые свойства в порядке signature и строки
+            {'idx', 'class_uri', 'props', 'properties_i'} для _create_objects_query
+        """
+        allowed = list(dict.fromkeys([param.title for param in signature.params] +
+                                     [param.title for param in signature.obj_params]))
+        values_list = [self._object_properties(row) for row in rows]
+        errors = []
+        for index, values in enumerate(values_list):
+            unknown = [key for key, _ in values if key not in allowed]
+            if unknown:
+                errors.append(f"{index}: {', '.join(unknown)}")
+        if errors:
+            raise ValueError(f"Свойства не входят в signature класса {class_uri}: {'; '.join(errors[:10])}")
+        
+        used = {key for values in values_list for key, _ in values}
+        fields = tuple(title for title in allowed if title in used)
+        object_uris = self._generate_uris('obj', len(rows))
+        property_uris = iter(self._generate_uris('prop', sum(len(values) for values in values_list)))
+        
+        object_rows = []
+        for index, (row, values) in enumerate(zip(rows, values_list)):
+            values = dict(values)
+            object_row = {
+                'idx': index,
+                'class_uri': class_uri,
+                'props': {
+                    'uri': object_uris[index],
+                    'title': row.get('title', ''),
+                    'description': row.get('description', '')
+                }
+            }
+            # Список из нуля или одного узла Property: текст запроса не зависит от строки
+            for field_index, field in enumerate(fields):
+                object_row[f'properties_{field_index}'] = (
+                    [{'uri': next(property_uris), 'value': str(values[field])}] if field in values else []
+                )
+            object_rows.append(object_row)
+        return fields, object_rows
+    
+    def _create_objects_query(self, fields: Tuple[str, ...]) -> str:
+        """
+        Запрос создания пачки объектов класса со свойствами
+        
+        Args:
+            fields: Свойства объектов (типы связей к узлам Property)
+            
+        Returns:
+            Текст запроса
+        """
+        def build() -> str:
+            property_labels = self._build_labels_clause(['Property', BASE_LABEL])
+            properties = ''.join(
+                f"\n            FOREACH (property IN row.properties_{index} | "
+                f"CREATE (n)-[{self._build_labels_clause([field])}]->({property_labels} {{uri: property.uri, value: property.value}}))"
+                for index, field in enumerate(fields)
+            )
+            return f"""
+            UNWIND $rows AS row
+            MATCH (c:Class {{uri: row.class_uri}})
+            CREATE (n{self._build_labels_clause(['Object', BASE_LABEL])})
+            SET n = row.props
+            CREATE (n)-[:instance_of]->(c){properties}
+            RETURN row.idx as idx, elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title
+            """
+        return self._template(('create_objects', fields), build)
+    
+    def _collect_objects(self, class_uri: str, nodes: List[Optional[TNode]]) -> List[TNode]:
+        """
+        Проверка результата create_objects и инвалидация кэша
+        
+        Args:
+            class_uri: URI класса
+            nodes: Созданные объекты по индексам строк
+            
+        Returns:
+            Созданные объекты
+        """
+        self._invalidate(class_uri)
+        if any(node is None for node in nodes):
+            raise Exception("Не удалось создать объекты")
+        return nodes
+    
+    def _diff_object(self, state: Dict[str, Any],
+                     object_data: Dict[str, Any]) -> Tuple[Dict[str, Any], ObjectUpdate]:
+        """
+        Сравнение текущего состояния объекта с новыми данными
+        
+        Как и прежде, свойства, которых нет в новых данных, удаляются,
+        а title и description без значения становятся пустыми строками.
+        Отсутствующие (None) и пустые title и description при сравнении
+        считаются равными. Повторные узлы Property одного свойства удаляются.
+        
+        Args:
+            state: Результат OBJECT_STATE_QUERY
+            object_data: Новые данные объекта
+            
+        Returns:
+            Изменения ({'props', 'values', 'deleted', 'properties'} - новые
+            значения title/description, новые значения по uri узлов Property,
+            uri удаляемых узлов Property, пары (тип связи, свойства) новых
+            узлов Property) и результат update_object_fields
+        """
+        props = {}
+        updated = []
+        for field in ('title', 'description'):
+            value = object_data.get(field) or ''
+            if (state.get(field) or '') != value:
+                props[field] = value
+                updated.append(field)
+        
+        current: Dict[str, Tuple[str, Any]] = {}
+        deleted_uris = []
+        for arc_type, uri, value in sorted(state['properties'], key=lambda item: item[1] or ''):
+            if arc_type in current:
+                deleted_uris.append(uri)
+            else:
+                current[arc_type] = (uri, value)
+        
+        new_values = {key: str(value) for key, value in self._object_properties(object_data)}
+        values = {}
+        deleted = []
+        for key, (uri, value) in current.items():
+            if key not in new_values:
+                deleted_uris.append(uri)
+                deleted.append(key)
+            elif new_values[key] != value:
+                values[uri] = new_values[key]
+                updated.append(key)
+        
+        inserted = [key for key in new_values if key not in current]
+        uris = self._generate_uris('prop', len(inserted))
+        changes = {
+            'props': props,
+            'values': values,
+            'deleted': deleted_uris,
+            'properties': [(key, {'uri': uri, 'value': new_values[key]}) for key, uri in zip(inserted, uris)]
+        }
+        obj = self.collect_node({**state, **props})
+        return changes, ObjectUpdate(obj=obj, inserted=inserted, updated=updated, deleted=deleted)
+    
+    def _update_object_statement(self, object_uri: str, changes: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Запрос применения изменений объекта из _diff_object
+        
+        Args:
+            object_uri: URI объекта
+            changes: Изменения объекта
+            
+        Returns:
+            Текст запроса и его параметры
+        """
+        property_types = tuple(arc_type for arc_type, _ in changes['properties'])
+        
+        def build() -> str:
+            property_labels = self._build_labels_clause(['Property', BASE_LABEL])
+            inserts = ''.join(
+                f"\n        CREATE (obj)-[{self._build_labels_clause([arc_type])}]->({property_labels} $property_{index})"
+                for index, arc_type in enumerate(property_types)
+            )
+            return f"""
+        MATCH (obj:Object {{uri: $object_uri}})
+        SET obj += $props
+        WITH obj
+        OPTIONAL MATCH (obj)-->(prop:Property)
+        WHERE prop.uri IN $deleted
+        DETACH DELETE prop
+        WITH DISTINCT obj
+        OPTIONAL MATCH (obj)-->(prop:Property)
+        WHERE prop.uri IN keys($values)
+        SET prop.value = $values[prop.uri]
+        WITH DISTINCT obj{inserts}
+        RETURN count(obj) as updated
+        """
+        
+        parameters = {
+            'object_uri': object_uri,
+            'props': changes['props'],
+            'values': changes['values'],
+            'deleted': changes['deleted']
+        }
+        for index, (_, property_props) in enumerate(changes['properties']):
+            parameters[f'property_{index}'] = property_props
+        return self._template(('update_object', property_types), build), parameters
+    
+    def _invalidate_object_update(self, object_uri: str, changes: Dict[str, Any]) -> None:
+        """
+        Инвалидация кэша после update_object
+        
+        Args:
+            object_uri: URI объекта
+            changes: Изменения объекта из _diff_object
+        """
+        self._invalidate(object_uri, *changes['values'], *changes['deleted'])
+    
+    def _create_linked_node_query(self, labels: Tuple[str, ...], arc_types: Tuple[str, ...],
+                                  property_types: Tuple[str, ...] = ()) -> str:
+        """
+        Запрос создания узла вместе со связями к существующим узлам
+        
+        Узлы-цели ищутся по uri из параметров $link_0, $link_1, ...; узел
+        создается, только если найдены цели всех связей, и связывается со
+        всеми найденными узлами (как create_node и create_arc по очереди,
+        но за один запрос). Кроме того, создаются новые узлы Property из
+        параметров $property_0, $property_1, ... со связями от узла. Тип
+        связи нельзя передать параметром, поэтому текст запроса зависит
+        от имен свойств и кэшируется по ним.
+        
+        Args:
+            labels: Отсортированный набор меток узла
+            arc_types: Типы исходящих связей узла в порядке параметров $link_i
+            property_types: Типы связей к новым узлам Property в порядке параметров $property_i
+            
+        Returns:
+            Текст запроса
+        """
+        def build() -> str:
+            clauses = []
+            targets = []
+            for index in range(len(arc_types)):
+                clauses.append(f"OPTIONAL MATCH (m{index}{self._build_labels_clause([BASE_LABEL])} {{uri: $link_{index}}})")
+                clauses.append(f"WITH {''.join(target + ', ' for target in targets)}collect(m{index}) as targets_{index}")
+                targets.append(f"targets_{index}")
+            if targets:
+                clauses.append(f"WHERE {' AND '.join(f'size({target}) > 0' for target in targets)}")
+            clauses.append(f"CREATE (n{self._build_labels_clause(list(labels))} $props)")
+            for index, arc_type in enumerate(arc_types):
+                clauses.append(f"FOREACH (m IN targets_{index} | CREATE (n)-[{self._build_labels_clause([arc_type])}]->(m))")
+            property_labels = self._build_labels_clause(['Property', BASE_LABEL])
+            for index, arc_type in enumerate(property_types):
+                clauses.append(f"CREATE (n)-[{self._build_labels_clause([arc_type])}]->({property_labels} $property_{index})")
+            clauses.append("RETURN elementId(n) as element_id, n.uri as uri, n.description as description, n.title as title")
+            return ''.join(f"\n        {clause}" for clause in clauses) + "\n        "
+        return self._template(('create_linked_node', labels, arc_types, property_types), build)
+    
+    def _linked_node_statement(self, params: Dict[str, Any], links: List[Tuple[str, str]],
+                               properties: List[Tuple[str, Dict[str, Any]]] = ()) -> Tuple[str, Dict[str, Any]]:
+        """
+        Подготовка запроса _create_linked_node_query
+        
+        Args:
+            params: Параметры узла (uri, title, description, labels)
+            links: Пары (тип связи, URI узла-цели)
+            properties: Пары (тип связи, свойства нового узла Property)
+            
+        Returns:
+            Текст запроса и его параметры
+        """
+        props = dict(params)
+        labels = tuple(sorted(set(self._with_base_label(props.pop('labels', [])))))
+        parameters = {'props': props}
+        for index, (_, uri) in enumerate(links):
+            parameters[f'link_{index}'] = uri
+        for index, (_, property_props) in enumerate(properties):
+            parameters[f'property_{index}'] = property_props
+        query = self._create_linked_node_query(labels, tuple(arc_type for arc_type, _ in links),
+                                               tuple(arc_type for arc_type, _ in properties))
+        return query, parameters
+    
+    def _class_params(self, title: str, description: str,
+                      parent_uri: Optional[str]) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+        """
+        Параметры и связи нового класса
+        
+        Args:
+            title: Название класса
+            description: Описание класса
+            parent_uri: URI родительского класса (опционально)
+            
+        Returns:
+            Параметры узла и связи для _create_linked_node
+        """
+        params = {
+            'uri': f"class_{self.generate_random_string()}",
+            'title': title,
+            'description': description,
+            'labels': ['Class']
+        }
+        return params, [('subclass_of', parent_uri)] if parent_uri else []
+    
+    def _class_attribute_params(self, class_uri: str, attr_name: str,
+                                attr_uri: Optional[str]) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+        """
+        Параметры и связи нового DatatypeProperty
+        
+        Args:
+            class_uri: URI класса
+            attr_name: Название атрибута
+            attr_uri: URI атрибута (если не указан, генерируется автоматически)
+            
+        Returns:
+            Параметры узла и связи для _create_linked_node
+        """
+        params = {
+            'uri': attr_uri or f"attr_{self.generate_random_string()}",
+            'title': attr_name,
+            'description': f"DatatypeProperty for {attr_name}",
+            'labels': ['DatatypeProperty']
+        }
+        return params, [('applies_to', class_uri)]
+    
+    def _class_object_attribute_params(self, class_uri: str, attr_name: str,
+                                       range_class_uri: str) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+        """
+        Параметры и связи нового ObjectProperty
+        
+        Args:
+            class_uri: URI класса
+            attr_name: Название атрибута
+            range_class_uri: URI класса-диапазона
+            
+        Returns:
+            Параметры узла и связи для _create_linked_node
+        """
+        params = {
+            'uri': f"obj_attr_{self.generate_random_string()}",
+            'title': attr_name,
+            'description': f"ObjectProperty for {attr_name}",
+            'labels': ['ObjectProperty']
+        }
+        return params, [('applies_to', class_uri), ('points_to', range_class_uri)]
+    
+    def _collect_linked_node(self, results: List[Dict[str, Any]], params: Dict[str, Any],
+                             links: List[Tuple[str, str]]) -> TNode:
+        """
+        Разбор результата _create_linked_node_query и инвалидация кэша
+        
+        Args:
+            results: Результаты запроса
+            params: Параметры узла
+            links: Пары (тип связи, URI узла-цели)
+            
+        Returns:
+            Созданный узел
+        """
+        self._invalidate(params['uri'], *(uri for _, uri in links))
+        if any(arc_type == 'applies_to' for arc_type, _ in links):
+            self._invalidate_signatures()
+        if results:
+            return self.collect_node(results[0])
+        raise Exception("Не удалось создать связь" if links else "Не удалось создать узел")
+    
+    def _collect_signature(self, results: List[Dict[str, Any]]) -> Signature:
+        """
+        Сборка Signature из результатов SIGNATURE_QUERY с учетом переопределений
+        
+        Параметр с тем же названием у более близкого класса переопределяет
+        параметры предков. Из классов на одном расстоянии (множественное
+        наследование) побеждает класс с меньшим uri. Порядок параметров:
+        по расстоянию до класса, uri класса и uri параметра.
+        
+        Args:
+            results: Результаты SIGNATURE_QUERY
+            
+        Returns:
+            Структура Signature с параметрами класса и его предков
+        """
+        results = sorted(results, key=lambda result: (
+            result['depth'], result['class_uri'] or '', result['uri'] or '', result['target_class_uri'] or ''
+        ))
+        # Название параметра -> класс, объявление которого действует
+        owners: Dict[str, str] = {}
+        for result in results:
+            owners.setdefault(result['title'], result['class_uri'])
+        
+        params = []
+        obj_params = []
+        for result in results:
+            if owners[result['title']] != result['class_uri']:
+                continue
+            if result['is_object']:
+                obj_params.append(SignatureObjParam(
+                    title=result['title'],
+                    uri=result['uri'],
+                    target_class_uri=result['target_class_uri'],
+                    relation_direction=1,  # По умолчанию направление от объекта
+                    source_class_uri=result['class_uri']
+                ))
+            else:
+                params.append(SignatureParam(title=result['title'], uri=result['uri'],
+                                             source_class_uri=result['class_uri']))
+        
+        return Signature(params=params, obj_params=obj_params)
+    
+    def _invalidate_signatures(self) -> None:
+        """Сброс всех signature в кэше: signature класса зависит от параметров его предков"""
+        if self.cache is not None:
+            self.cache.invalidate_kind('signature')
+
+
+class OntologyRepository(_OntologyRepositoryBase, GraphRepository):
     """Репозиторий для работы с онтологией в графовой базе данных Neo4j"""
     
-    def __init__(self, uri: str, user: str, password: str, database: str = None):
+    def __init__(self, uri: str, user: str, password: str, database: str = None, **kwargs):
         """
         Инициализация репозитория онтологии
         
@@ -40,8 +658,9 @@ class OntologyRepository(GraphRepository):
             user: Имя пользователя
             password: Пароль
             database: Название базы данных
+            **kwargs: Дополнительные параметры GraphRepository (например, driver)
         """
-        super().__init__(uri, user, password, database)
+        super().__init__(uri, user, password, database, **kwargs)
     
     # ==================== ОСНОВНЫЕ МЕТОДЫ ОНТОЛОГИИ ====================
     
@@ -61,14 +680,35 @@ class OntologyRepository(GraphRepository):
         Returns:
             Список корневых классов
         """
-        query = """
-        MATCH (c:Class)
-        WHERE NOT (c)-[:subclass_of]->()
-        RETURN elementId(c) as element_id, c.uri as uri, c.description as description, c.title as title
-        """
-        results = self._execute_query(query)
+        results = self._execute_query(self.PARENT_CLASSES_QUERY, access_mode=READ_ACCESS)
         return [self.collect_node(result) for result in results]
     
+    def get_ontology_page(self, limit: int, cursor: Optional[str] = None) -> TPage:
+        """
+        Получить страницу онтологии
+        
+        Args:
+            limit: Максимальное число узлов на странице
+            cursor: Токен продолжения, полученный с предыдущей страницей
+            
+        Returns:
+            Страница узлов онтологии
+        """
+        return self.get_nodes_page(limit, cursor)
+    
+    def get_ontology_parent_classes_page(self, limit: int, cursor: Optional[str] = None) -> TPage:
+        """
+        Получить страницу корневых классов онтологии
+        
+        Args:
+            limit: Максимальное число классов на странице
+            cursor: Токен продолжения, полученный с предыдущей страницей
+            
+        Returns:
+            Страница корневых классов
+        """
+        return self._fetch_page(self.PARENT_CLASSES_PATTERN, limit, cursor, condition=self.PARENT_CLASSES_CONDITION)
+    
     # ==================== МЕТОДЫ РАБОТЫ С КЛАССАМИ ====================
     
     def get_class(self, class_uri: str) -> Optional[TNode]:
@@ -81,13 +721,15 @@ class OntologyRepository(GraphRepository):
         Returns:
             Класс или None, если не найден
         """
-        query = """
-        MATCH (c:Class {uri: $class_uri})
-        RETURN elementId(c) as element_id, c.uri as uri, c.description as description, c.title as title
-        """
-        results = self._execute_query(query, {'class_uri': class_uri})
+        cached = self._cache_get(class_uri, 'class')
+        if cached is not None:
+            return cached
+        
+        results = self._execute_query(self.CLASS_QUERY, {'class_uri': class_uri}, access_mode=READ_ACCESS)
         if results:
-            return self.collect_node(results[0])
+            class_node = self.collect_node(results[0])
+            self._cache_put(class_uri, class_node, 'class')
+            return class_node
         return None
     
     def get_class_parents(self, class_uri: str) -> List[TNode]:
@@ -100,11 +742,7 @@ class OntologyRepository(GraphRepository):
         Returns:
             Список родительских классов
         """
-        query = """
-        MATCH (c:Class {uri: $class_uri})-[:subclass_of]->(parent:Class)
-        RETURN elementId(parent) as element_id, parent.uri as uri, parent.description as description, parent.title as title
-        """
-        results = self._execute_query(query, {'class_uri': class_uri})
+        results = self._execute_query(self.CLASS_PARENTS_QUERY, {'class_uri': class_uri}, access_mode=READ_ACCESS)
         return [self.collect_node(result) for result in results]
     
     def get_class_children(self, class_uri: str) -> List[TNode]:
@@ -117,11 +755,7 @@ class OntologyRepository(GraphRepository):
         Returns:
             Список дочерних классов
         """
-        query = """
-        MATCH (c:Class {uri: $class_uri})<-[:subclass_of]-(child:Class)
-        RETURN elementId(child) as element_id, child.uri as uri, child.description as description, child.title as title
-        """
-        results = self._execute_query(query, {'class_uri': class_uri})
+        results = self._execute_query(self.CLASS_CHILDREN_QUERY, {'class_uri': class_uri}, access_mode=READ_ACCESS)
         return [self.collect_node(result) for result in results]
     
     def get_class_objects(self, class_uri: str) -> List[TNode]:
@@ -134,13 +768,39 @@ class OntologyRepository(GraphRepository):
         Returns:
             Список объектов класса
         """
-        query = """
-        MATCH (c:Class {uri: $class_uri})<-[:instance_of]-(obj:Object)
-        RETURN elementId(obj) as element_id, obj.uri as uri, obj.description as description, obj.title as title
-        """
-        results = self._execute_query(query, {'class_uri': class_uri})
+        results = self._execute_query(self.CLASS_OBJECTS_QUERY, {'class_uri': class_uri}, access_mode=READ_ACCESS)
         return [self.collect_node(result) for result in results]
     
+    def get_class_overview(self, class_uri: str) -> ClassOverview:
+        """
+        Получить класс, его родителей, потомков, объекты и signature
+        
+        Пять независимых чтений выполняются параллельно через gather.
+        
+        Args:
+            class_uri: URI класса
+            
+        Returns:
+            Данные страницы класса со временем чтения каждой части
+        """
+        return self._collect_class_overview(self.gather(*self._class_overview_calls(class_uri)))
+    
+    def _create_linked_node(self, params: Dict[str, Any], links: List[Tuple[str, str]],
+                            properties: List[Tuple[str, Dict[str, Any]]] = ()) -> TNode:
+        """
+        Создание узла вместе со связями к существующим узлам одним запросом
+        
+        Args:
+            params: Параметры узла (uri, title, description, labels)
+            links: Пары (тип связи, URI узла-цели)
+            properties: Пары (тип связи, свойства нового узла Property)
+            
+        Returns:
+            Созданный узел
+        """
+        query, parameters = self._linked_node_statement(params, links, properties)
+        return self._collect_linked_node(self._execute_query(query, parameters), params, links)
+    
     def update_class(self, class_uri: str, title: str, description: str) -> Optional[TNode]:
         """
         Обновить класс (имя и описание)
@@ -167,22 +827,7 @@ class OntologyRepository(GraphRepository):
         Returns:
             Созданный класс
         """
-        # Генерируем URI для класса
-        class_uri = f"class_{self.generate_random_string()}"
-        
-        # Создаем класс
-        class_node = self.create_node({
-            'uri': class_uri,
-            'title': title,
-            'description': description,
-            'labels': ['Class']
-        })
-        
-        # Если указан родитель, создаем связь
-        if parent_uri:
-            self.create_arc(class_uri, parent_uri, 'subclass_of')
-        
-        return class_node
+        return self._create_linked_node(*self._class_params(title, description, parent_uri))
     
     def delete_class(self, class_uri: str) -> bool:
         """
@@ -194,20 +839,9 @@ class OntologyRepository(GraphRepository):
         Returns:
             True если класс удален, False если не найден
         """
-        # Получаем всех потомков класса (рекурсивно)
-        query = """
-        MATCH (c:Class {uri: $class_uri})
-        OPTIONAL MATCH (c)-[:subclass_of*]->(descendant:Class)
-        WITH collect(DISTINCT c) + collect(DISTINCT descendant) as classes_to_delete
-        UNWIND classes_to_delete as class_to_delete
-        OPTIONAL MATCH (class_to_delete)<-[:instance_of]-(obj:Object)
-        WITH collect(DISTINCT class_to_delete) + collect(DISTINCT obj) as nodes_to_delete
-        UNWIND nodes_to_delete as node_to_delete
-        DETACH DELETE node_to_delete
-        RETURN count(node_to_delete) as deleted_count
-        """
-        
-        results = self._execute_query(query, {'class_uri': class_uri})
+        results = self._execute_query(self.DELETE_CLASS_QUERY, {'class_uri': class_uri})
+        # Удаляются потомки и объекты класса, поэтому сбрасывается весь кэш
+        self._invalidate()
         return results[0]['deleted_count'] > 0 if results else False
     
     # ==================== МЕТОДЫ РАБОТЫ С АТРИБУТАМИ КЛАССОВ ====================
@@ -224,21 +858,7 @@ class OntologyRepository(GraphRepository):
         Returns:
             Созданный DatatypeProperty
         """
-        if not attr_uri:
-            attr_uri = f"attr_{self.generate_random_string()}"
-        
-        # Создаем DatatypeProperty
-        attr_node = self.create_node({
-            'uri': attr_uri,
-            'title': attr_name,
-            'description': f"DatatypeProperty for {attr_name}",
-            'labels': ['DatatypeProperty']
-        })
-        
-        # Создаем связь domain
-        self.create_arc(attr_uri, class_uri, 'applies_to')
-        
-        return attr_node
+        return self._create_linked_node(*self._class_attribute_params(class_uri, attr_name, attr_uri))
     
     def delete_class_attribute(self, class_uri: str, attr_uri: str) -> bool:
         """
@@ -251,16 +871,9 @@ class OntologyRepository(GraphRepository):
         Returns:
             True если атрибут удален, False если не найден
         """
-        # Удаляем связь domain и сам атрибут
-        query = """
-        MATCH (attr:DatatypeProperty {uri: $attr_uri})-[r:applies_to]->(c:Class {uri: $class_uri})
-        DELETE r
-        WITH attr
-        DETACH DELETE attr
-        RETURN count(attr) as deleted_count
-        """
-        
-        results = self._execute_query(query, {'class_uri': class_uri, 'attr_uri': attr_uri})
+        results = self._execute_query(self.DELETE_CLASS_ATTRIBUTE_QUERY, {'class_uri': class_uri, 'attr_uri': attr_uri})
+        self._invalidate(class_uri, attr_uri)
+        self._invalidate_signatures()
         return results[0]['deleted_count'] > 0 if results else False
     
     def add_class_object_attribute(self, class_uri: str, attr_name: str, range_class_uri: str) -> TNode:
@@ -275,23 +888,7 @@ class OntologyRepository(GraphRepository):
         Returns:
             Созданный ObjectProperty
         """
-        attr_uri = f"obj_attr_{self.generate_random_string()}"
-        
-        # Создаем ObjectProperty
-        attr_node = self.create_node({
-            'uri': attr_uri,
-            'title': attr_name,
-            'description': f"ObjectProperty for {attr_name}",
-            'labels': ['ObjectProperty']
-        })
-        
-        # Создаем связь domain
-        self.create_arc(attr_uri, class_uri, 'applies_to')
-        
-        # Создаем связь range
-        self.create_arc(attr_uri, range_class_uri, 'points_to')
-        
-        return attr_node
+        return self._create_linked_node(*self._class_object_attribute_params(class_uri, attr_name, range_class_uri))
     
     def delete_class_object_attribute(self, object_property_uri: str) -> bool:
         """
@@ -303,6 +900,8 @@ class OntologyRepository(GraphRepository):
         Returns:
             True если атрибут удален, False если не найден
         """
+        # Класс, к которому относился атрибут, неизвестен: сбрасываем все signature
+        self._invalidate_signatures()
         return self.delete_node_by_uri(object_property_uri)
     
     def add_class_parent(self, parent_uri: str, target_uri: str) -> bool:
@@ -318,6 +917,8 @@ class OntologyRepository(GraphRepository):
         """
         try:
             self.create_arc(target_uri, parent_uri, 'subclass_of')
+            # Потомки target_uri наследуют параметры нового родителя
+            self._invalidate_signatures()
             return True
         except Exception:
             return False
@@ -334,13 +935,15 @@ class OntologyRepository(GraphRepository):
         Returns:
             Объект или None, если не найден
         """
-        query = """
-        MATCH (obj:Object {uri: $object_uri})
-        RETURN elementId(obj) as element_id, obj.uri as uri, obj.description as description, obj.title as title
-        """
-        results = self._execute_query(query, {'object_uri': object_uri})
+        cached = self._cache_get(object_uri, 'object')
+        if cached is not None:
+            return cached
+        
+        results = self._execute_query(self.OBJECT_QUERY, {'object_uri': object_uri}, access_mode=READ_ACCESS)
         if results:
-            return self.collect_node(results[0])
+            obj_node = self.collect_node(results[0])
+            self._cache_put(object_uri, obj_node, 'object')
+            return obj_node
         return None
     
     def delete_object(self, object_uri: str) -> bool:
@@ -359,6 +962,8 @@ class OntologyRepository(GraphRepository):
         """
         Создать объект через collect_signature
         
+        Объект, связь instance_of и все узлы Property создаются одним запросом.
+        
         Args:
             class_uri: URI класса
             object_data: Данные объекта (title, description, свойства)
@@ -366,35 +971,37 @@ class OntologyRepository(GraphRepository):
         Returns:
             Созданный объект
         """
-        # Генерируем URI для объекта
-        object_uri = f"obj_{self.generate_random_string()}"
+        return self._create_linked_node(*self._object_params(class_uri, object_data))
+    
+    def create_objects(self, class_uri: str, rows: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE,
+                       on_chunk: Optional[Callable[[TBatchChunk], None]] = None) -> List[TNode]:
+        """
+        Массовое создание объектов класса
         
-        # Создаем объект
-        obj_node = self.create_node({
-            'uri': object_uri,
-            'title': object_data.get('title', ''),
-            'description': object_data.get('description', ''),
-            'labels': ['Object']
-        })
-        
-        # Создаем связь instance_of
-        self.create_arc(object_uri, class_uri, 'instance_of')
-        
-        # Добавляем свойства объекта
-        for key, value in object_data.items():
-            if key not in ['title', 'description'] and value is not None:
-                # Создаем узел свойства
-                prop_uri = f"prop_{self.generate_random_string()}"
-                self.create_node({
-                    'uri': prop_uri,
-                    'value': str(value),
-                    'labels': ['Property']
-                })
-                
-                # Создаем связь к свойству
-                self.create_arc(object_uri, prop_uri, key)
-        
-        return obj_node
+        Все строки проверяются по signature класса до записи: свойства, кроме
+        title и description, должны быть параметрами класса. Объекты, связи
+        instance_of и узлы Property пачки создаются одним запросом UNWIND
+        в отдельной транзакции.
+        
+        Args:
+            class_uri: URI класса
+            rows: Данные объектов (как object_data в create_object)
+            batch_size: Максимальное число объектов в одном запросе
+            on_chunk: Функция, получающая статистику каждой пачки (TBatchChunk)
+            
+        Returns:
+            Созданные объекты в порядке строк
+        """
+        if self.get_class(class_uri) is None:
+            raise ValueError(f"Класс {class_uri} не найден")
+        fields, object_rows = self._object_rows(class_uri, self.collect_signature(class_uri), rows)
+        query = self._create_objects_query(fields)
+        
+        nodes: List[Optional[TNode]] = [None] * len(rows)
+        for chunk in self._chunks(object_rows, batch_size):
+            for result in self._run_chunk(class_uri, query, chunk, on_chunk):
+                nodes[result['idx']] = self.collect_node(result)
+        return self._collect_objects(class_uri, nodes)
     
     def update_object(self, object_uri: str, object_data: Dict[str, Any]) -> Optional[TNode]:
         """
@@ -407,37 +1014,35 @@ class OntologyRepository(GraphRepository):
         Returns:
             Обновленный объект или None, если не найден
         """
-        # Обновляем основные свойства объекта
-        updated_obj = self.update_node(object_uri, {
-            'title': object_data.get('title', ''),
-            'description': object_data.get('description', '')
-        })
-        
-        if not updated_obj:
-            return None
-        
-        # Удаляем старые свойства
-        query = """
-        MATCH (obj:Object {uri: $object_uri})-[r]->(prop:Property)
-        DELETE r, prop
-        """
-        self._execute_query(query, {'object_uri': object_uri})
-        
-        # Добавляем новые свойства
-        for key, value in object_data.items():
-            if key not in ['title', 'description'] and value is not None:
-                # Создаем узел свойства
-                prop_uri = f"prop_{self.generate_random_string()}"
-                self.create_node({
-                    'uri': prop_uri,
-                    'value': str(value),
-                    'labels': ['Property']
-                })
-                
-                # Создаем связь к свойству
-                self.create_arc(object_uri, prop_uri, key)
-        
-        return updated_obj
+        update = self.update_object_fields(object_uri, object_data)
+        return update.obj if update is not None else None
+    
+    def update_object_fields(self, object_uri: str, object_data: Dict[str, Any]) -> Optional[ObjectUpdate]:
+        """
+        Обновить объект и вернуть измененные поля
+        
+        Текущие значения читаются одним запросом, затем в той же транзакции
+        одним запросом добавляются, изменяются и удаляются только отличающиеся
+        свойства. Свойства, которых нет в object_data, удаляются.
+        
+        Args:
+            object_uri: URI объекта
+            object_data: Новые данные объекта
+            
+        Returns:
+            Обновленный объект и измененные поля или None, если объект не найден
+        """
+        with self.unit_of_work():
+            results = self._execute_query(self.OBJECT_STATE_QUERY, {'object_uri': object_uri}, access_mode=READ_ACCESS)
+            if not results:
+                return None
+            
+            changes, update = self._diff_object(results[0], object_data)
+            if update.changed:
+                self._execute_query(*self._update_object_statement(object_uri, changes))
+            self._invalidate_object_update(object_uri, changes)
+        
+        return update
     
     # ==================== МЕТОД СБОРА SIGNATURE ====================
     
@@ -445,34 +1050,494 @@ class OntologyRepository(GraphRepository):
         """
         Сбор всех (DatatypeProperty) и (ObjectProperty - range - Class) узлов у Класса
         
+        Параметры класса и всех его предков по subclass_of собираются одним
+        запросом; у каждого параметра указан класс, где он объявлен, а
+        переопределения разрешаются как в _collect_signature.
+        
         Args:
             class_uri: URI класса
             
         Returns:
             Структура Signature с параметрами класса
         """
-        # Получаем DatatypeProperty (params)
-        datatype_query = """
-        MATCH (c:Class {uri: $class_uri})<-[:applies_to]-(dtp:DatatypeProperty)
-        RETURN dtp.uri as uri, dtp.title as title
+        cached = self._cache_get(class_uri, 'signature')
+        if cached is not None:
+            return cached
+        
+        results = self._execute_query(self.SIGNATURE_QUERY, {'class_uri': class_uri}, access_mode=READ_ACCESS)
+        signature = self._collect_signature(results)
+        self._cache_put(class_uri, signature, 'signature')
+        return signature
+
+
+class AsyncOntologyRepository(_OntologyRepositoryBase, AsyncGraphRepository):
+    """
+    Асинхронный репозиторий онтологии
+    
+    Асинхронный двойник OntologyRepository: те же методы (корутины)
+    и те же результаты поверх AsyncGraphRepository.
+    """
+    
+    # ==================== ОСНОВНЫЕ МЕТОДЫ ОНТОЛОГИИ ====================
+    
+    async def get_ontology(self) -> List[TNode]:
+        """Получить всю онтологию"""
+        return await self.get_all_nodes()
+    
+    async def get_ontology_parent_classes(self) -> List[TNode]:
+        """Получить классы онтологии, у которых нет родителей"""
+        results = await self._execute_query(self.PARENT_CLASSES_QUERY, access_mode=READ_ACCESS)
+        return [self.collect_node(result) for result in results]
+    
+    async def get_ontology_page(self, limit: int, cursor: Optional[str] = None) -> TPage:
+        """Получить страницу онтологии"""
+        return await self.get_nodes_page(limit, cursor)
+    
+    async def get_ontology_parent_classes_page(self, limit: int, cursor: Optional[str] = None) -> TPage:
+        """Получить страницу корневых классов онтологии"""
+        return await self._fetch_page(self.PARENT_CLASSES_PATTERN, limit, cursor, condition=self.PARENT_CLASSES_CONDITION)
+    
+    # ==================== МЕТОДЫ РАБОТЫ С КЛАССАМИ ====================
+    
+    async def get_class(self, class_uri: str) -> Optional[TNode]:
+        """Получить класс по URI"""
+        cached = self._cache_get(class_uri, 'class')
+        if cached is not None:
+            return cached
+        
+        results = await self._execute_query(self.CLASS_QUERY, {'class_uri': class_uri}, access_mode=READ_ACCESS)
+        if results:
+            class_node = self.collect_node(results[0])
+            self._cache_put(class_uri, class_node, 'class')
+            return class_node
+        return None
+    
+    async def get_class_parents(self, class_uri: str) -> List[TNode]:
+        """Получить родителей класса"""
+        results = await self._execute_query(self.CLASS_PARENTS_QUERY, {'class_uri': class_uri}, access_mode=READ_ACCESS)
+        return [self.collect_node(result) for result in results]
+    
+    async def get_class_children(self, class_uri: str) -> List[TNode]:
+        """Получить потомков класса"""
+        results = await self._execute_query(self.CLASS_CHILDREN_QUERY, {'class_uri': class_uri}, access_mode=READ_ACCESS)
+        return [self.collect_node(result) for result in results]
+    
+    async def get_class_objects(self, class_uri: str) -> List[TNode]:
+        """Получить объекты класса"""
+        results = await self._execute_query(self.CLASS_OBJECTS_QUERY, {'class_uri': class_uri}, access_mode=READ_ACCESS)
+        return [self.collect_node(result) for result in results]
+    
+    async def get_class_overview(self, class_uri: str) -> ClassOverview:
+        """Получить класс, его родителей, потомков, объекты и signature (конкурентно)"""
+        return self._collect_class_overview(await self.gather(*self._class_overview_calls(class_uri)))
+    
+    async def update_class(self, class_uri: str, title: str, description: str) -> Optional[TNode]:
+        """Обновить класс (имя и описание)"""
+        return await self.update_node(class_uri, {'title': title, 'description': description})
+    
+    async def _create_linked_node(self, params: Dict[str, Any], links: List[Tuple[str, str]],
+                                  properties: List[Tuple[str, Dict[str, Any]]] = ()) -> TNode:
+        """Создание узла вместе со связями к существующим узлам одним запросом"""
+        query, parameters = self._linked_node_statement(params, links, properties)
+        return self._collect_linked_node(await self._execute_query(query, parameters), params, links)
+    
+    async def create_class(self, title: str, description: str, parent_uri: Optional[str] = None) -> TNode:
+        """Создать класс (имя, описание, родитель)"""
+        return await self._create_linked_node(*self._class_params(title, description, parent_uri))
+    
+    async def delete_class(self, class_uri: str) -> bool:
+        """Удалить класс (его детей, объектов, объектов детей и т.д.)"""
+        results = await self._execute_query(self.DELETE_CLASS_QUERY, {'class_uri': class_uri})
+        self._invalidate()
+        return results[0]['deleted_count'] > 0 if results else False
+    
+    # ==================== МЕТОДЫ РАБОТЫ С АТРИБУТАМИ КЛАССОВ ====================
+    
+    async def add_class_attribute(self, class_uri: str, attr_name: str, attr_uri: Optional[str] = None) -> TNode:
+        """Добавить DatatypeProperty к классу"""
+        return await self._create_linked_node(*self._class_attribute_params(class_uri, attr_name, attr_uri))
+    
+    async def delete_class_attribute(self, class_uri: str, attr_uri: str) -> bool:
+        """Удалить DatatypeProperty у класса"""
+        results = await self._execute_query(self.DELETE_CLASS_ATTRIBUTE_QUERY, {'class_uri': class_uri, 'attr_uri': attr_uri})
+        self._invalidate(class_uri, attr_uri)
+        self._invalidate_signatures()
+        return results[0]['deleted_count'] > 0 if results else False
+    
+    async def add_class_object_attribute(self, class_uri: str, attr_name: str, range_class_uri: str) -> TNode:
+        """Добавить ObjectProperty к классу"""
+        return await self._create_linked_node(*self._class_object_attribute_params(class_uri, attr_name, range_class_uri))
+    
+    async def delete_class_object_attribute(self, object_property_uri: str) -> bool:
+        """Удалить ObjectProperty"""
+        self._invalidate_signatures()
+        return await self.delete_node_by_uri(object_property_uri)
+    
+    async def add_class_parent(self, parent_uri: str, target_uri: str) -> bool:
+        """Присоединить родителя к классу (без создания родителя, из существующих классов)"""
+        try:
+            await self.create_arc(target_uri, parent_uri, 'subclass_of')
+            self._invalidate_signatures()
+            return True
+        except Exception:
+            return False
+    
+    # ==================== МЕТОДЫ РАБОТЫ С ОБЪЕКТАМИ ====================
+    
+    async def get_object(self, object_uri: str) -> Optional[TNode]:
+        """Получить объект по URI"""
+        cached = self._cache_get(object_uri, 'object')
+        if cached is not None:
+            return cached
+        
+        results = await self._execute_query(self.OBJECT_QUERY, {'object_uri': object_uri}, access_mode=READ_ACCESS)
+        if results:
+            obj_node = self.collect_node(results[0])
+            self._cache_put(object_uri, obj_node, 'object')
+            return obj_node
+        return None
+    
+    async def delete_object(self, object_uri: str) -> bool:
+        """Удалить объект"""
+        return await self.delete_node_by_uri(object_uri)
+    
+    async def create_object(self, class_uri: str, object_data: Dict[str, Any]) -> TNode:
+        """Создать объект со свойствами одним запросом"""
+        return await self._create_linked_node(*self._object_params(class_uri, object_data))
+    
+    async def create_objects(self, class_uri: str, rows: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE,
+                             on_chunk: Optional[Callable[[TBatchChunk], None]] = None) -> List[TNode]:
+        """Массовое создание объектов класса с проверкой по signature"""
+        if await self.get_class(class_uri) is None:
+            raise ValueError(f"Класс {class_uri} не найден")
+        fields, object_rows = self._object_rows(class_uri, await self.collect_signature(class_uri), rows)
+        query = self._create_objects_query(fields)
+        
+        nodes: List[Optional[TNode]] = [None] * len(rows)
+        for chunk in self._chunks(object_rows, batch_size):
+            for result in await self._run_chunk(class_uri, query, chunk, on_chunk):
+                nodes[result['idx']] = self.collect_node(result)
+        return self._collect_objects(class_uri, nodes)
+    
+    async def update_object(self, object_uri: str, object_data: Dict[str, Any]) -> Optional[TNode]:
+        """Обновить объект через collect_signature"""
+        update = await self.update_object_fields(object_uri, object_data)
+        return update.obj if update is not None else None
+    
+    async def update_object_fields(self, object_uri: str, object_data: Dict[str, Any]) -> Optional[ObjectUpdate]:
+        """Обновить только изменившиеся поля объекта и вернуть их"""
+        async with self.unit_of_work():
+            results = await self._execute_query(self.OBJECT_STATE_QUERY, {'object_uri': object_uri}, access_mode=READ_ACCESS)
+            if not results:
+                return None
+            
+            changes, update = self._diff_object(results[0], object_data)
+            if update.changed:
+                await self._execute_query(*self._update_object_statement(object_uri, changes))
+            self._invalidate_object_update(object_uri, changes)
+        
+        return update
+    
+    # ==================== МЕТОД СБОРА SIGNATURE ====================
+    
+    async def collect_signature(self, class_uri: str) -> Signature:
+        """Сбор всех (DatatypeProperty) и (ObjectProperty - range - Class) узлов у Класса"""
+        cached = self._cache_get(class_uri, 'signature')
+        if cached is not None:
+            return cached
+        
+        results = await self._execute_query(self.SIGNATURE_QUERY, {'class_uri': class_uri}, access_mode=READ_ACCESS)
+        signature = self._collect_signature(results)
+        self._cache_put(class_uri, signature, 'signature')
+        return signature
+
+
+class MemoryOntologyRepository(_OntologyRepositoryBase, MemoryGraphRepository):
+    """
+    Репозиторий онтологии с графом в памяти процесса
+    
+    Те же методы и результаты, что у OntologyRepository, поверх
+    MemoryGraphRepository: запросы онтологии выполняются обходом графа
+    в памяти с той же семантикой, что и их тексты Cypher.
+    """
+    
+    def _neighbours(self, node: Any, arc_type: Optional[str], outgoing: bool, other_label: str) -> List[Any]:
         """
-        datatype_results = self._execute_query(datatype_query, {'class_uri': class_uri})
+        Соседи узла графа по связям заданного типа
         
-        params = [SignatureParam(title=result['title'], uri=result['uri']) 
-                 for result in datatype_results]
+        Args:
+            node: Узел графа в памяти
+            arc_type: Тип связи (None - любой)
+            outgoing: True - по исходящим связям, False - по входящим
+            other_label: Метка соседей
+            
+        Returns:
+            Узлы графа в порядке создания связей
+        """
+        if outgoing:
+            related = [arc.end for arc in self.graph.outgoing(node, arc_type)]
+        else:
+            related = [arc.start for arc in self.graph.incoming(node, arc_type)]
+        return [other for other in related if other_label in other.labels]
+    
+    def _related(self, uri: str, label: str, arc_type: Optional[str], outgoing: bool, other_label: str) -> List[Any]:
+        """
+        Соседи узлов с заданным uri, как (n:label {uri})-[:arc_type]-(m:other_label)
         
-        # Получаем ObjectProperty (obj_params)
-        object_query = """
-        MATCH (c:Class {uri: $class_uri})<-[:applies_to]-(op:ObjectProperty)-[:points_to]->(target:Class)
-        RETURN op.uri as uri, op.title as title, target.uri as target_class_uri
+        Args:
+            uri: URI узла
+            label: Метка узла
+            arc_type: Тип связи (None - любой)
+            outgoing: True - по исходящим связям, False - по входящим
+            other_label: Метка соседей
+            
+        Returns:
+            Узлы графа в порядке создания связей
         """
-        object_results = self._execute_query(object_query, {'class_uri': class_uri})
+        return [other for node in self.graph.find(uri, label)
+                for other in self._neighbours(node, arc_type, outgoing, other_label)]
+    
+    def _root_classes(self) -> List[Any]:
+        """Классы без исходящих связей subclass_of (PARENT_CLASSES_QUERY)"""
+        return [node for node in self.graph.with_labels(['Class'])
+                if not self.graph.outgoing(node, 'subclass_of')]
+    
+    # ==================== ОСНОВНЫЕ МЕТОДЫ ОНТОЛОГИИ ====================
+    
+    def get_ontology(self) -> List[TNode]:
+        """Получить всю онтологию"""
+        return self.get_all_nodes()
+    
+    def get_ontology_parent_classes(self) -> List[TNode]:
+        """Получить классы онтологии, у которых нет родителей"""
+        return [self._to_node(node) for node in self._root_classes()]
+    
+    def get_ontology_page(self, limit: int, cursor: Optional[str] = None) -> TPage:
+        """Получить страницу онтологии"""
+        return self.get_nodes_page(limit, cursor)
+    
+    def get_ontology_parent_classes_page(self, limit: int, cursor: Optional[str] = None) -> TPage:
+        """Получить страницу корневых классов онтологии"""
+        with self.graph.lock:
+            return self._page(self._root_classes(), limit, cursor)
+    
+    # ==================== МЕТОДЫ РАБОТЫ С КЛАССАМИ ====================
+    
+    def get_class(self, class_uri: str) -> Optional[TNode]:
+        """Получить класс по URI"""
+        cached = self._cache_get(class_uri, 'class')
+        if cached is not None:
+            return cached
+        
+        nodes = self.graph.find(class_uri, 'Class')
+        if nodes:
+            class_node = self._to_node(nodes[0])
+            self._cache_put(class_uri, class_node, 'class')
+            return class_node
+        return None
+    
+    def get_class_parents(self, class_uri: str) -> List[TNode]:
+        """Получить родителей класса"""
+        return [self._to_node(node) for node in self._related(class_uri, 'Class', 'subclass_of', True, 'Class')]
+    
+    def get_class_children(self, class_uri: str) -> List[TNode]:
+        """Получить потомков класса"""
+        return [self._to_node(node) for node in self._related(class_uri, 'Class', 'subclass_of', False, 'Class')]
+    
+    def get_class_objects(self, class_uri: str) -> List[TNode]:
+        """Получить объекты класса"""
+        return [self._to_node(node) for node in self._related(class_uri, 'Class', 'instance_of', False, 'Object')]
+    
+    def get_class_overview(self, class_uri: str) -> ClassOverview:
+        """Получить класс, его родителей, потомков, объекты и signature"""
+        return self._collect_class_overview(self.gather(*self._class_overview_calls(class_uri)))
+    
+    def update_class(self, class_uri: str, title: str, description: str) -> Optional[TNode]:
+        """Обновить класс (имя и описание)"""
+        return self.update_node(class_uri, {'title': title, 'description': description})
+    
+    def _create_linked_node(self, params: Dict[str, Any], links: List[Tuple[str, str]],
+                            properties: List[Tuple[str, Dict[str, Any]]] = ()) -> TNode:
+        """Создание узла вместе со связями к существующим узлам и узлами Property (_create_linked_node_query)"""
+        props = dict(params)
+        labels = self._with_base_label(props.pop('labels', []))
+        with self.graph.transaction():
+            targets = [self.graph.find(uri, BASE_LABEL) for _, uri in links]
+            results = []
+            if all(targets):
+                node = self.graph.add_node(labels, props)
+                for (arc_type, _), nodes in zip(links, targets):
+                    for target in nodes:
+                        self.graph.add_arc(node, target, arc_type)
+                for arc_type, property_props in properties:
+                    self.graph.add_arc(node, self.graph.add_node(['Property', BASE_LABEL], property_props), arc_type)
+                results.append(self._node_data(node))
+        return self._collect_linked_node(results, params, links)
+    
+    def create_class(self, title: str, description: str, parent_uri: Optional[str] = None) -> TNode:
+        """Создать класс (имя, описание, родитель)"""
+        return self._create_linked_node(*self._class_params(title, description, parent_uri))
+    
+    def delete_class(self, class_uri: str) -> bool:
+        """Удалить класс (его детей, объектов, объектов детей и т.д.)"""
+        with self.unit_of_work():
+            # Упорядоченное множество удаляемых узлов (dict со значениями None)
+            classes = dict.fromkeys(self.graph.find(class_uri, 'Class'))
+            # Как и DELETE_CLASS_QUERY, обход идет по исходящим связям subclass_of
+            stack = list(classes)
+            while stack:
+                for node in self._neighbours(stack.pop(), 'subclass_of', True, 'Class'):
+                    if node not in classes:
+                        classes[node] = None
+                        stack.append(node)
+            nodes = dict(classes)
+            for class_node in classes:
+                nodes.update(dict.fromkeys(self._neighbours(class_node, 'instance_of', False, 'Object')))
+            self._delete_nodes(list(nodes))
+        # Удаляются потомки и объекты класса, поэтому сбрасывается весь кэш
+        self._invalidate()
+        return len(nodes) > 0
+    
+    # ==================== МЕТОДЫ РАБОТЫ С АТРИБУТАМИ КЛАССОВ ====================
+    
+    def add_class_attribute(self, class_uri: str, attr_name: str, attr_uri: Optional[str] = None) -> TNode:
+        """Добавить DatatypeProperty к классу"""
+        return self._create_linked_node(*self._class_attribute_params(class_uri, attr_name, attr_uri))
+    
+    def delete_class_attribute(self, class_uri: str, attr_uri: str) -> bool:
+        """Удалить DatatypeProperty у класса"""
+        with self.unit_of_work():
+            attributes = [arc.start for class_node in self.graph.find(class_uri, 'Class')
+                          for arc in self.graph.incoming(class_node, 'applies_to')
+                          if arc.start.props.get('uri') == attr_uri and 'DatatypeProperty' in arc.start.labels]
+            deleted, _ = self._delete_nodes(list(dict.fromkeys(attributes)))
+        self._invalidate(class_uri, attr_uri)
+        self._invalidate_signatures()
+        return deleted > 0
+    
+    def add_class_object_attribute(self, class_uri: str, attr_name: str, range_class_uri: str) -> TNode:
+        """Добавить ObjectProperty к классу"""
+        return self._create_linked_node(*self._class_object_attribute_params(class_uri, attr_name, range_class_uri))
+    
+    def delete_class_object_attribute(self, object_property_uri: str) -> bool:
+        """Удалить ObjectProperty"""
+        self._invalidate_signatures()
+        return self.delete_node_by_uri(object_property_uri)
+    
+    def add_class_parent(self, parent_uri: str, target_uri: str) -> bool:
+        """Присоединить родителя к классу"""
+        try:
+            self.create_arc(target_uri, parent_uri, 'subclass_of')
+            # Потомки target_uri наследуют параметры нового родителя
+            self._invalidate_signatures()
+            return True
+        except Exception:
+            return False
+    
+    # ==================== МЕТОДЫ РАБОТЫ С ОБЪЕКТАМИ ====================
+    
+    def get_object(self, object_uri: str) -> Optional[TNode]:
+        """Получить объект по URI"""
+        cached = self._cache_get(object_uri, 'object')
+        if cached is not None:
+            return cached
         
-        obj_params = [SignatureObjParam(
-            title=result['title'], 
-            uri=result['uri'], 
-            target_class_uri=result['target_class_uri'],
-            relation_direction=1  # По умолчанию направление от объекта
-        ) for result in object_results]
+        nodes = self.graph.find(object_uri, 'Object')
+        if nodes:
+            obj_node = self._to_node(nodes[0])
+            self._cache_put(object_uri, obj_node, 'object')
+            return obj_node
+        return None
+    
+    def delete_object(self, object_uri: str) -> bool:
+        """Удалить объект"""
+        return self.delete_node_by_uri(object_uri)
+    
+    def create_object(self, class_uri: str, object_data: Dict[str, Any]) -> TNode:
+        """Создать объект со свойствами"""
+        return self._create_linked_node(*self._object_params(class_uri, object_data))
+    
+    def create_objects(self, class_uri: str, rows: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE,
+                       on_chunk: Optional[Callable[[TBatchChunk], None]] = None) -> List[TNode]:
+        """Массовое создание объектов класса с проверкой по signature (_create_objects_query)"""
+        if self.get_class(class_uri) is None:
+            raise ValueError(f"Класс {class_uri} не найден")
+        fields, object_rows = self._object_rows(class_uri, self.collect_signature(class_uri), rows)
         
-        return Signature(params=params, obj_params=obj_params)
+        nodes: List[Optional[TNode]] = [None] * len(rows)
+        for chunk in self._chunks(object_rows, batch_size):
+            started = time.perf_counter()
+            with self.graph.transaction():
+                for row in chunk:
+                    for class_node in self.graph.find(row['class_uri'], 'Class'):
+                        node = self.graph.add_node(['Object', BASE_LABEL], row['props'])
+                        self.graph.add_arc(node, class_node, 'instance_of')
+                        for index, field in enumerate(fields):
+                            for property_props in row[f'properties_{index}']:
+                                self.graph.add_arc(node, self.graph.add_node(['Property', BASE_LABEL], property_props), field)
+                        nodes[row['idx']] = self._to_node(node)
+            if on_chunk:
+                on_chunk(TBatchChunk(key=class_uri, size=len(chunk), seconds=time.perf_counter() - started))
+        return self._collect_objects(class_uri, nodes)
+    
+    def update_object(self, object_uri: str, object_data: Dict[str, Any]) -> Optional[TNode]:
+        """Обновить объект через collect_signature"""
+        update = self.update_object_fields(object_uri, object_data)
+        return update.obj if update is not None else None
+    
+    def update_object_fields(self, object_uri: str, object_data: Dict[str, Any]) -> Optional[ObjectUpdate]:
+        """Обновить только изменившиеся поля объекта и вернуть их"""
+        with self.unit_of_work():
+            nodes = self.graph.find(object_uri, 'Object')
+            if not nodes:
+                return None
+            
+            # Состояние в формате OBJECT_STATE_QUERY
+            properties = {arc.end.props.get('uri'): arc for arc in self.graph.outgoing(nodes[0])
+                          if 'Property' in arc.end.labels}
+            state = self._node_data(nodes[0])
+            state['properties'] = [[arc.type, uri, arc.end.props.get('value')] for uri, arc in properties.items()]
+            changes, update = self._diff_object(state, object_data)
+            
+            for node in nodes:
+                self.graph.set_props(node, changes['props'])
+            self._delete_nodes([properties[uri].end for uri in changes['deleted']])
+            for uri, value in changes['values'].items():
+                self.graph.set_props(properties[uri].end, {'value': value})
+            for arc_type, property_props in changes['properties']:
+                self.graph.add_arc(nodes[0], self.graph.add_node(['Property', BASE_LABEL], property_props), arc_type)
+            self._invalidate_object_update(object_uri, changes)
+        
+        return update
+    
+    # ==================== МЕТОД СБОРА SIGNATURE ====================
+    
+    def collect_signature(self, class_uri: str) -> Signature:
+        """Сбор всех (DatatypeProperty) и (ObjectProperty - range - Class) узлов у Класса"""
+        cached = self._cache_get(class_uri, 'signature')
+        if cached is not None:
+            return cached
+        
+        # Предки в порядке обхода в ширину с кратчайшим расстоянием (SIGNATURE_QUERY)
+        depths = dict.fromkeys(self.graph.find(class_uri, 'Class'), 0)
+        queue = list(depths)
+        for ancestor in queue:
+            for parent in self._neighbours(ancestor, 'subclass_of', True, 'Class'):
+                if parent not in depths:
+                    depths[parent] = depths[ancestor] + 1
+                    queue.append(parent)
+        
+        results = []
+        for ancestor, depth in depths.items():
+            row = {'class_uri': ancestor.props.get('uri'), 'depth': depth}
+            for node in self._neighbours(ancestor, 'applies_to', False, 'DatatypeProperty'):
+                results.append(dict(row, uri=node.props.get('uri'), title=node.props.get('title'),
+                                    is_object=False, target_class_uri=None))
+            for node in self._neighbours(ancestor, 'applies_to', False, 'ObjectProperty'):
+                for target in self._neighbours(node, 'points_to', True, 'Class'):
+                    results.append(dict(row, uri=node.props.get('uri'), title=node.props.get('title'),
+                                        is_object=True, target_class_uri=target.props.get('uri')))
+        
+        signature = self._collect_signature(results)
+        self._cache_put(class_uri, signature, 'signature')
+        return signature
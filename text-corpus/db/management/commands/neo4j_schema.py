@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from db.api.neo4j_pool import get_ontology_repository, uses_memory_backend
+
+
+class Command(BaseCommand):
+    help = ('Перенос общей метки на существующие узлы и создание ограничений и индексов по uri. '
+            'Обязательный шаг развертывания: без общей метки узлы не находятся поиском по uri')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Число узлов, получающих общую метку за один запрос')
+        parser.add_argument('--skip-migrate', action='store_true',
+                            help='Только создать ограничения и индексы, не переносить метку')
+
+    def handle(self, *args, **options):
+        if uses_memory_backend():
+            self.stdout.write('NEO4J_BACKEND=memory: схема Neo4j не используется')
+            return
+
+        repository = get_ontology_repository()
+        if not options['skip_migrate']:
+            updated = repository.migrate_base_label(batch_size=options['batch_size'])
+            self.stdout.write(f'Общая метка добавлена узлам: {updated}')
+        for statement in repository.ensure_schema():
+            self.stdout.write(statement)
+        self.stdout.write(self.style.SUCCESS('Схема Neo4j готова'))
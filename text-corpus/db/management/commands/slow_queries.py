@@ -0,0 +1,63 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from db.api.graph_repository import SlowQueryLog
+
+
+class Command(BaseCommand):
+    help = 'Просмотр журнала медленных запросов Neo4j (settings.NEO4J_SLOW_QUERY_LOG)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=None, help='Путь к журналу (по умолчанию NEO4J_SLOW_QUERY_LOG)')
+        parser.add_argument('--limit', type=int, default=20, help='Число выводимых записей')
+        parser.add_argument('--sort', choices=['time', 'seconds', 'db_hits'], default='time',
+                            help='Порядок: последние, самые долгие или с наибольшим числом db hits')
+        parser.add_argument('--template', default=None, help='Подстрока шаблона запроса')
+        parser.add_argument('--plans', action='store_true', help='Выводить планы запросов')
+        parser.add_argument('--json', action='store_true', help='Выводить записи строками JSON')
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.NEO4J_SLOW_QUERY_LOG
+        entries = SlowQueryLog.read(path)
+        if options['template']:
+            entries = [entry for entry in entries if options['template'] in entry['template']]
+
+        if options['sort'] == 'time':
+            entries.reverse()
+        else:
+            entries.sort(key=lambda entry: entry.get(options['sort']) or 0, reverse=True)
+        entries = entries[:options['limit']]
+
+        if not entries:
+            self.stdout.write(f'Журнал {path} пуст')
+            return
+
+        for entry in entries:
+            if options['json']:
+                self.stdout.write(json.dumps(entry, ensure_ascii=False))
+                continue
+            self.stdout.write(
+                f"{entry['time']}  {entry['seconds']:.3f} s  rows={entry['rows']}"
+                f"  db_hits={entry.get('db_hits', '-')}  {entry['access_mode']}"
+            )
+            self.stdout.write(f"  {entry['template']}")
+            self.stdout.write(f"  parameters: {json.dumps(entry['parameters'], ensure_ascii=False)}")
+            if entry.get('error'):
+                self.stdout.write(f"  error: {entry['error']}")
+            if entry.get('plan_error'):
+                self.stdout.write(f"  {entry['plan_mode']} error: {entry['plan_error']}")
+            if options['plans'] and entry.get('plan'):
+                self.stdout.write(f"  {entry['plan_mode']}:")
+                self._write_plan(entry['plan'], 2)
+
+    def _write_plan(self, plan, depth):
+        """Вывод дерева операторов плана с отступами"""
+        counters = ''.join(
+            f'  {name}={plan[name]}' for name in ('db_hits', 'rows') if name in plan
+        )
+        details = f" ({plan['details']})" if plan.get('details') else ''
+        self.stdout.write(f"{'  ' * depth}{plan['operator']}{details}{counters}")
+        for child in plan['children']:
+            self._write_plan(child, depth + 1)
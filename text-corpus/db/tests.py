@@ -1,3 +1,41 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from db.api.graph_repository import QueryStats, TQueryEvent
+from db.views import get_neo4j_query_stats
+
+
+class Neo4jQueryStatsViewTest(TestCase):
+    """Тесты выгрузки статистики запросов Neo4j"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user('stats', password='stats')
+        self.stats = QueryStats()
+        self.stats(TQueryEvent(template='MATCH (n) RETURN n', parameter_sizes={}, access_mode='READ', rows=1, seconds=0.01))
+
+    def _get(self, **params):
+        request = self.factory.get('/api/diagnostics/neo4j_queries/', params)
+        force_authenticate(request, user=self.user)
+        return get_neo4j_query_stats(request)
+
+    def test_json(self):
+        with patch('db.views.get_query_stats', return_value=self.stats):
+            response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, self.stats.snapshot())
+
+    def test_prometheus(self):
+        with patch('db.views.get_query_stats', return_value=self.stats):
+            response = self._get(output='prometheus')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('neo4j_query_seconds_count', response.content.decode())
 
-# Create your tests here.
+    def test_disabled(self):
+        with patch('db.views.get_query_stats', return_value=None):
+            response = self._get()
+        self.assertEqual(response.status_code, 404)
@@ -32,12 +32,15 @@ from db.views import (
     get_ontology,
     get_ontology_parent_classes,
     get_class,
+    get_class_overview,
     create_class,
     collect_signature,
     create_object,
     get_object,
     create_datatype_property,
     create_object_property,
+    get_neo4j_pool_metrics,
+    get_neo4j_query_stats,
 )
 
 urlpatterns = [
@@ -65,6 +68,7 @@ urlpatterns = [
     path('api/ontology/', get_ontology, name='api_ontology_list'),
     path('api/ontology/parent_classes/', get_ontology_parent_classes, name='api_ontology_parent_classes'),
     path('api/ontology/get_class/', get_class, name='api_ontology_get_class'),
+    path('api/ontology/class_overview/', get_class_overview, name='api_ontology_class_overview'),
     path('api/ontology/create_class/', create_class, name='api_ontology_create_class'),
     path('api/ontology/collect_signature/', collect_signature, name='api_ontology_collect_signature'),
     path('api/ontology/create_object/', create_object, name='api_ontology_create_object'),
@@ -72,6 +76,9 @@ urlpatterns = [
     path('api/ontology/create_datatype_property/', create_datatype_property, name='api_ontology_create_datatype_property'),
     path('api/ontology/create_object_property/', create_object_property, name='api_ontology_create_object_property'),
     
+    path('api/diagnostics/neo4j_pool/', get_neo4j_pool_metrics, name='api_diagnostics_neo4j_pool'),
+    path('api/diagnostics/neo4j_queries/', get_neo4j_query_stats, name='api_diagnostics_neo4j_queries'),
+    
     # Test endpoints
     path('getTest', getTest, name='getTest'),
     path('postTest', postTest, name='postTest'),
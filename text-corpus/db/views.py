@@ -39,6 +39,7 @@ from db.api.CorpusRepository import CorpusRepository
 from db.api.TextRepository import TextRepository
 from db.api.ontology_repository import OntologyRepository
 from db.api.graph_repository import GraphRepository
+from db.api.neo4j_pool import get_ontology_repository, get_pool_metrics, get_query_stats
 
 @api_view(['GET', ])
 @permission_classes((AllowAny,))
@@ -305,21 +306,66 @@ def delete_text(request):
 
 # ==================== ONTOLOGY API ENDPOINTS ====================
 
+ONTOLOGY_PAGE_MAX_LIMIT = 1000
+
+
+def parse_page_params(request):
+    """
+    Разбор параметров постраничной выдачи limit и cursor
+    
+    Returns:
+        Пара (limit, cursor) или None, если постраничная выдача не запрошена
+    """
+    limit = request.GET.get('limit', None)
+    cursor = request.GET.get('cursor', None) or None
+    if limit is None and cursor is None:
+        return None
+    
+    try:
+        limit = int(limit) if limit is not None else ONTOLOGY_PAGE_MAX_LIMIT
+    except ValueError:
+        raise ValueError('Неверный формат limit')
+    if limit <= 0 or limit > ONTOLOGY_PAGE_MAX_LIMIT:
+        raise ValueError(f'limit должен быть от 1 до {ONTOLOGY_PAGE_MAX_LIMIT}')
+    return limit, cursor
+
+
+def collect_page(page):
+    """Преобразование страницы TNode в словарь ответа"""
+    return {
+        'items': [
+            {
+                'id': node.id,
+                'uri': node.uri,
+                'title': node.title,
+                'description': node.description
+            }
+            for node in page.items
+        ],
+        'next_cursor': page.next_cursor
+    }
+
+
 @api_view(['GET'])
 @permission_classes((AllowAny,))
 def get_ontology(request):
-    """Получить всю онтологию"""
-    try:
-        from django.conf import settings
-        ontology_repo = OntologyRepository(
-            uri=settings.NEO4J_URI,
-            user=settings.NEO4J_USER,
-            password=settings.NEO4J_PASSWORD,
-            database=settings.NEO4J_DATABASE
-        )
+    """Получить всю онтологию (или ее страницу при указании limit/cursor)"""
+    try:
+        page_params = parse_page_params(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        ontology_repo = get_ontology_repository()
+        
+        if page_params:
+            try:
+                page = ontology_repo.get_ontology_page(*page_params)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(collect_page(page))
         
         ontology = ontology_repo.get_ontology()
-        ontology_repo.close()
         
         # Преобразуем TNode в словари
         ontology_data = []
@@ -339,18 +385,23 @@ def get_ontology(request):
 @api_view(['GET'])
 @permission_classes((AllowAny,))
 def get_ontology_parent_classes(request):
-    """Получить корневые классы онтологии"""
-    try:
-        from django.conf import settings
-        ontology_repo = OntologyRepository(
-            uri=settings.NEO4J_URI,
-            user=settings.NEO4J_USER,
-            password=settings.NEO4J_PASSWORD,
-            database=settings.NEO4J_DATABASE
-        )
+    """Получить корневые классы онтологии (или их страницу при указании limit/cursor)"""
+    try:
+        page_params = parse_page_params(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        ontology_repo = get_ontology_repository()
+        
+        if page_params:
+            try:
+                page = ontology_repo.get_ontology_parent_classes_page(*page_params)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(collect_page(page))
         
         classes = ontology_repo.get_ontology_parent_classes()
-        ontology_repo.close()
         
         # Преобразуем TNode в словари
         classes_data = []
@@ -376,16 +427,9 @@ def get_class(request):
         return Response({'error': 'URI класса не указан'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        from django.conf import settings
-        ontology_repo = OntologyRepository(
-            uri=settings.NEO4J_URI,
-            user=settings.NEO4J_USER,
-            password=settings.NEO4J_PASSWORD,
-            database=settings.NEO4J_DATABASE
-        )
+        ontology_repo = get_ontology_repository()
         
         cls = ontology_repo.get_class(class_uri)
-        ontology_repo.close()
         
         if cls is None:
             return Response({'error': 'Класс не найден'}, status=status.HTTP_404_NOT_FOUND)
@@ -410,20 +454,13 @@ def create_class(request):
         return Response({'error': 'Неверный формат JSON'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        from django.conf import settings
-        ontology_repo = OntologyRepository(
-            uri=settings.NEO4J_URI,
-            user=settings.NEO4J_USER,
-            password=settings.NEO4J_PASSWORD,
-            database=settings.NEO4J_DATABASE
-        )
+        ontology_repo = get_ontology_repository()
         
         cls = ontology_repo.create_class(
             title=data.get('title', ''),
             description=data.get('description', ''),
             parent_uri=data.get('parent_uri')
         )
-        ontology_repo.close()
         
         return Response({
             'id': cls.id,
@@ -444,20 +481,13 @@ def collect_signature(request):
         return Response({'error': 'URI класса не указан'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        from django.conf import settings
-        ontology_repo = OntologyRepository(
-            uri=settings.NEO4J_URI,
-            user=settings.NEO4J_USER,
-            password=settings.NEO4J_PASSWORD,
-            database=settings.NEO4J_DATABASE
-        )
+        ontology_repo = get_ontology_repository()
         
         signature = ontology_repo.collect_signature(class_uri)
-        ontology_repo.close()
         
         return Response({
             'params': [
-                {'title': param.title, 'uri': param.uri}
+                {'title': param.title, 'uri': param.uri, 'source_class_uri': param.source_class_uri}
                 for param in signature.params
             ],
             'obj_params': [
@@ -465,7 +495,8 @@ def collect_signature(request):
                     'title': obj_param.title,
                     'uri': obj_param.uri,
                     'target_class_uri': obj_param.target_class_uri,
-                    'relation_direction': obj_param.relation_direction
+                    'relation_direction': obj_param.relation_direction,
+                    'source_class_uri': obj_param.source_class_uri
                 }
                 for obj_param in signature.obj_params
             ]
@@ -474,6 +505,55 @@ def collect_signature(request):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes((AllowAny,))
+def get_class_overview(request):
+    """Получить класс с родителями, потомками, объектами и signature (чтения выполняются параллельно)"""
+    class_uri = request.GET.get('uri', None)
+    if class_uri is None:
+        return Response({'error': 'URI класса не указан'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        ontology_repo = get_ontology_repository()
+        
+        overview = ontology_repo.get_class_overview(class_uri)
+        
+        if overview.cls is None:
+            return Response({'error': 'Класс не найден'}, status=status.HTTP_404_NOT_FOUND)
+        
+        def collect_nodes(nodes):
+            return [
+                {'id': node.id, 'uri': node.uri, 'title': node.title, 'description': node.description}
+                for node in nodes
+            ]
+        
+        return Response({
+            'class': collect_nodes([overview.cls])[0],
+            'parents': collect_nodes(overview.parents),
+            'children': collect_nodes(overview.children),
+            'objects': collect_nodes(overview.objects),
+            'signature': {
+                'params': [
+                    {'title': param.title, 'uri': param.uri, 'source_class_uri': param.source_class_uri}
+                    for param in overview.signature.params
+                ],
+                'obj_params': [
+                    {
+                        'title': obj_param.title,
+                        'uri': obj_param.uri,
+                        'target_class_uri': obj_param.target_class_uri,
+                        'relation_direction': obj_param.relation_direction,
+                        'source_class_uri': obj_param.source_class_uri
+                    }
+                    for obj_param in overview.signature.obj_params
+                ]
+            },
+            'timings': overview.timings
+        })
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['POST'])
 @permission_classes((AllowAny,))
 def create_object(request):
@@ -484,19 +564,12 @@ def create_object(request):
         return Response({'error': 'Неверный формат JSON'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        from django.conf import settings
-        ontology_repo = OntologyRepository(
-            uri=settings.NEO4J_URI,
-            user=settings.NEO4J_USER,
-            password=settings.NEO4J_PASSWORD,
-            database=settings.NEO4J_DATABASE
-        )
+        ontology_repo = get_ontology_repository()
         
         obj = ontology_repo.create_object(
             uri=data.get('uri', ''),
             class_uri=data.get('class_uri', '')
         )
-        ontology_repo.close()
         
         return Response({
             'id': obj.id,
@@ -515,16 +588,9 @@ def get_object(request):
         return Response({'error': 'URI объекта не указан'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        from django.conf import settings
-        ontology_repo = OntologyRepository(
-            uri=settings.NEO4J_URI,
-            user=settings.NEO4J_USER,
-            password=settings.NEO4J_PASSWORD,
-            database=settings.NEO4J_DATABASE
-        )
+        ontology_repo = get_ontology_repository()
         
         obj = ontology_repo.get_object(obj_uri)
-        ontology_repo.close()
         
         if obj:
             return Response({
@@ -547,20 +613,13 @@ def create_datatype_property(request):
         return Response({'error': 'Неверный формат JSON'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        from django.conf import settings
-        ontology_repo = OntologyRepository(
-            uri=settings.NEO4J_URI,
-            user=settings.NEO4J_USER,
-            password=settings.NEO4J_PASSWORD,
-            database=settings.NEO4J_DATABASE
-        )
+        ontology_repo = get_ontology_repository()
         
         prop = ontology_repo.create_datatype_property(
             uri=data.get('uri', ''),
             domain_uri=data.get('domain_uri', ''),
             range_type=data.get('range_type', '')
         )
-        ontology_repo.close()
         
         return Response({
             'id': prop.id,
@@ -582,20 +641,13 @@ def create_object_property(request):
         return Response({'error': 'Неверный формат JSON'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        from django.conf import settings
-        ontology_repo = OntologyRepository(
-            uri=settings.NEO4J_URI,
-            user=settings.NEO4J_USER,
-            password=settings.NEO4J_PASSWORD,
-            database=settings.NEO4J_DATABASE
-        )
+        ontology_repo = get_ontology_repository()
         
         prop = ontology_repo.create_object_property(
             uri=data.get('uri', ''),
             domain_uri=data.get('domain_uri', ''),
             range_uri=data.get('range_uri', '')
         )
-        ontology_repo.close()
         
         return Response({
             'id': prop.id,
@@ -604,4 +656,28 @@ def create_object_property(request):
             'range_uri': prop.range_uri
         }, status=status.HTTP_201_CREATED)
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes((IsAuthenticated,))
+def get_neo4j_pool_metrics(request):
+    """Метрики пула соединений Neo4j рабочего процесса (занятые и свободные соединения, время получения, таймауты)"""
+    try:
+        return Response(get_pool_metrics())
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes((IsAuthenticated,))
+def get_neo4j_query_stats(request):
+    """Статистика запросов Neo4j по шаблонам (JSON или ?output=prometheus)"""
+    stats = get_query_stats()
+    if stats is None:
+        return Response({'error': 'Статистика запросов отключена'}, status=status.HTTP_404_NOT_FOUND)
+    
+    # ?format= зарезервирован DRF для выбора рендерера, поэтому формат выгрузки задается ?output=
+    if request.GET.get('output') == 'prometheus':
+        return HttpResponse(stats.to_prometheus(), content_type='text/plain; version=0.0.4')
+    return Response(stats.snapshot())